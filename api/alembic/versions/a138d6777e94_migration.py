@@ -0,0 +1,106 @@
+"""add transaction fingerprint
+
+Revision ID: a138d6777e94
+Revises: 962faecb63c0
+Create Date: 2026-10-18 07:20:11.482913
+
+"""
+import datetime
+import hashlib
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a138d6777e94'
+down_revision: Union[str, None] = '962faecb63c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+transactions = sa.table(
+    'transactions',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.String),
+    sa.column('description', sa.String),
+    sa.column('date', sa.Date),
+    sa.column('amount', sa.Float),
+    sa.column('is_deleted', sa.Integer),
+    sa.column('fingerprint', sa.String),
+)
+
+# The fingerprint as defined when this migration was written, copied from
+# app/utils/fingerprint.py so that replaying the migration always produces
+# the fingerprints it first stored, whatever the application does later.
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_key(description: str, date, amount) -> tuple:
+    """Lower-cased description with collapsed whitespace, ISO date and amount in cents."""
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    normalized = _WHITESPACE.sub(" ", str(description)).strip().lower()
+    # Adding 0.0 turns -0.0 into 0.0 so both format the same way.
+    return normalized, date.isoformat(), f"{round(float(amount), 2) + 0.0:.2f}"
+
+
+def transaction_fingerprint(key: tuple, ordinal: int) -> str:
+    """SHA-256 hex digest of the key and the ordinal of the transaction among identical ones."""
+    return hashlib.sha256("|".join((*key, str(ordinal))).encode("utf-8")).hexdigest()
+
+
+def backfill_fingerprints(connection) -> None:
+    """
+    Fingerprint every live transaction, numbering identical ones per user in
+    insertion (id) order. Deleted and incomplete transactions keep a NULL
+    fingerprint.
+    """
+    rows = connection.execution_options(stream_results=True, yield_per=BACKFILL_BATCH_SIZE).execute(
+        sa.select(
+            transactions.c.id,
+            transactions.c.user_id,
+            transactions.c.description,
+            transactions.c.date,
+            transactions.c.amount,
+        ).where(
+            sa.or_(transactions.c.is_deleted == 0, transactions.c.is_deleted.is_(None)),
+            transactions.c.description.isnot(None),
+            transactions.c.date.isnot(None),
+            transactions.c.amount.isnot(None),
+        ).order_by(transactions.c.id)
+    )
+    update = (
+        transactions.update()
+        .where(transactions.c.id == sa.bindparam('txn_id'))
+        .values(fingerprint=sa.bindparam('txn_fingerprint'))
+    )
+    counts = {}
+    batch = []
+    for txn_id, user_id, description, date, amount in rows:
+        key = fingerprint_key(description, date, amount)
+        user_key = (user_id, *key)
+        counts[user_key] = counts.get(user_key, 0) + 1
+        batch.append({
+            'txn_id': txn_id,
+            'txn_fingerprint': transaction_fingerprint(key, counts[user_key]),
+        })
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            connection.execute(update, batch)
+            batch = []
+    if batch:
+        connection.execute(update, batch)
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    backfill_fingerprints(op.get_bind())
+    op.create_index('uq_transactions_user_fingerprint', 'transactions', ['user_id', 'fingerprint'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_transactions_user_fingerprint', table_name='transactions')
+    op.drop_column('transactions', 'fingerprint')
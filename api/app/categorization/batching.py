@@ -0,0 +1,132 @@
+# app/categorization/batching.py
+"""
+Micro-batching of single-description predictions.
+
+Every request that categorizes one transaction would otherwise pay for its
+own preprocessing, vectorizer and model calls, whose fixed cost dwarfs the
+work for one row. A MicroBatcher puts the descriptions submitted from any
+thread on a queue; one worker thread takes whatever arrives within a few
+milliseconds of the first description, up to a maximum number, predicts it
+with a single batch call and hands each caller its result through a
+future. Under no load a description waits at most the batching window;
+under load the window fills up with many descriptions.
+
+Each batcher records, under its name, the batches and descriptions it
+predicted, the size of its batches, the time descriptions waited in the
+queue and until their result, the time each batch took and the queue's
+depth (see utils/metrics.py).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence, Tuple
+from ..utils import metrics
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Put on the queue to stop the worker once the descriptions ahead of it are predicted.
+_STOP = object()
+
+class MicroBatcher:
+    """
+    Predicts descriptions submitted one at a time in batches, on a worker thread.
+
+    ``predict`` maps a list of descriptions to the version of the model that
+    predicted and one result per description; each future resolves to the
+    version and the result of its description, or to the exception the batch raised.
+    """
+
+    def __init__(self, name: str, predict: Callable[[List[str]], Tuple[Optional[str], Sequence]],
+                 max_batch_size: int = 256, max_wait_seconds: float = 0.002):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._predict = predict
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, description: str) -> Future:
+        """Queue a description, starting the worker if it is not running."""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+            self._queue.put((description, future, time.perf_counter()))
+        metrics.set_gauge(f"{self.name}_queue_depth", self._queue.qsize())
+        return future
+
+    def predict(self, description: str, timeout: Optional[float] = None) -> Tuple[Optional[str], object]:
+        """Submit a description and wait for its model version and result."""
+        return self.submit(description).result(timeout)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Predict the descriptions already queued, then stop the worker. The next submit starts a new one."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _next_batch(self) -> Tuple[list, bool]:
+        """
+        Block for the first queued description, then take the ones arriving
+        within the batching window, up to max_batch_size.
+
+        :return: The batch, and whether the worker was asked to stop.
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            try:
+                # Whatever is already queued is taken even once the window has passed.
+                item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            metrics.set_gauge(f"{self.name}_queue_depth", self._queue.qsize())
+            # Futures cancelled while queued are dropped.
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if batch:
+                self._predict_batch(batch)
+
+    def _predict_batch(self, batch: list):
+        start = time.perf_counter()
+        for _, _, queued_at in batch:
+            metrics.observe(f"{self.name}_queue_wait_seconds", start - queued_at)
+        try:
+            version, results = self._predict([description for description, _, _ in batch])
+        except Exception as e:
+            logger.error("Batch of %d descriptions failed in %s: %s", len(batch), self.name, e)
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result((version, result))
+        end = time.perf_counter()
+        for _, _, queued_at in batch:
+            metrics.observe(f"{self.name}_latency_seconds", end - queued_at)
+        metrics.increment(f"{self.name}_batches_total")
+        metrics.increment(f"{self.name}_items_total", len(batch))
+        metrics.observe(f"{self.name}_batch_size", len(batch))
+        metrics.observe(f"{self.name}_batch_seconds", end - start)
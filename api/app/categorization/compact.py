@@ -0,0 +1,265 @@
+# app/categorization/compact.py
+"""
+Compact inference artifact for the transaction categorizer.
+
+Serving only needs the TF-IDF transform and the linear scores of the
+classifier, so training exports the fitted vocabulary, idf weights,
+coefficients (as float32), intercepts and class names to a single .npz
+file. CompactVectorizer and CompactClassifier score from those arrays with
+NumPy and SciPy alone, exposing the ``transform``, ``predict`` and
+``predict_proba`` methods model.py calls, so the API never imports
+scikit-learn or unpickles its objects.
+
+Features come either from a fitted vocabulary (TfidfVectorizer) or from
+hashing terms into a fixed number of columns (a HashingVectorizer followed
+by a TfidfTransformer); the hashed form stores no vocabulary, so its size
+only depends on the number of columns and classes.
+
+Only the configurations training uses are supported: a word analyzer
+without stop words, custom preprocessing or tokenization, unsigned hashed
+counts, and a logistic regression. save_compact rejects anything else
+rather than export a model that would score differently.
+
+This module has no imports from the app so training.py, which runs as a
+script, can use it.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+FORMAT_VERSION = 1
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Signed 32-bit MurmurHash3 (x86), as computed by scikit-learn's hashing."""
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    h = seed & mask
+    length = len(data)
+    end = length - length % 4
+    for i in range(0, end, 4):
+        k = int.from_bytes(data[i:i + 4], "little")
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+    k = int.from_bytes(data[end:], "little") if end < length else 0
+    if k:
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & mask
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & mask
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+@lru_cache(maxsize=65536)
+def _hashed_column(term: str, n_features: int) -> int:
+    return abs(murmurhash3_32(term.encode("utf-8"))) % n_features
+
+class CompactVectorizer:
+    """TF-IDF transform of a fitted word-level vocabulary or hashed feature space."""
+
+    def __init__(self, terms: Optional[np.ndarray], idf: Optional[np.ndarray], params: dict):
+        # Hashed features have no vocabulary, only a width.
+        self.n_features = params.get("n_features")
+        self.vocabulary = None if self.n_features else {str(term): index for index, term in enumerate(terms)}
+        if self.vocabulary is not None:
+            self.n_features = len(self.vocabulary)
+        self.idf = idf
+        self.lowercase = params["lowercase"]
+        self.token_pattern = re.compile(params["token_pattern"])
+        self.ngram_range = tuple(params["ngram_range"])
+        self.binary = params["binary"]
+        self.sublinear_tf = params["sublinear_tf"]
+        self.norm = params["norm"]
+
+    def _terms(self, text: str) -> List[str]:
+        tokens = self.token_pattern.findall(text.lower() if self.lowercase else text)
+        low, high = self.ngram_range
+        if (low, high) == (1, 1):
+            return tokens
+        terms = tokens if low == 1 else []
+        for n in range(max(low, 2), high + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def transform(self, texts: Sequence[str]) -> sp.csr_matrix:
+        """Sparse TF-IDF matrix of the texts, one row per text."""
+        indptr, indices, counts = [0], [], []
+        for text in texts:
+            row = {}
+            for term in self._terms(text):
+                if self.vocabulary is None:
+                    index = _hashed_column(term, self.n_features)
+                else:
+                    index = self.vocabulary.get(term)
+                if index is not None:
+                    row[index] = row.get(index, 0) + 1
+            columns = sorted(row)
+            indices.extend(columns)
+            counts.extend(row[column] for column in columns)
+            indptr.append(len(indices))
+        data = np.asarray(counts, dtype=np.float64)
+        indices = np.asarray(indices, dtype=np.int32)
+        indptr = np.asarray(indptr, dtype=np.int32)
+        if self.binary:
+            data[:] = 1.0
+        elif self.sublinear_tf:
+            data = np.log(data) + 1
+        # Weight and normalize the stored values in place; only the columns
+        # present are touched, whatever the width of the feature space.
+        if self.idf is not None:
+            data *= self.idf[indices]
+        if self.norm and data.size:
+            values = data * data if self.norm == "l2" else np.abs(data)
+            nonempty = np.diff(indptr) > 0
+            norms = np.add.reduceat(values, indptr[:-1][nonempty])
+            if self.norm == "l2":
+                norms = np.sqrt(norms)
+            norms[norms == 0] = 1.0
+            data /= np.repeat(norms, np.diff(indptr)[nonempty])
+        return sp.csr_matrix((data, indices, indptr), shape=(len(texts), self.n_features))
+
+class CompactClassifier:
+    """Scores of a fitted linear logistic regression."""
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray, multinomial: bool):
+        # One row of class weights per feature, so scoring only reads the
+        # rows of the features present instead of the whole matrix.
+        self._feature_weights = np.ascontiguousarray(coef.T)
+        self.coef = self._feature_weights.T
+        self.intercept = intercept
+        self.classes_ = classes
+        self.multinomial = multinomial
+
+    def decision_function(self, matrix) -> np.ndarray:
+        matrix = sp.csr_matrix(matrix)
+        scores = np.zeros((matrix.shape[0], self.coef.shape[0]))
+        if matrix.nnz:
+            weighted = self._feature_weights[matrix.indices] * matrix.data[:, None]
+            starts = matrix.indptr[:-1]
+            nonempty = np.diff(matrix.indptr) > 0
+            scores[nonempty] = np.add.reduceat(weighted, starts[nonempty], axis=0)
+        scores += self.intercept
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, matrix) -> np.ndarray:
+        scores = self.decision_function(matrix)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def predict_proba(self, matrix) -> np.ndarray:
+        scores = self.decision_function(matrix)
+        if scores.ndim == 1:
+            positive = 1 / (1 + np.exp(-scores))
+            return np.column_stack([1 - positive, positive])
+        if self.multinomial:
+            exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+        else:
+            exp = 1 / (1 + np.exp(-scores))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+def _check_supported(model, vectorizer):
+    unsupported = {
+        "analyzer": "word", "stop_words": None, "preprocessor": None,
+        "tokenizer": None, "strip_accents": None,
+    }
+    params = vectorizer.get_params()
+    for name, expected in unsupported.items():
+        if params[name] != expected:
+            raise ValueError(f"Cannot export a vectorizer with {name}={params[name]!r}.")
+    if type(model).__name__ != "LogisticRegression":
+        raise ValueError(f"Cannot export a {type(model).__name__}.")
+
+def _split_vectorizer(vectorizer):
+    """
+    The term counting step and the TF-IDF weighting step of a vectorizer.
+
+    A TfidfVectorizer is both; a hashing pipeline is a HashingVectorizer
+    followed by a TfidfTransformer.
+    """
+    if type(vectorizer).__name__ == "TfidfVectorizer":
+        return vectorizer, vectorizer
+    steps = [step for _, step in getattr(vectorizer, "steps", [])]
+    if [type(step).__name__ for step in steps] != ["HashingVectorizer", "TfidfTransformer"]:
+        raise ValueError(f"Cannot export a {type(vectorizer).__name__} vectorizer.")
+    hashing, weighting = steps
+    if hashing.alternate_sign or hashing.norm is not None or hashing.binary:
+        raise ValueError("Cannot export a HashingVectorizer with signed, normalized or binary counts.")
+    return hashing, weighting
+
+def _is_multinomial(model) -> bool:
+    """Whether predict_proba applies a softmax (rather than one-vs-rest sigmoids)."""
+    if len(model.classes_) <= 2:
+        return False
+    multi_class = getattr(model, "multi_class", "auto")
+    if multi_class in ("auto", "deprecated"):
+        return model.solver != "liblinear"
+    return multi_class == "multinomial"
+
+def save_compact(model, vectorizer, path: str):
+    """
+    Export a fitted vectorizer (a TfidfVectorizer or a hashing pipeline) and
+    LogisticRegression to ``path``.
+
+    The file is written next to ``path`` and renamed into place, so readers
+    never see a partial artifact.
+
+    :raises ValueError: If the model or vectorizer configuration is not supported.
+    """
+    counting, weighting = _split_vectorizer(vectorizer)
+    _check_supported(model, counting)
+    params = {
+        "format": FORMAT_VERSION,
+        "lowercase": counting.lowercase,
+        "token_pattern": counting.token_pattern,
+        "ngram_range": list(counting.ngram_range),
+        "binary": counting.binary,
+        "sublinear_tf": weighting.sublinear_tf,
+        "norm": weighting.norm,
+        "multinomial": _is_multinomial(model),
+    }
+    arrays = {
+        "coef": model.coef_.astype(np.float32),
+        "intercept": model.intercept_.astype(np.float64),
+        "classes": np.array([str(label) for label in model.classes_], dtype=str),
+    }
+    if counting is weighting:
+        arrays["terms"] = np.array(sorted(counting.vocabulary_, key=counting.vocabulary_.get), dtype=str)
+    else:
+        params["n_features"] = counting.n_features
+    if weighting.use_idf:
+        arrays["idf"] = weighting.idf_.astype(np.float64)
+    arrays["params"] = np.array(json.dumps(params))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def load_compact(path: str):
+    """
+    Load an artifact written by save_compact.
+
+    :return: The (classifier, vectorizer) pair.
+    :raises ValueError: If the artifact was written in an unknown format.
+    """
+    with np.load(path, allow_pickle=False) as artifact:
+        params = json.loads(str(artifact["params"]))
+        if params.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format {params.get('format')!r} in {path}.")
+        idf = artifact["idf"] if "idf" in artifact.files else None
+        terms = artifact["terms"] if "terms" in artifact.files else None
+        vectorizer = CompactVectorizer(terms, idf, params)
+        classifier = CompactClassifier(
+            artifact["coef"], artifact["intercept"], artifact["classes"].astype(object), params["multinomial"],
+        )
+    return classifier, vectorizer
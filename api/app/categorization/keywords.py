@@ -0,0 +1,132 @@
+# app/categorization/keywords.py
+"""
+Keyword fast path ahead of the categorization model.
+
+Many descriptions contain a keyword that default_rules only ever maps to
+one category: "payroll", "uber", "car insurance". Those keywords are
+compiled into an Aho-Corasick automaton over words, so a single pass over
+a preprocessed description finds every keyword in it, however many
+keywords there are. A description whose keywords all name one category
+gets that category without being vectorized or scored. A description
+with no keyword, or with keywords of different categories, is left to
+the model.
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .default_rules import default_rules
+from .preprocessing import preprocess
+
+# Distinct rule descriptions a keyword must appear in, all of one category.
+KEYWORD_MIN_SUPPORT = 3
+# Longest keywords derived, in words.
+KEYWORD_MAX_WORDS = 2
+# Words that only name one category in default_rules but not in real
+# descriptions: "loan" is a student loan in the rules and an auto loan at
+# the bank, "natural" names gas and a grocer, "lease" rent and a car. A
+# keyword also needs a word of at least four letters that is not one of
+# these, so fragments such as "xd" or "de la" never match alone.
+GENERIC_WORDS = {
+    "activity", "class", "epic", "fast", "free", "interest", "lease", "loan", "mobile",
+    "monthly", "natural", "online", "power", "products", "ride", "store", "student",
+    "switch", "weekly",
+}
+MIN_KEYWORD_WORD_LENGTH = 4
+
+def derive_keywords(rules: Iterable[dict], min_support: int = KEYWORD_MIN_SUPPORT,
+                    max_words: int = KEYWORD_MAX_WORDS) -> Dict[str, str]:
+    """
+    The high-precision keywords of a set of rules.
+
+    A keyword is a run of up to ``max_words`` words of preprocessed rule
+    descriptions that appears in at least ``min_support`` distinct
+    descriptions, all labeled with the same single category.
+
+    :return: Keyword -> category.
+    """
+    labels: Dict[str, Set[str]] = {}
+    for rule in rules:
+        labels.setdefault(preprocess(rule["description"]), set()).add(rule["category"])
+
+    support: Dict[str, int] = {}
+    categories: Dict[str, Set[str]] = {}
+    for text, text_categories in labels.items():
+        words = text.split()
+        grams = {
+            " ".join(words[i:i + n])
+            for n in range(1, max_words + 1)
+            for i in range(len(words) - n + 1)
+        }
+        for gram in grams:
+            support[gram] = support.get(gram, 0) + 1
+            categories.setdefault(gram, set()).update(text_categories)
+
+    keywords = {}
+    for gram, gram_categories in categories.items():
+        if len(gram_categories) != 1 or support[gram] < min_support:
+            continue
+        if not any(len(word) >= MIN_KEYWORD_WORD_LENGTH and word not in GENERIC_WORDS for word in gram.split()):
+            continue
+        keywords[gram] = next(iter(gram_categories))
+    return keywords
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over words, finding the categories of the keywords in a text."""
+
+    def __init__(self, keywords: Dict[str, str]):
+        self.keywords = dict(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Categories of the keywords ending at each state, including the
+        # shorter keywords reached through its failure links.
+        self._outputs: List[Tuple[str, ...]] = [()]
+        for keyword, category in self.keywords.items():
+            state = 0
+            for word in keyword.split():
+                child = self._goto[state].get(word)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append(())
+                    self._goto[state][word] = child
+                state = child
+            self._outputs[state] += (category,)
+
+        # Failure links, breadth first: the longest proper suffix of a state's
+        # words that is also a prefix of some keyword.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                self._outputs[child] += self._outputs[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def match(self, text: str) -> List[str]:
+        """The category of every keyword occurrence in a preprocessed text, in order."""
+        found = []
+        state = 0
+        for word in text.split():
+            while state and word not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(word, 0)
+            found.extend(self._outputs[state])
+        return found
+
+    def categorize(self, text: str) -> Optional[str]:
+        """The category all keywords in a preprocessed text agree on, or None if none match or they disagree."""
+        found = set(self.match(text))
+        return found.pop() if len(found) == 1 else None
+
+@lru_cache(maxsize=1)
+def default_automaton() -> KeywordAutomaton:
+    """The automaton of the keywords derived from default_rules, built on first use."""
+    return KeywordAutomaton(derive_keywords(default_rules))
@@ -1,8 +1,18 @@
 # app/transaction_categorization/model.py
 
 import joblib
+import numpy as np
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from cachetools import LRUCache
+from . import registry
+from .batching import MicroBatcher
+from .compact import load_compact
+from .keywords import default_automaton
 from .preprocessing import preprocess
 import os
+from ..utils import metrics
 from ..utils.logger import get_logger
 
 # Configure logging
@@ -10,12 +20,387 @@ logger = get_logger(__name__)
 # Define paths to the model artifacts
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "transaction_categorizer.pkl")
 VECTORIZER_PATH = os.path.join(os.path.dirname(__file__), "tfidf_vectorizer.pkl")
+COMPACT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "transaction_categorizer.npz")
+# "compact" serves the NumPy export of the model (see compact.py) without
+# importing scikit-learn; "pickle" serves the scikit-learn objects.
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "compact")
+# Registry of published model versions (see registry.py). Its active version
+# is served when there is one; otherwise the artifacts above are.
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(__file__), "registry"))
+# "on" gives descriptions containing a high-precision keyword (see
+# keywords.py) its category without running the model; "off" scores every
+# description with the model.
+KEYWORD_FAST_PATH = os.getenv("KEYWORD_FAST_PATH", "on").lower() != "off"
 
-# Load the model and vectorizer at module level
-logger.info("Loading model from %s", MODEL_PATH)
-model = joblib.load(MODEL_PATH)
-logger.info("Loading vectorizer from %s", VECTORIZER_PATH)
-vectorizer = joblib.load(VECTORIZER_PATH)
+# "on" predicts single descriptions (predict_category_versioned,
+# rank_category) in micro-batches: descriptions submitted from concurrent
+# requests within PREDICTION_BATCH_WAIT_MS of each other, up to
+# PREDICTION_BATCH_MAX_SIZE, are predicted together by one worker thread
+# (see batching.py). "off" predicts each in the calling thread.
+MICRO_BATCHING = os.getenv("PREDICTION_MICRO_BATCHING", "on").lower() != "off"
+PREDICTION_BATCH_WAIT_MS = float(os.getenv("PREDICTION_BATCH_WAIT_MS", "2"))
+PREDICTION_BATCH_MAX_SIZE = int(os.getenv("PREDICTION_BATCH_MAX_SIZE", "256"))
+
+# Number of predictions kept per cache; the least recently used are evicted.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+# How often, in seconds, the active registry version and the artifacts are
+# checked for changes.
+MODEL_CHECK_INTERVAL_SECONDS = float(os.getenv("MODEL_CHECK_INTERVAL_SECONDS", "5"))
+
+def _artifact_paths() -> Tuple[str, ...]:
+    return (COMPACT_MODEL_PATH,) if MODEL_FORMAT == "compact" else (MODEL_PATH, VECTORIZER_PATH)
+
+def _artifact_version() -> str:
+    """Identify the artifacts on disk by their size and modification time."""
+    stats = [os.stat(path) for path in _artifact_paths()]
+    return "-".join(f"{stat.st_size:x}.{stat.st_mtime_ns:x}" for stat in stats)
+
+# The model and vectorizer are loaded on first use (see get_model), so
+# importing this module (Alembic, tests, workers that never predict) stays
+# cheap. The compact artifact is read whole (about half a megabyte); the
+# pickles' arrays are memory-mapped read-only, so processes on one host
+# share a single page-cache copy instead of each holding its own.
+model = None
+vectorizer = None
+model_version = None
+_last_check = 0.0
+_load_lock = threading.Lock()
+
+# Confidence below which a prediction is flagged as uncertain.
+UNCERTAINTY_THRESHOLD = 0.05
+# Most categories a top-k prediction returns.
+MAX_TOP_K = 10
+
+# Predictions by (model_version, preprocessed description). Labels come from
+# model.predict alone; rankings (the MAX_TOP_K most probable categories) from
+# one predict_proba call, and serve both confidences and top-k predictions.
+_label_cache = LRUCache(maxsize=PREDICTION_CACHE_SIZE)
+_ranking_cache = LRUCache(maxsize=PREDICTION_CACHE_SIZE)
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+# Distinct descriptions resolved by each prediction stage, in order: the
+# keyword automaton, the prediction caches, and the model.
+PREDICTION_STAGES = ("keyword", "cache", "model")
+_stage_stats = dict.fromkeys(PREDICTION_STAGES, 0)
+
+def _load_artifacts():
+    """Load the model and the vectorizer in the configured MODEL_FORMAT."""
+    if MODEL_FORMAT == "compact":
+        logger.info("Loading compact model from %s", COMPACT_MODEL_PATH)
+        return load_compact(COMPACT_MODEL_PATH)
+    logger.info("Loading model from %s", MODEL_PATH)
+    loaded_model = joblib.load(MODEL_PATH, mmap_mode="r")
+    logger.info("Loading vectorizer from %s", VECTORIZER_PATH)
+    loaded_vectorizer = joblib.load(VECTORIZER_PATH, mmap_mode="r")
+    return loaded_model, loaded_vectorizer
+
+def _active_source():
+    """
+    The version to serve and a function loading its model and vectorizer:
+    the registry's active version, or else the packaged artifacts.
+    """
+    active = registry.active_version(MODEL_REGISTRY_DIR)
+    if active:
+        def load():
+            logger.info("Loading model version %s from %s", active, MODEL_REGISTRY_DIR)
+            return registry.load_version(MODEL_REGISTRY_DIR, active)[:2]
+        return active, load
+    return _artifact_version(), _load_artifacts
+
+def _refresh(force: bool = False):
+    """
+    Swap in the model to serve if it changed, checking at most every
+    MODEL_CHECK_INTERVAL_SECONDS unless forced.
+
+    A version that fails to load is logged and the current model kept, so a
+    bad publish never takes prediction down; it is retried on the next check.
+    """
+    global model, vectorizer, model_version, _last_check
+    with _load_lock:
+        if not (force or model is None or time.monotonic() - _last_check >= MODEL_CHECK_INTERVAL_SECONDS):
+            return
+        _last_check = time.monotonic()
+        version, load = _active_source()
+        if version == model_version:
+            return
+        if model is not None:
+            logger.info("Model changed, swapping version %s for %s", model_version, version)
+        try:
+            loaded_model, loaded_vectorizer = load()
+        except Exception as e:
+            if model is None:
+                raise
+            logger.error(f"Could not load model version {version}, still serving {model_version}: {e}")
+            return
+        # Predictions already running keep the model they started with; the
+        # swap itself is a single assignment under the cache lock.
+        with _cache_lock:
+            model, vectorizer, model_version = loaded_model, loaded_vectorizer, version
+            # Entries of the old version can never be hit again.
+            _label_cache.clear()
+            _ranking_cache.clear()
+        metrics.increment("model_reloads_total")
+
+def get_model():
+    """
+    The model, the vectorizer and their version.
+
+    They are loaded on the first call and swapped, at most every
+    MODEL_CHECK_INTERVAL_SECONDS, when another registry version is activated
+    or the artifacts change on disk.
+    """
+    if model is None or time.monotonic() - _last_check >= MODEL_CHECK_INTERVAL_SECONDS:
+        _refresh()
+    with _cache_lock:
+        return model, vectorizer, model_version
+
+def reload_model(version: Optional[str] = None) -> str:
+    """
+    Serve a registry version now, in this process.
+
+    Other processes pick the change up on their next check.
+
+    :param version: Registry version to activate first; None reloads whatever is active.
+    :return: The version now served.
+    :raises FileNotFoundError: If the version does not exist.
+    :raises ValueError: If the version's artifact does not match its checksum.
+    """
+    if version is not None:
+        registry.activate_version(MODEL_REGISTRY_DIR, version)
+    _refresh(force=True)
+    with _cache_lock:
+        return model_version
+
+def model_info() -> dict:
+    """The served version, its registry metadata if any, and every published version."""
+    _, _, version = get_model()
+    versions = registry.list_versions(MODEL_REGISTRY_DIR)
+    metadata = next((item for item in versions if item["version"] == version), None)
+    return {"version": version, "metadata": metadata, "versions": versions}
+
+def warmup():
+    """
+    Load the artifacts and run one prediction, so the first request does not
+    pay for loading or for faulting the mapped arrays in.
+    """
+    start = time.perf_counter()
+    current_model, current_vectorizer, version = get_model()
+    current_model.predict_proba(current_vectorizer.transform([preprocess("warmup")]))
+    logger.info("Model version %s warmed up in %.3fs", version, time.perf_counter() - start)
+
+def prediction_cache_info() -> Dict[str, object]:
+    """Hits, misses and size of the prediction caches, and the model version they hold."""
+    with _cache_lock:
+        return {
+            **_cache_stats,
+            "size": len(_label_cache) + len(_ranking_cache),
+            "maxsize": _label_cache.maxsize + _ranking_cache.maxsize,
+            "model_version": model_version,
+        }
+
+def prediction_stage_info() -> Dict[str, dict]:
+    """
+    How many distinct descriptions each prediction stage resolved, and its
+    share of all of them: the keyword and cache shares are model work avoided.
+    """
+    with _cache_lock:
+        counts = dict(_stage_stats)
+    total = sum(counts.values())
+    return {
+        stage: {"count": count, "rate": count / total if total else 0.0}
+        for stage, count in counts.items()
+    }
+
+def clear_prediction_cache():
+    """Drop all cached predictions and reset the hit, miss and stage counters."""
+    with _cache_lock:
+        _label_cache.clear()
+        _ranking_cache.clear()
+        _cache_stats.update(hits=0, misses=0)
+        _stage_stats.update(dict.fromkeys(PREDICTION_STAGES, 0))
+
+def _predict_cached(descriptions: Sequence[str], cache: LRUCache, score: Callable,
+                    from_keyword: Callable) -> Tuple[str, list]:
+    """
+    Predict a batch through the keyword automaton and one of the prediction caches.
+
+    Descriptions are preprocessed and collapsed to distinct texts. Texts
+    with a keyword get ``from_keyword`` of its category; of the rest, only
+    the texts not cached for the current model version are vectorized and
+    scored, in one call to ``score``, which maps the model and the feature
+    matrix to one result per text. Results are returned in input order,
+    with the version of the model served.
+    """
+    current_model, current_vectorizer, version = get_model()
+    processed = [preprocess(description) for description in descriptions]
+    unique_texts = list(dict.fromkeys(processed))
+    results = {}
+    if KEYWORD_FAST_PATH:
+        automaton = default_automaton()
+        for text in unique_texts:
+            category = automaton.categorize(text)
+            if category is not None:
+                results[text] = from_keyword(category)
+    keyword_hits = len(results)
+    with _cache_lock:
+        for text in unique_texts:
+            if text in results:
+                continue
+            result = cache.get((version, text))
+            if result is not None:
+                results[text] = result
+        missing = [text for text in unique_texts if text not in results]
+        cache_hits = len(results) - keyword_hits
+        _cache_stats["hits"] += cache_hits
+        _cache_stats["misses"] += len(missing)
+        for stage, count in zip(PREDICTION_STAGES, (keyword_hits, cache_hits, len(missing))):
+            _stage_stats[stage] += count
+    metrics.increment("prediction_cache_hits_total", cache_hits)
+    metrics.increment("prediction_cache_misses_total", len(missing))
+    for stage, count in zip(PREDICTION_STAGES, (keyword_hits, cache_hits, len(missing))):
+        metrics.increment(f"prediction_stage_{stage}_total", count)
+
+    if missing:
+        logger.info(
+            "Vectorizing %d descriptions (%d unique, %d by keyword, %d cached)",
+            len(processed), len(unique_texts), keyword_hits, cache_hits,
+        )
+        computed = dict(zip(missing, score(current_model, current_vectorizer.transform(missing))))
+        with _cache_lock:
+            for text, result in computed.items():
+                cache[(version, text)] = result
+        results.update(computed)
+    return version, [results[text] for text in processed]
+
+def predict_categories_versioned(descriptions: Sequence[str]) -> Tuple[Optional[str], List[str]]:
+    """
+    Predict the category of every description in a batch.
+
+    Descriptions with a high-precision keyword get its category without the
+    model. Duplicate descriptions are collapsed and cached predictions
+    reused, so the vectorizer and the model each run at most once, over the
+    distinct texts not seen before, and the results are broadcast back in
+    input order.
+
+    :return: The version of the model that predicted (None for an empty
+        batch) and the categories.
+    """
+    if len(descriptions) == 0:
+        return None, []
+    return _predict_cached(
+        descriptions, _label_cache,
+        lambda model, text_vect: [str(prediction) for prediction in model.predict(text_vect)],
+        lambda category: category,
+    )
+
+def predict_categories(descriptions: Sequence[str]) -> List[str]:
+    """The categories of predict_categories_versioned, without the model version."""
+    return predict_categories_versioned(descriptions)[1]
+
+def _rank(model, text_vect) -> List[List[Tuple[str, float]]]:
+    """
+    The MAX_TOP_K most probable categories of each row, best first, with
+    their probabilities, from a single predict_proba call. Ties keep the
+    class order, so the first category is the one model.predict returns.
+    """
+    probabilities = np.asarray(model.predict_proba(text_vect))
+    order = np.argsort(-probabilities, axis=1, kind="stable")[:, :MAX_TOP_K]
+    classes = model.classes_
+    return [
+        [(str(classes[index]), float(row[index])) for index in indices]
+        for row, indices in zip(probabilities, order)
+    ]
+
+def rank_categories(descriptions: Sequence[str], k: int = 3) -> Tuple[Optional[str], List[List[Tuple[str, float]]]]:
+    """
+    The ``k`` most probable categories of every description in a batch.
+
+    A description with a high-precision keyword ranks its category alone,
+    with probability 1.0.
+
+    :return: The version of the model served (None for an empty batch) and
+        one list of (category, probability) pairs per description, best
+        first, in input order.
+    :raises ValueError: If ``k`` is not between 1 and MAX_TOP_K.
+    """
+    if not 1 <= k <= MAX_TOP_K:
+        raise ValueError(f"k must be between 1 and {MAX_TOP_K}.")
+    if len(descriptions) == 0:
+        return None, []
+    version, rankings = _predict_cached(descriptions, _ranking_cache, _rank, lambda category: [(category, 1.0)])
+    return version, [ranking[:k] for ranking in rankings]
+
+def predict_top_k(descriptions: Sequence[str], k: int = 3) -> List[List[Tuple[str, float]]]:
+    """The rankings of rank_categories, without the model version."""
+    return rank_categories(descriptions, k)[1]
+
+def predict_categories_with_confidence(descriptions: Sequence[str]) -> List[Tuple[str, float, bool]]:
+    """
+    Predict the category of every description in a batch along with the
+    confidence and uncertainty of each prediction.
+
+    Returns a list of (category, confidence, is_uncertain) tuples in input order.
+    """
+    return [
+        (category, confidence, confidence < UNCERTAINTY_THRESHOLD)
+        for (category, confidence), in predict_top_k(descriptions, 1)
+    ]
+
+# Micro-batchers of single-description predictions. Rankings are batched at
+# MAX_TOP_K, which the ranking cache holds anyway, and cut to each caller's k.
+_label_batcher = MicroBatcher(
+    "prediction_labels", lambda descriptions: predict_categories_versioned(descriptions),
+    PREDICTION_BATCH_MAX_SIZE, PREDICTION_BATCH_WAIT_MS / 1000,
+)
+_ranking_batcher = MicroBatcher(
+    "prediction_rankings", lambda descriptions: rank_categories(descriptions, MAX_TOP_K),
+    PREDICTION_BATCH_MAX_SIZE, PREDICTION_BATCH_WAIT_MS / 1000,
+)
+
+def predict_category_versioned(description: str) -> Tuple[Optional[str], str]:
+    """
+    Predict the category of one description, batched with the descriptions
+    other threads submit at the same time when MICRO_BATCHING is on.
+
+    :return: The version of the model that predicted and the category.
+    """
+    if not MICRO_BATCHING:
+        version, (category,) = predict_categories_versioned([description])
+        return version, category
+    return _label_batcher.predict(description)
+
+def rank_category(description: str, k: int = 3) -> Tuple[Optional[str], List[Tuple[str, float]]]:
+    """
+    The ``k`` most probable categories of one description, batched like
+    predict_category_versioned.
+
+    :return: The version of the model served and the (category, probability) pairs, best first.
+    :raises ValueError: If ``k`` is not between 1 and MAX_TOP_K.
+    """
+    if not 1 <= k <= MAX_TOP_K:
+        raise ValueError(f"k must be between 1 and {MAX_TOP_K}.")
+    if not MICRO_BATCHING:
+        version, (ranking,) = rank_categories([description], k)
+        return version, ranking
+    version, ranking = _ranking_batcher.predict(description)
+    return version, ranking[:k]
+
+def batching_info() -> Dict[str, dict]:
+    """The settings and current queue depth of each micro-batcher."""
+    return {
+        batcher.name: {
+            "enabled": MICRO_BATCHING,
+            "max_batch_size": batcher.max_batch_size,
+            "max_wait_seconds": batcher.max_wait_seconds,
+            "queue_depth": batcher.queue_depth(),
+        }
+        for batcher in (_label_batcher, _ranking_batcher)
+    }
+
+def stop_batching():
+    """Predict the queued descriptions and stop the micro-batching workers."""
+    _label_batcher.stop()
+    _ranking_batcher.stop()
 
 def predict_category(description: str) -> str:
     """
@@ -23,9 +408,7 @@ def predict_category(description: str) -> str:
     and return the predicted category.
     """
     logger.info("Predicting category for description: %s", description)
-    processed_text = preprocess(description)
-    text_vect = vectorizer.transform([processed_text])
-    prediction = model.predict(text_vect)[0]
+    prediction = predict_category_versioned(description)[1]
     logger.info("Predicted category: %s", prediction)
     return prediction
 
@@ -35,10 +418,7 @@ def predict_category_with_confidence(description: str):
     and return the predicted category along with confidence and uncertainty.
     """
     logger.info("Predicting category with confidence for description: %s", description)
-    processed_text = preprocess(description)
-    text_vect = vectorizer.transform([processed_text])
-    prediction = model.predict(text_vect)[0]
-    confidence = max(model.predict_proba(text_vect)[0])
-    is_uncertain = confidence < 0.05  # Define your threshold here
+    (prediction, confidence), = rank_category(description, 1)[1]
+    is_uncertain = confidence < UNCERTAINTY_THRESHOLD
     logger.info("Predicted category: %s, Confidence: %f, Is uncertain: %s", prediction, confidence, is_uncertain)
     return prediction, confidence, is_uncertain
@@ -1,10 +1,94 @@
 # app/transaction_categorization/preprocessing.py
 
 import re
+from functools import lru_cache
+
+# US state and territory codes, stripped with the city before them when
+# they end a description. IN, OR, ME and HI are left out: as words they end
+# too many descriptions.
+_STATE_CODES = (
+    "al ak az ar ca co ct de dc fl ga id il ia ks ky la md ma mi mn ms mo mt ne nv nh nj nm ny "
+    "nc nd oh ok pa ri sc sd tn tx ut vt va wa wv wi wy pr"
+).split()
+# After a store number or another stripped token, whatever ends in a state
+# code is a location, so there every code counts, IN, OR, ME and HI included.
+_ALL_STATE_CODES = _STATE_CODES + "in or me hi".split()
+# Left where a store number, reference or id was stripped, until the city
+# and state after it have been recognised.
+_NOISE = "\x00"
+# First words of multi-word city names (san jose, new york, st louis, ...).
+_CITY_PREFIXES = "san|new|los|las|st|saint|fort|ft|santa|el|north|south|east|west|port|palm|salt|grand|long"
+
+# Ordered (name, pattern, replacement) steps mapping a lower-cased bank
+# description to its merchant key. Order matters: dates go first so
+# fixed-width location columns can be recognised, card suffixes before
+# store numbers, and city and state last, once only words are left. A city
+# and state following a stripped store number or id are removed whatever
+# is left in front, so one merchant gets one key in every city.
+MERCHANT_PIPELINE = [
+    # Dates such as 01/15, 01/15/2025, 2025-01-15 and 15jan.
+    ("dates", re.compile(
+        r"\b(?:\d{1,2}/\d{1,2}(?:/\d{2,4})?|\d{4}-\d{2}-\d{2}|\d{1,2}(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec))\b"
+    ), " "),
+    # Fixed-width exports pad the merchant name and then list city and
+    # state in their own columns: keep the first column only.
+    ("location_columns", re.compile(r"^(\S+(?:\s\S+)*)\s{2,}(?:.*\s)?[a-z]{2}\s*$"), r"\1"),
+    # Card network and terminal prefixes.
+    ("payment_prefix", re.compile(
+        r"^(?:pos(?:\s+(?:purchase|debit))?|debit card (?:purchase|payment)|check ?card|(?:card|visa|mc) purchase|"
+        r"purchase authorized on|recurring (?:payment|purchase))\s+"
+    ), ""),
+    # Masked card numbers and card suffixes: xxxx1234, ****1234, card 1234.
+    ("card_suffix", re.compile(r"(?:[x*]{2,}\d{2,}|\bcard\s*(?:ending\s*(?:in)?\s*)?\d{4}\b)"), " "),
+    # Reference and confirmation numbers: ref 12ab34, conf# 998877, id: 1a2b3c.
+    ("reference", re.compile(r"\b(?:ref|reference|conf|confirmation|trace|auth|id|txn)\s*[#:.]?\s*[a-z0-9]*\d[a-z0-9]*\b"), f" {_NOISE} "),
+    # Store numbers: #1234, store 1234, sto 0021.
+    ("store_number", re.compile(r"\b(?:store|str|sto|no)\s*\.?\s*#?\s*\d+\b|#\s*\d+"), f" {_NOISE} "),
+    # Web addresses keep their name only: netflix.com/bill -> netflix.
+    ("domain", re.compile(r"\.(?:com|net|org)\b(?:/\S*)?"), " "),
+    # Long tokens mixing letters and digits are transaction ids.
+    ("id_tokens", re.compile(r"\b(?=[a-z]*\d)(?=\d*[a-z])[a-z0-9]{8,}\b"), f" {_NOISE} "),
+    # Remaining numbers of three or more digits (phone fragments, terminals).
+    ("numbers", re.compile(r"\b\d{3,}\b"), f" {_NOISE} "),
+    ("punctuation", re.compile(r"[^\w\s" + _NOISE + r"]"), ""),
+    ("whitespace", re.compile(r"\s+"), " "),
+    # City and state (or a state alone) after a stripped token, with any
+    # number of words in front: "starbucks #1234 seattle wa" -> "starbucks".
+    ("noise_city_state", re.compile(
+        r"^(.*?\w.*?) " + _NOISE + r"(?: " + _NOISE + r")*(?: (?:(?:" + _CITY_PREFIXES + r") )?[a-z]\S*)? (?:"
+        + "|".join(_ALL_STATE_CODES) + r")$"
+    ), r"\1"),
+    ("noise", re.compile(_NOISE), " "),
+    ("noise_whitespace", re.compile(r"\s+"), " "),
+    ("trim", re.compile(r"^ | $"), ""),
+    # City and state ending a description. Both are only stripped when at
+    # least two words are left in front, so "just energy tx" keeps "energy";
+    # a lone state code only needs two words before it.
+    ("city_state", re.compile(
+        r"^(\S+ \S+.*?) (?:(?:" + _CITY_PREFIXES + r") )?\S+ (?:" + "|".join(_STATE_CODES) + r")$"
+    ), r"\1"),
+    ("state_code", re.compile(r"^(\S+ \S+.*?) (?:" + "|".join(_STATE_CODES) + r")$"), r"\1"),
+]
+
+@lru_cache(maxsize=65536)
+def merchant_key(text: str) -> str:
+    """
+    Map a raw bank description to a canonical merchant key.
+
+    Lower-cases the description and runs MERCHANT_PIPELINE over it, so
+    "POS PURCHASE STARBUCKS STORE #1234" and "Starbucks 01/15 #987" both
+    become "starbucks". Descriptions left empty by the pipeline fall back
+    to the lower-cased text without punctuation.
+    """
+    lowered = text.lower().strip()
+    key = lowered
+    for _, pattern, replacement in MERCHANT_PIPELINE:
+        key = pattern.sub(replacement, key)
+    key = key.strip()
+    if not key:
+        key = re.sub(r'[^\w\s]', '', lowered)
+    return key
 
 def preprocess(text: str) -> str:
-    """Basic text preprocessing: lowercasing, stripping whitespace, and removing punctuation."""
-    text = text.lower().strip()
-    # Remove punctuation (you can expand this with more robust cleaning)
-    text = re.sub(r'[^\w\s]', '', text)
-    return text
+    """Preprocessing shared by training and prediction: the description's merchant key."""
+    return merchant_key(text)
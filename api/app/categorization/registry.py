@@ -0,0 +1,166 @@
+# app/categorization/registry.py
+"""
+Versioned registry of categorizer artifacts.
+
+Every published model gets its own directory, named after its version,
+holding the compact artifact (see compact.py) and a metadata.json with its
+classes, training size, accuracy and the SHA-256 of the artifact. A file
+named ACTIVE holds the version to serve. Publishing and activating only
+ever rename complete files and directories into place, so readers never
+see half-written ones; API processes poll ACTIVE and swap models as it
+changes (see model.get_model).
+
+    <registry>/
+        ACTIVE
+        20261018T081500-3f2a9c1d/
+            metadata.json
+            transaction_categorizer.npz
+
+Like compact.py, this module has no imports from the app so training.py,
+which runs as a script, can publish models.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import List, Optional
+
+try:
+    from .compact import load_compact, save_compact
+except ImportError:
+    # Imported by training.py, which runs as a script next to this module.
+    from compact import load_compact, save_compact
+
+ACTIVE_FILE = "ACTIVE"
+METADATA_FILE = "metadata.json"
+ARTIFACT_FILE = "transaction_categorizer.npz"
+
+_VERSION_PATTERN = re.compile(r"[\w.-]+")
+
+def _checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _version_dir(registry_dir: str, version: str) -> str:
+    """
+    The directory of a version.
+
+    :raises ValueError: If the version name is not a plain directory name.
+    """
+    if not _VERSION_PATTERN.fullmatch(version) or version.startswith("."):
+        raise ValueError(f"Invalid model version {version!r}.")
+    return os.path.join(registry_dir, version)
+
+def publish(model, vectorizer, registry_dir: str, training_size: int,
+            accuracy: Optional[float] = None, activate: bool = True, report: Optional[dict] = None) -> str:
+    """
+    Add a trained model to the registry as a new version.
+
+    :param training_size: Number of examples the model was trained on.
+    :param accuracy: Accuracy on the held-out split, if measured.
+    :param activate: Make the new version the one API processes serve.
+    :param report: JSON-serializable details of the training run, stored with the metadata.
+    :return: The new version.
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=registry_dir)
+    try:
+        # mkdtemp makes the directory private; API processes may run as another user.
+        os.chmod(staging, 0o755)
+        artifact_path = os.path.join(staging, ARTIFACT_FILE)
+        save_compact(model, vectorizer, artifact_path)
+        checksum = _checksum(artifact_path)
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        version = f"{created_at:%Y%m%dT%H%M%S}-{checksum[:8]}"
+        metadata = {
+            "version": version,
+            "created_at": created_at.isoformat(),
+            "classes": [str(label) for label in model.classes_],
+            "training_size": int(training_size),
+            "accuracy": accuracy,
+            "checksum": checksum,
+        }
+        if report is not None:
+            metadata["report"] = report
+        with open(os.path.join(staging, METADATA_FILE), "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.rename(staging, _version_dir(registry_dir, version))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if activate:
+        activate_version(registry_dir, version)
+    return version
+
+def read_metadata(registry_dir: str, version: str) -> dict:
+    """
+    The metadata of a version.
+
+    :raises FileNotFoundError: If the version does not exist.
+    """
+    with open(os.path.join(_version_dir(registry_dir, version), METADATA_FILE)) as f:
+        return json.load(f)
+
+def list_versions(registry_dir: str) -> List[dict]:
+    """The metadata of every published version, oldest first."""
+    if not os.path.isdir(registry_dir):
+        return []
+    versions = []
+    for name in os.listdir(registry_dir):
+        if name.startswith(".") or not os.path.isfile(os.path.join(registry_dir, name, METADATA_FILE)):
+            continue
+        versions.append(read_metadata(registry_dir, name))
+    return sorted(versions, key=lambda metadata: metadata["created_at"])
+
+def active_version(registry_dir: str) -> Optional[str]:
+    """The version to serve, or None if none was activated."""
+    try:
+        with open(os.path.join(registry_dir, ACTIVE_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def verify(registry_dir: str, version: str) -> dict:
+    """
+    Check a version's artifact against the checksum in its metadata.
+
+    :return: The version's metadata.
+    :raises FileNotFoundError: If the version does not exist.
+    :raises ValueError: If the artifact does not match its checksum.
+    """
+    metadata = read_metadata(registry_dir, version)
+    checksum = _checksum(os.path.join(_version_dir(registry_dir, version), ARTIFACT_FILE))
+    if checksum != metadata["checksum"]:
+        raise ValueError(f"Artifact of model version {version} does not match its checksum.")
+    return metadata
+
+def activate_version(registry_dir: str, version: str):
+    """
+    Make a verified version the one to serve.
+
+    :raises FileNotFoundError: If the version does not exist.
+    :raises ValueError: If the artifact does not match its checksum.
+    """
+    verify(registry_dir, version)
+    tmp_path = os.path.join(registry_dir, f".{ACTIVE_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(registry_dir, ACTIVE_FILE))
+
+def load_version(registry_dir: str, version: str):
+    """
+    Load a verified version.
+
+    :return: The (classifier, vectorizer, metadata) triple.
+    :raises FileNotFoundError: If the version does not exist.
+    :raises ValueError: If the artifact does not match its checksum.
+    """
+    metadata = verify(registry_dir, version)
+    model, vectorizer = load_compact(os.path.join(_version_dir(registry_dir, version), ARTIFACT_FILE))
+    return model, vectorizer, metadata
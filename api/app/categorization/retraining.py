@@ -0,0 +1,222 @@
+# app/categorization/retraining.py
+"""
+Offline retraining of the categorizer on users' category corrections.
+
+Streams every correction, joined with its transaction's description and
+the corrected category's name, through a server-side cursor; merges them
+with default_rules, one example per distinct preprocessed description;
+picks hyperparameters by cross-validated grid search, with the folds fitted
+in parallel by joblib; and publishes the model to the registry (see
+registry.py) with a report of the run. Run from the ``api`` directory:
+
+    python -m app.categorization.retraining [--features tfidf|hashing] [--cv 5] [--n-jobs -1]
+        [--no-activate] [--report report.json]
+
+Labels of a description are decided by vote. Each user's latest correction
+of a description counts once; corrections outvote default_rules, which
+only label descriptions nobody corrected. Categories are per user, so only
+corrections to categories default_rules knows are learned unless
+``--include-custom-categories`` is given: a category one user made up
+means nothing to the others.
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.pipeline import Pipeline
+from sqlalchemy.orm import Session
+
+from . import registry
+from .default_rules import default_rules
+from .preprocessing import preprocess
+from .training import HASHING_FEATURES, REGISTRY_DIR, build_vectorizer
+from ..models.models import Category, CategoryCorrections, Transaction
+from ..utils.logger import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Rows fetched from the server-side cursor at a time.
+STREAM_BATCH_SIZE = int(os.getenv("RETRAINING_BATCH_SIZE", "5000"))
+
+def stream_corrections(db: Session, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Tuple[str, str, str]]:
+    """
+    Every category correction, oldest first, as (user id, transaction
+    description, corrected category name).
+
+    Rows are fetched ``batch_size`` at a time through a server-side cursor,
+    so memory does not grow with the size of the table.
+    """
+    query = (
+        db.query(CategoryCorrections.user_id, Transaction.description, Category.name)
+        .join(Transaction, CategoryCorrections.transaction_id == Transaction.id)
+        .join(Category, CategoryCorrections.new_category_id == Category.id)
+        .filter(Transaction.description.isnot(None))
+        .order_by(CategoryCorrections.id)
+        .yield_per(batch_size)
+    )
+    for user_id, description, category in query:
+        yield user_id, description, category
+
+def _vote(counts: Counter) -> str:
+    # Counter.most_common keeps insertion order among ties: the label seen first wins.
+    return counts.most_common(1)[0][0]
+
+def load_training_data(db: Session, include_custom_categories: bool = False,
+                       batch_size: int = STREAM_BATCH_SIZE) -> Tuple[List[str], List[str], dict]:
+    """
+    Merge default_rules with the users' corrections into deduplicated examples.
+
+    :param db: Database session.
+    :param include_custom_categories: Also learn corrections to categories default_rules does not know.
+    :param batch_size: Rows fetched from the server-side cursor at a time.
+    :return: The preprocessed descriptions, their labels, and counts describing the merge.
+    """
+    default_votes: Dict[str, Counter] = {}
+    for rule in default_rules:
+        default_votes.setdefault(preprocess(rule["description"]), Counter())[rule["category"]] += 1
+    known_categories = {rule["category"] for rule in default_rules}
+
+    # A user's later correction of a description replaces their earlier one.
+    latest: Dict[Tuple[str, str], str] = {}
+    streamed = skipped = 0
+    for user_id, description, category in stream_corrections(db, batch_size):
+        streamed += 1
+        if not include_custom_categories and category not in known_categories:
+            skipped += 1
+            continue
+        latest[(user_id, preprocess(description))] = category
+
+    correction_votes: Dict[str, Counter] = {}
+    for (_, text), category in latest.items():
+        correction_votes.setdefault(text, Counter())[category] += 1
+
+    examples = {text: _vote(votes) for text, votes in default_votes.items()}
+    relabeled = sum(1 for text, votes in correction_votes.items() if text in examples and examples[text] != _vote(votes))
+    examples.update((text, _vote(votes)) for text, votes in correction_votes.items())
+    # Descriptions without words cannot be learned from.
+    examples.pop("", None)
+
+    texts = list(examples)
+    labels = [examples[text] for text in texts]
+    stats = {
+        "default_rules": len(default_rules),
+        "corrections": streamed,
+        "corrections_skipped": skipped,
+        "corrected_descriptions": len(correction_votes),
+        "relabeled_descriptions": relabeled,
+        "examples": len(texts),
+        "duplicates_removed": len(default_rules) + streamed - skipped - len(texts),
+        "classes": len(set(labels)),
+    }
+    return texts, labels, stats
+
+def param_grid(features: str) -> dict:
+    """Hyperparameters searched for a feature mode."""
+    ngram_param = "vectorizer__hashingvectorizer__ngram_range" if features == "hashing" else "vectorizer__ngram_range"
+    return {
+        "classifier__C": [1.0, 3.0, 10.0, 30.0],
+        ngram_param: [(1, 1), (1, 2)],
+    }
+
+def retrain(db: Session, features: str = "tfidf", n_features: int = HASHING_FEATURES,
+            cv: int = 5, n_jobs: int = -1, grid: Optional[dict] = None,
+            registry_dir: str = REGISTRY_DIR, activate: bool = True,
+            include_custom_categories: bool = False) -> dict:
+    """
+    Retrain the categorizer on default_rules and the users' corrections, and
+    publish it to the registry.
+
+    Hyperparameters are picked by a ``cv``-fold grid search on 80% of the
+    examples, run on ``n_jobs`` joblib workers; the rest measures the
+    accuracy of the best model, which is then refitted on all the examples.
+
+    :param db: Database session.
+    :param features: Feature mode, "tfidf" or "hashing" (see training.build_vectorizer).
+    :param n_features: Width of the hashed feature space (hashing only).
+    :param cv: Number of cross-validation folds.
+    :param n_jobs: Parallel workers for the grid search; -1 uses every CPU.
+    :param grid: Hyperparameters to search, as for GridSearchCV; defaults to param_grid(features).
+    :param registry_dir: Registry the model is published to.
+    :param activate: Make the new version the one API processes serve.
+    :param include_custom_categories: Also learn corrections to categories default_rules does not know.
+    :return: The report of the run, including the published version.
+    """
+    timings = {}
+    start = time.perf_counter()
+    texts, labels, data = load_training_data(db, include_custom_categories)
+    timings["load_seconds"] = time.perf_counter() - start
+    logger.info(f"Retraining on {data['examples']} examples from {data['corrections']} corrections")
+
+    pipeline = Pipeline([
+        ("vectorizer", build_vectorizer(features, n_features)),
+        ("classifier", LogisticRegression(max_iter=1000)),
+    ])
+    X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42)
+    search = GridSearchCV(pipeline, grid or param_grid(features), cv=cv, n_jobs=n_jobs)
+    step = time.perf_counter()
+    search.fit(X_train, y_train)
+    timings["search_seconds"] = time.perf_counter() - step
+    accuracy = float(search.best_estimator_.score(X_test, y_test))
+    logger.info(f"Best parameters {search.best_params_}, held-out accuracy {accuracy:.3f}")
+
+    step = time.perf_counter()
+    best = search.best_estimator_.fit(texts, labels)
+    timings["fit_seconds"] = time.perf_counter() - step
+
+    report = {
+        "features": features,
+        "data": data,
+        "best_params": {name: list(value) if isinstance(value, tuple) else value
+                        for name, value in search.best_params_.items()},
+        "cv_folds": cv,
+        "cv_accuracy": float(search.best_score_),
+        "holdout_accuracy": accuracy,
+        "candidates": len(search.cv_results_["params"]),
+        "timings": timings,
+    }
+    step = time.perf_counter()
+    version = registry.publish(
+        best.named_steps["classifier"], best.named_steps["vectorizer"], registry_dir,
+        training_size=len(texts), accuracy=accuracy, activate=activate, report=report,
+    )
+    timings["publish_seconds"] = time.perf_counter() - step
+    timings["total_seconds"] = time.perf_counter() - start
+    report["version"] = version
+    logger.info(f"Published model version {version} in {timings['total_seconds']:.1f}s")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain the transaction categorizer on users' corrections.")
+    parser.add_argument("--features", choices=["tfidf", "hashing"], default="tfidf")
+    parser.add_argument("--n-features", type=int, default=HASHING_FEATURES,
+                        help="Width of the hashed feature space (hashing only).")
+    parser.add_argument("--cv", type=int, default=5, help="Number of cross-validation folds.")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel grid search workers; -1 uses every CPU.")
+    parser.add_argument("--registry-dir", default=REGISTRY_DIR)
+    parser.add_argument("--no-activate", action="store_true",
+                        help="Publish without serving; activate later through POST /categories/model/reload.")
+    parser.add_argument("--include-custom-categories", action="store_true",
+                        help="Also learn corrections to categories default_rules does not know.")
+    parser.add_argument("--report", help="Also write the report of the run to this JSON file.")
+    args = parser.parse_args()
+
+    from ..database.database import SessionLocal
+    db = SessionLocal()
+    try:
+        result = retrain(
+            db, args.features, args.n_features, cv=args.cv, n_jobs=args.n_jobs,
+            registry_dir=args.registry_dir, activate=not args.no_activate,
+            include_custom_categories=args.include_custom_categories,
+        )
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
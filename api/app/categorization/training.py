@@ -1,16 +1,58 @@
 # app/transaction_categorization/training.py
 
+import argparse
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
 import joblib
 import os
 
-from preprocessing import preprocess
-from default_rules import default_rules
+try:
+    from .compact import save_compact
+    from . import registry
+    from .preprocessing import preprocess
+    from .default_rules import default_rules
+except ImportError:
+    # Run as a script from this directory.
+    from compact import save_compact
+    import registry
+    from preprocessing import preprocess
+    from default_rules import default_rules
 
-def train_model():
+def save_artifact(obj, path):
+    """
+    Dump an artifact uncompressed, so its arrays can be memory-mapped by the
+    API, and swap it in with a rename: processes that mapped the previous
+    file keep reading it instead of seeing it rewritten underneath them.
+    """
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+
+# Width of the hashed feature space. It is fixed, so retraining on new
+# descriptions never changes the shape of the model, and no vocabulary is
+# stored; see benchmarks/bench_feature_modes.py for the accuracy, latency
+# and memory of other widths.
+HASHING_FEATURES = 2 ** 14
+
+def build_vectorizer(features: str = "tfidf", n_features: int = HASHING_FEATURES):
+    """
+    The text vectorizer of a feature mode: "tfidf" fits a vocabulary,
+    "hashing" hashes terms into ``n_features`` columns and only fits idf weights.
+    """
+    if features == "hashing":
+        return make_pipeline(
+            HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None),
+            TfidfTransformer(),
+        )
+    return TfidfVectorizer()
+
+# Registry that --publish adds versions to; the API reads the same variable.
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "registry"))
+
+def train_model(features: str = "tfidf", n_features: int = HASHING_FEATURES, publish: bool = False):
     # Convert default rules into a DataFrame
     df = pd.DataFrame(default_rules)
     df['clean_desc'] = df['description'].apply(preprocess)
@@ -20,7 +62,7 @@ def train_model():
     y = df['category']
 
     # Vectorize the text using TF-IDF
-    vectorizer = TfidfVectorizer()
+    vectorizer = build_vectorizer(features, n_features)
     X_vect = vectorizer.fit_transform(X)
 
     # Use a simple train/test split (if the dataset is small, consider using all data for training)
@@ -36,9 +78,22 @@ def train_model():
 
     # Save the model and vectorizer for later use in the API
     current_dir = os.path.dirname(__file__)
-    joblib.dump(model, os.path.join(current_dir, "transaction_categorizer.pkl"))
-    joblib.dump(vectorizer, os.path.join(current_dir, "tfidf_vectorizer.pkl"))
+    save_artifact(model, os.path.join(current_dir, "transaction_categorizer.pkl"))
+    save_artifact(vectorizer, os.path.join(current_dir, "tfidf_vectorizer.pkl"))
+    # The API serves this export; the pickles stay for MODEL_FORMAT=pickle.
+    save_compact(model, vectorizer, os.path.join(current_dir, "transaction_categorizer.npz"))
     print("Model and vectorizer saved.")
+    if publish:
+        # Running API processes swap to the new version on their next check.
+        version = registry.publish(model, vectorizer, REGISTRY_DIR, training_size=X_train.shape[0], accuracy=accuracy)
+        print(f"Published and activated model version {version} in {REGISTRY_DIR}.")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the transaction categorizer.")
+    parser.add_argument("--features", choices=["tfidf", "hashing"], default="tfidf")
+    parser.add_argument("--n-features", type=int, default=HASHING_FEATURES,
+                        help="Width of the hashed feature space (hashing only).")
+    parser.add_argument("--publish", action="store_true",
+                        help="Also add the model to the registry as a new version and activate it.")
+    args = parser.parse_args()
+    train_model(args.features, args.n_features, args.publish)
@@ -0,0 +1,169 @@
+# app/database/bulk_writer.py
+import csv
+import io
+import uuid
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..utils.logger import get_logger
+
+# Set up logging
+logger = get_logger(__name__)
+
+# Marker written for NULL values in the COPY stream.
+COPY_NULL = "\\N"
+# Dialects whose insert() supports ON CONFLICT DO NOTHING.
+ON_CONFLICT_DIALECTS = {"postgresql": postgresql, "sqlite": sqlite}
+# Conflict keys looked up per query on other dialects.
+CONFLICT_LOOKUP_BATCH = 500
+
+def _with_defaults(table, rows: Sequence[Dict]) -> List[Dict]:
+    """
+    Fill in client-side column defaults (``default=...`` on the model) that
+    the rows leave out, since COPY bypasses SQLAlchemy's default handling.
+    Callable defaults are evaluated once per batch.
+    """
+    provided = set(rows[0].keys())
+    defaults = {}
+    for column in table.columns:
+        if column.name in provided or column.default is None or column.primary_key:
+            continue
+        default = column.default
+        if default.is_scalar:
+            defaults[column.name] = default.arg
+        elif default.is_callable:
+            defaults[column.name] = default.arg(None)
+    if not defaults:
+        return list(rows)
+    return [{**defaults, **row} for row in rows]
+
+def _copy_value(value):
+    """Render a value for a CSV-format COPY stream."""
+    if value is None:
+        return COPY_NULL
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+def _copy_rows(db: Session, table, rows: List[Dict], conflict_columns: Optional[Sequence[str]]) -> int:
+    """
+    Stream rows into ``table`` with ``COPY ... FROM STDIN`` on the session's connection.
+
+    COPY cannot skip conflicting rows, so when ``conflict_columns`` is given the
+    rows are copied into a temporary staging table and moved across with a
+    single ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``.
+    """
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[column]) for column in columns])
+    buffer.seek(0)
+
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    target = table.name
+    if conflict_columns:
+        target = f"bulk_{table.name}_{uuid.uuid4().hex[:12]}"
+    cursor = db.connection().connection.cursor()
+    try:
+        if conflict_columns:
+            cursor.execute(
+                f"CREATE TEMP TABLE {target} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {table.name} WITH NO DATA"
+            )
+        cursor.copy_expert(
+            f"COPY {target} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer
+        )
+        if not conflict_columns:
+            return len(rows)
+        conflict_list = ", ".join(f'"{column}"' for column in conflict_columns)
+        cursor.execute(
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {target} "
+            f"ON CONFLICT ({conflict_list}) DO NOTHING"
+        )
+        inserted = cursor.rowcount
+        cursor.execute(f"DROP TABLE {target}")
+        return inserted
+    finally:
+        cursor.close()
+
+def _supports_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+def _insert_statement(db: Session, table, conflict_columns: Optional[Sequence[str]]):
+    """``insert()``, skipping conflicting rows when the dialect supports ON CONFLICT, else None."""
+    if not conflict_columns:
+        return insert(table)
+    dialect = ON_CONFLICT_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect is None:
+        return None
+    return dialect.insert(table).on_conflict_do_nothing(index_elements=list(conflict_columns))
+
+def _skip_existing(db: Session, table, rows: List[Dict], conflict_columns: Sequence[str]) -> List[Dict]:
+    """
+    Drop the rows whose conflict key is already in ``table`` or repeats an
+    earlier row, for dialects without ON CONFLICT. Keys with a NULL never
+    conflict, as in a unique index. A row committed by another transaction
+    between the lookup and the insert still fails the batch.
+    """
+    key_columns = [table.c[name] for name in conflict_columns]
+
+    def key_of(row: Dict) -> tuple:
+        return tuple(row.get(name) for name in conflict_columns)
+
+    keys = list({key for key in map(key_of, rows) if None not in key})
+    existing = set()
+    for start in range(0, len(keys), CONFLICT_LOOKUP_BATCH):
+        batch = keys[start:start + CONFLICT_LOOKUP_BATCH]
+        condition = or_(*(
+            and_(*(column == value for column, value in zip(key_columns, key))) for key in batch
+        ))
+        existing.update(tuple(found) for found in db.execute(select(*key_columns).where(condition)))
+    kept = []
+    for row in rows:
+        key = key_of(row)
+        if None not in key:
+            if key in existing:
+                continue
+            existing.add(key)
+        kept.append(row)
+    return kept
+
+def bulk_insert(db: Session, model, rows: Sequence[Dict], conflict_columns: Optional[Sequence[str]] = None) -> int:
+    """
+    Insert many rows into a model's table within the current session transaction.
+
+    On PostgreSQL with psycopg2 the rows are streamed with ``COPY ... FROM STDIN``;
+    on every other dialect they are written with a single Core ``insert()``
+    executemany. Neither path builds ORM objects. All rows must have the same keys.
+
+    Conflicting rows are skipped with ``ON CONFLICT DO NOTHING`` on PostgreSQL
+    and SQLite; other dialects look up which conflict keys already exist and
+    insert the remaining rows with a plain ``insert()``.
+
+    :param db: The database session (the caller commits).
+    :param model: The ORM model whose table receives the rows.
+    :param rows: Column name to value mappings, one per row.
+    :param conflict_columns: Columns of a unique index; rows that would violate
+        it are skipped instead of failing the batch.
+    :return: The number of rows written.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    rows = _with_defaults(table, rows)
+    if _supports_copy(db):
+        logger.debug("Copying %d rows into %s.", len(rows), table.name)
+        return _copy_rows(db, table, rows, conflict_columns)
+    statement = _insert_statement(db, table, conflict_columns)
+    if statement is None:
+        rows = _skip_existing(db, table, rows, conflict_columns)
+        if not rows:
+            return 0
+        statement = insert(table)
+        conflict_columns = None
+    logger.debug("Inserting %d rows into %s.", len(rows), table.name)
+    result = db.execute(statement, rows)
+    return len(rows) if not conflict_columns else result.rowcount
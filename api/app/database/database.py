@@ -39,3 +39,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_session_factory():
+    """Dependency returning the session factory, for work that outlives the request (background tasks)."""
+    return SessionLocal
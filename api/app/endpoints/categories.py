@@ -1,13 +1,17 @@
+import os
+from typing import List
 from ..utils.logger import get_logger
 from fastapi.responses import JSONResponse
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from ..database.database import get_db
 from ..auth import get_current_user
 from ..models.models import Category, Section
-from ..schemas.schemas import DescriptionRequest
-from ..categorization.model import predict_category_with_confidence
+from ..schemas.schemas import BatchDescriptionRequest, DescriptionRequest, ModelReloadRequest
+from ..categorization.model import MAX_TOP_K, UNCERTAINTY_THRESHOLD, model_info, rank_categories, rank_category, reload_model
+from ..services.category_override_service import get_user_overrides, override_for
+from ..services.user_crud import require_admin
 
 router = APIRouter()
 
@@ -46,20 +50,78 @@ def get_categories(
     return categories_by_section
 
  
+# Most descriptions one call to /predict/batch can predict.
+PREDICT_BATCH_MAX_DESCRIPTIONS = int(os.getenv("PREDICT_BATCH_MAX_DESCRIPTIONS", "1000"))
+
+def _rank_descriptions(db: Session, current_user: dict, descriptions: List[str], top_k: int) -> List[tuple]:
+    """
+    The top_k ranked (category, confidence) pairs of every description, each
+    with the version of the model that predicted its first category.
+
+    A merchant the user has corrected before ranks the corrected category
+    first with full confidence and no model version, followed by the model's
+    alternatives. The model scores all the descriptions that need it in one
+    batch; a lone description is micro-batched with concurrent requests' instead.
+    """
+    overrides = get_user_overrides(db, current_user["sub"])
+    override_ids = [override_for(overrides, description) for description in descriptions]
+    ids = {category_id for category_id in override_ids if category_id is not None}
+    names = dict(db.query(Category.id, Category.name).filter(Category.id.in_(ids)).all()) if ids else {}
+    overridden = [names.get(category_id) for category_id in override_ids]
+
+    # Overridden descriptions only need the model for alternatives.
+    to_score = [i for i, name in enumerate(overridden) if name is None or top_k > 1]
+    if len(descriptions) == 1 and to_score:
+        version, ranking = rank_category(descriptions[0], top_k)
+        ranked = [ranking]
+    else:
+        version, ranked = rank_categories([descriptions[i] for i in to_score], top_k) if to_score else (None, [])
+    scored = dict(zip(to_score, ranked))
+
+    rankings = []
+    for i, name in enumerate(overridden):
+        if name is None:
+            rankings.append((scored[i], version))
+        else:
+            alternatives = [pair for pair in scored.get(i, []) if pair[0] != name]
+            rankings.append((([(name, 1.0)] + alternatives)[:top_k], None))
+    return rankings
+
+def _prediction_content(ranking: list, model_version) -> dict:
+    predicted_category, confidence = ranking[0]
+    return {
+        "predicted_category": predicted_category,
+        "confidence": confidence,
+        "is_uncertain": str(confidence < UNCERTAINTY_THRESHOLD),
+        "predictions": [{"category": category, "confidence": probability} for category, probability in ranking],
+        "model_version": model_version,
+    }
+
+def _require_admin(db: Session, current_user: dict):
+    """
+    :raises HTTPException: 403 if the current user is not an administrator.
+    """
+    require_admin(db, current_user, "Only administrators can manage the categorization model.")
+
 @router.post("/predict", summary="Predict category for a transaction")
 def predict_category_endpoint(
     request: DescriptionRequest,
+    top_k: int = Query(1, ge=1, le=MAX_TOP_K, description="Number of ranked categories to return."),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Predict the category for a given transaction description.
-    The prediction is based on a pre-trained model.
+    A merchant the user has corrected before gets the corrected category with
+    full confidence; otherwise the prediction is based on a pre-trained model.
 
     :param request (DescriptionRequest): The request containing the transaction description.
+    :param top_k (int): Number of categories returned under "predictions", most probable first.
     :param db (Session): Database session dependency.
     :param current_user (dict): Current authenticated user dependency.
-    :return JSONResponse: A response containing the predicted category, confidence, and uncertainty.
+    :return JSONResponse: A response containing the predicted category, confidence, uncertainty,
+        the top_k ranked predictions and the version of the model that predicted (null when the
+        category comes from the user's corrections).
     """
     description = request.description
     if not description:
@@ -67,15 +129,81 @@ def predict_category_endpoint(
         raise HTTPException(status_code=400, detail="Description is required.") 
     
     logger.info(f"Predicting category for description: {description}")
+    content = _prediction_content(*_rank_descriptions(db, current_user, [description], top_k)[0])
+    logger.info(f"Predicted category: {content['predicted_category']}, Confidence: {content['confidence']}, Uncertain: {content['is_uncertain']}")
     
-    # Use the pre-trained model to predict the category
-    predicted_category, confidence, is_uncertain = predict_category_with_confidence(description)
-    logger.info(f"Predicted category: {predicted_category}, Confidence: {confidence}, Uncertain: {is_uncertain}")
-    
-    return JSONResponse(
-        content={
-            "predicted_category": predicted_category,
-            "confidence": confidence,
-            "is_uncertain": str(is_uncertain)
-        }
-    )
\ No newline at end of file
+    return JSONResponse(content=content)
+
+@router.post("/predict/batch", summary="Predict categories for several transactions")
+def predict_categories_batch_endpoint(
+    request: BatchDescriptionRequest,
+    top_k: int = Query(1, ge=1, le=MAX_TOP_K, description="Number of ranked categories to return per description."),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Predict the categories of up to PREDICT_BATCH_MAX_DESCRIPTIONS descriptions
+    in one request, scored by the model in a single batch.
+
+    :param request (BatchDescriptionRequest): The request containing the transaction descriptions.
+    :param top_k (int): Number of categories returned under "predictions" for each description.
+    :param db (Session): Database session dependency.
+    :param current_user (dict): Current authenticated user dependency.
+    :return JSONResponse: One prediction per description, in request order, shaped like /predict responses.
+    :raises HTTPException: If no descriptions, an empty one, or too many are given.
+    """
+    descriptions = request.descriptions
+    if not descriptions or not all(descriptions):
+        logger.error("Batch prediction requested with missing descriptions.")
+        raise HTTPException(status_code=400, detail="Descriptions are required.")
+    if len(descriptions) > PREDICT_BATCH_MAX_DESCRIPTIONS:
+        logger.error(f"Batch prediction requested for {len(descriptions)} descriptions.")
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {PREDICT_BATCH_MAX_DESCRIPTIONS} descriptions can be predicted at once.",
+        )
+
+    logger.info(f"Predicting categories for {len(descriptions)} descriptions")
+    rankings = _rank_descriptions(db, current_user, descriptions, top_k)
+    return JSONResponse(content={"predictions": [_prediction_content(*ranking) for ranking in rankings]})
+
+@router.get("/model", summary="Get the served categorization model")
+def get_model_endpoint(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Describe the categorization model this process serves.
+
+    :param current_user (dict): Current authenticated user dependency.
+    :return JSONResponse: The served version, its registry metadata (null for the packaged
+        artifacts) and the metadata of every published version.
+    """
+    return JSONResponse(content=model_info())
+
+@router.post("/model/reload", summary="Activate and reload a categorization model version")
+def reload_model_endpoint(
+    request: ModelReloadRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Make a registry version the active one and serve it from this process at
+    once. Other processes swap to it on their next check; predictions in
+    flight finish on the version they started with.
+
+    :param request (ModelReloadRequest): The version to activate; none reloads the active version.
+    :param db (Session): Database session dependency.
+    :param current_user (dict): Current authenticated user dependency.
+    :return JSONResponse: The version now served.
+    :raises HTTPException: 403 for non-administrators, 404 for an unknown version and
+        400 for an invalid or corrupted one.
+    """
+    _require_admin(db, current_user)
+    try:
+        version = reload_model(request.version)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Model version not found.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"User {current_user['sub']} reloaded the categorization model, now serving {version}")
+    return JSONResponse(content={"version": version})
@@ -0,0 +1,77 @@
+# app/endpoints/categorization_rules.py
+from ..utils.logger import get_logger
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.services.categorization_rule_service import create_rule, delete_rule, list_rules, update_rule
+from app.database.database import get_db
+from app.auth import get_current_user
+from app.schemas.schemas import CategorizationRuleRequest
+
+# Configure logging
+logger = get_logger(__name__)
+router = APIRouter()
+
+@router.get("/", summary="Get all categorization rules")
+def get_rules(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """
+    Retrieve the current user's categorization rules, in the order they are tried.
+
+    :param db (Session): Database session dependency.
+    :param current_user (dict): Current authenticated user dependency.
+    :return list: The rules with the name of their category.
+    """
+    return list_rules(db, current_user)
+
+@router.post("/", summary="Add a categorization rule")
+def add_rule(
+    rule: CategorizationRuleRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Add a rule giving a category to the imported and created transactions it matches.
+
+    :param rule (CategorizationRuleRequest): The pattern, how to match it, the category,
+        optional bounds on the size of the amount and the priority.
+    :param db (Session): Database session dependency.
+    :param current_user (dict): Current authenticated user dependency.
+    :return dict: The created rule.
+    :raises HTTPException: 400 for an invalid rule, 404 for an unknown category.
+    """
+    return create_rule(db, current_user, rule)
+
+@router.put("/{rule_id}", summary="Replace a categorization rule")
+def replace_rule(
+    rule_id: int,
+    rule: CategorizationRuleRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Replace one of the current user's categorization rules.
+
+    :param rule_id (int): ID of the rule to replace.
+    :param rule (CategorizationRuleRequest): The new rule.
+    :param db (Session): Database session dependency.
+    :param current_user (dict): Current authenticated user dependency.
+    :return dict: The updated rule.
+    :raises HTTPException: 400 for an invalid rule, 404 for an unknown rule or category.
+    """
+    return update_rule(db, current_user, rule_id, rule)
+
+@router.delete("/{rule_id}", summary="Delete a categorization rule")
+def remove_rule(
+    rule_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Delete one of the current user's categorization rules.
+
+    :param rule_id (int): ID of the rule to delete.
+    :param db (Session): Database session dependency.
+    :param current_user (dict): Current authenticated user dependency.
+    :return dict: A confirmation message.
+    :raises HTTPException: 404 for an unknown rule.
+    """
+    return delete_rule(db, current_user, rule_id)
@@ -1,4 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from ..auth import get_current_user
+from ..database.database import get_db
+from ..services.user_crud import require_admin
+from ..utils import metrics
 from ..utils.logger import get_logger
 
 # Configure logging
@@ -15,3 +20,22 @@ async def pong():
     """
     logger.info("Ping endpoint hit")
     return {"ping": "pong!"}
+
+@router.get("/metrics", summary="Process metrics")
+def get_metrics(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Counters, gauges and timing summaries recorded by this process since it
+    started, such as rows imported, seconds spent per import stage and the
+    depth of the prediction queues. Administrators only.
+
+    Returns:
+        dict: ``counters`` and ``gauges`` by name, and ``timings`` by name with their count, total and max.
+
+    Raises:
+        HTTPException: 403 if the current user is not an administrator.
+    """
+    require_admin(db, current_user, "Only administrators can read the metrics.")
+    return metrics.snapshot()
@@ -1,7 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, Query, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.services.transaction_import_service import import_transactions_service
-from app.database.database import get_db
+from app.services.import_job_service import (
+    IMPORT_WORKER_MODE,
+    enqueue_import_files,
+    enqueue_import_job,
+    get_import_job,
+    import_job_to_dict,
+    process_import_job,
+)
+from app.services.import_preview_service import commit_import_preview, preview_import
+from app.database.database import get_db, get_session_factory
 from app.auth import get_current_user
 from ..utils.logger import get_logger
 from fastapi.exceptions import RequestValidationError as BadRequestException
@@ -10,31 +19,162 @@ from fastapi import HTTPException as FastAPIHTTPException  # for clarity
 logger = get_logger(__name__)
 router = APIRouter()
 
-@router.post("/import", summary="Upload bank transactions in bulk (standard format)")
-async def import_transactions(
+@router.post("/import", status_code=202, summary="Upload bank transactions in bulk (standard format)")
+def import_transactions(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    sheet: Optional[str] = Form(None),
+    header_row: Optional[int] = Form(None),
     db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Upload a file containing bank transactions in a standard format (CSV or Excel).
     The file should contain columns for date, description, and amount.
-    The endpoint will parse the file and import the transactions into the database.
+    The file is stored and queued as an import job; the response returns
+    immediately with the job, whose progress can be followed with
+    GET /transactions/import/{job_id}. A file that was imported before is
+    not imported again: its job is returned completed, at stage "duplicate".
 
     Args:
         file (UploadFile): The file containing bank transactions.
+        sheet (str, optional): Excel only: worksheet name or zero-based index. Detected when omitted.
+        header_row (int, optional): Excel only: 1-based header row number. Detected when omitted.
         db (Session): Database session dependency.
         current_user (dict): Current authenticated user dependency.
 
     Returns:
-        dict: A message indicating the result of the import operation.
+        dict: The queued import job.
 
     Raises:
-        HTTPException: If the file format is not supported or required columns are missing.
+        HTTPException: If the file format is not supported or the header row is invalid.
     """
     try:
-        return await import_transactions_service(file, db, current_user)
+        job = enqueue_import_job(file, db, current_user, sheet=sheet, header_row=header_row)
     except HTTPException as e:
         raise e
     except Exception as e:
+        logger.error(f"Error queueing import: {e}")
         raise HTTPException(status_code=500, detail="Error importing transactions.")
+    if IMPORT_WORKER_MODE != "external" and job.status == "queued":
+        background_tasks.add_task(process_import_job, session_factory, job.id)
+    return import_job_to_dict(job)
+
+@router.post("/import/batch", status_code=202, summary="Upload several bank statements or zip archives at once")
+def import_transaction_files(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Upload several CSV or Excel statements, or zip archives of them, as one import job.
+    The files are parsed in parallel and merged; transactions repeated across
+    statements with overlapping periods are imported once. Progress can be
+    followed with GET /transactions/import/{job_id}.
+
+    Args:
+        files (List[UploadFile]): The statements or zip archives.
+        db (Session): Database session dependency.
+        current_user (dict): Current authenticated user dependency.
+
+    Returns:
+        dict: The queued import job.
+
+    Raises:
+        HTTPException: If any file format is not supported.
+    """
+    try:
+        job = enqueue_import_files(files, db, current_user)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error queueing batch import: {e}")
+        raise HTTPException(status_code=500, detail="Error importing transactions.")
+    if IMPORT_WORKER_MODE != "external":
+        background_tasks.add_task(process_import_job, session_factory, job.id)
+    return import_job_to_dict(job)
+
+@router.post("/import/preview", summary="Preview the import of a bank statement")
+def preview_transactions_import(
+    file: UploadFile = File(...),
+    limit: int = Query(500, ge=0, description="Maximum number of rows to return"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Parse, categorize and check a CSV or Excel statement for duplicates without
+    importing it. The result is kept for a limited time and can be imported
+    with POST /transactions/import/commit/{preview_id}.
+
+    Args:
+        file (UploadFile): The file containing bank transactions.
+        limit (int): Maximum number of rows to return.
+        db (Session): Database session dependency.
+        current_user (dict): Current authenticated user dependency.
+
+    Returns:
+        dict: The preview id, row counters, and rows with their category and duplicate flag.
+
+    Raises:
+        HTTPException: If the file is not supported, cannot be parsed or is too large to preview.
+    """
+    try:
+        return preview_import(file, db, current_user, limit)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error previewing import: {e}")
+        raise HTTPException(status_code=500, detail="Error previewing transactions.")
+
+@router.post("/import/commit/{preview_id}", summary="Import a previewed bank statement")
+def commit_transactions_import(
+    preview_id: str,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Import exactly the rows of an earlier preview, without parsing or categorizing again.
+
+    Args:
+        preview_id (str): ID returned by POST /transactions/import/preview.
+        db (Session): Database session dependency.
+        current_user (dict): Current authenticated user dependency.
+
+    Returns:
+        dict: A message with the number of rows processed, inserted and skipped.
+
+    Raises:
+        HTTPException: If the preview does not exist or has expired.
+    """
+    try:
+        return commit_import_preview(db, current_user, preview_id)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error committing import preview {preview_id}: {e}")
+        raise HTTPException(status_code=500, detail="Error importing transactions.")
+
+@router.get("/import/{job_id}", summary="Get the progress of an import job")
+def get_import_job_status(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Report the stage and row counters of one of the current user's import jobs.
+
+    Args:
+        job_id (int): ID of the import job.
+        db (Session): Database session dependency.
+        current_user (dict): Current authenticated user dependency.
+
+    Returns:
+        dict: Status, stage, rows processed, rows inserted, rows skipped and any error.
+
+    Raises:
+        HTTPException: If the job does not exist for the current user.
+    """
+    return import_job_to_dict(get_import_job(db, current_user, job_id))
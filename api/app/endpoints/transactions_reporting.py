@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from app.services.transaction_reporting_service import (
     get_transactions_by_month_service,
     get_expense_totals_service,
+    get_merchant_totals_service,
     get_totals_service,
     get_grouped_transactions_service,
     get_history_service,
@@ -75,6 +76,33 @@ def get_expense_totals(
         logger.error(f"Error calculating expense totals: {e}")
         raise HTTPException(status_code=500, detail="Error calculating expense totals.")
 
+@router.get("/merchants/{year}/{month}", summary="Get expense totals per merchant for a month")
+def get_merchant_totals(
+    year: int,
+    month: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Calculate the total expenses per merchant for a given user for a specific year and month.
+    Descriptions of the same merchant (with different store numbers, dates or locations) are grouped together.
+    Args:
+        year (int): The year for which to calculate the merchant totals.
+        month (int): The month for which to calculate the merchant totals.
+        db (Session): The database session dependency.
+        current_user (dict): The current authenticated user dependency.
+    Returns:
+        list: Merchants with their total and number of transactions, largest total first.
+    Raises:
+        HTTPException: If there is an error calculating the merchant totals.
+    """
+    try:
+        logger.info(f"Calculating merchant totals for user {current_user['sub']} for {year}-{month}")
+        return get_merchant_totals_service(db, current_user, year, month)
+    except Exception as e:
+        logger.error(f"Error calculating merchant totals: {e}")
+        raise HTTPException(status_code=500, detail="Error calculating merchant totals.")
+
 @router.get("/totals/{year}/{month}", summary="Get income and expenses totals for a month")
 def get_totals(
     year: int,
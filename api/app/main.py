@@ -1,15 +1,25 @@
+from contextlib import asynccontextmanager
 from .utils.logger import setup_logger
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .database.database import engine, Base
 from .models.models import Base
-from .endpoints import ping, categories, users, transactions_crud, transactions_reporting, transactions_import
+from .endpoints import ping, categories, categorization_rules, users, transactions_crud, transactions_reporting, transactions_import
+from .categorization.model import stop_batching, warmup
 
 # Setup logger
 setup_logger()
 
-app = FastAPI(title="Production-Ready API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the categorization model before serving instead of on the first request.
+    warmup()
+    yield
+    # Answer the predictions still queued before the process exits.
+    stop_batching()
+
+app = FastAPI(title="Production-Ready API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,9 +31,11 @@ app.add_middleware(
 
 # Include routers with optional prefixes and tags
 app.include_router(ping.router)
+app.include_router(categorization_rules.router, prefix="/categories/rules", tags=["Categories"])
 app.include_router(categories.router, prefix="/categories", tags=["Categories"])
 app.include_router(transactions_crud.router, prefix="/transactions")
-app.include_router(transactions_reporting.router, prefix="/transactions")
+# Registered before reporting so /import/{job_id} is not captured by /{year}/{month}.
 app.include_router(transactions_import.router, prefix="/transactions")
+app.include_router(transactions_reporting.router, prefix="/transactions")
 app.include_router(users.router, prefix="/users", tags=["Users"])
 
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index, JSON, func, select, event
+from sqlalchemy.orm import object_session
 from ..database.database import Base
+from ..utils.fingerprint import transaction_fingerprint
 import datetime
 from sqlalchemy.types import DateTime
 class User(Base):
@@ -61,6 +63,44 @@ class Transaction(Base):
     is_imported = Column(Integer, default=0)
     is_manual = Column(Integer, default=0)
     is_linked = Column(Integer, default=0)
+    # Hash of normalized description, date, amount and occurrence ordinal;
+    # cleared when the transaction is deleted.
+    fingerprint = Column(String(64), nullable=True)
+    # Version of the model that predicted the category; None when the
+    # category was given, corrected or came from the user's corrections.
+    model_version = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index('uq_transactions_user_fingerprint', 'user_id', 'fingerprint', unique=True),
+    )
+
+@event.listens_for(Transaction, "before_insert")
+def assign_transaction_fingerprint(mapper, connection, target):
+    """
+    Give transactions created through the ORM the lowest free fingerprint
+    ordinal, so manual entries and later imports of the same transaction
+    are recognised as duplicates. Bulk imports compute fingerprints themselves.
+    """
+    if target.fingerprint is not None or None in (target.description, target.date, target.amount):
+        return
+    session = object_session(target)
+    pending = {
+        obj.fingerprint for obj in (session.new if session is not None else ())
+        if isinstance(obj, Transaction) and obj is not target and obj.fingerprint
+    }
+    ordinal = 1
+    while True:
+        fingerprint = transaction_fingerprint(target.description, target.date, target.amount, ordinal)
+        taken = fingerprint in pending or connection.execute(
+            select(Transaction.id).where(
+                Transaction.user_id == target.user_id,
+                Transaction.fingerprint == fingerprint,
+            ).limit(1)
+        ).first() is not None
+        if not taken:
+            break
+        ordinal += 1
+    target.fingerprint = fingerprint
 
 class Budget(Base):
     __tablename__ = 'budgets'
@@ -88,4 +128,71 @@ class CategoryCorrections(Base):
     old_category_id = Column(Integer, ForeignKey('categories.id'), index=True)
     new_category_id = Column(Integer, ForeignKey('categories.id'), index=True)
     created_at = Column(DateTime, default=datetime.datetime.now)
-    updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+class ImportJob(Base):
+    __tablename__ = 'import_jobs'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey('users.id'), index=True)
+    filename = Column(String)
+    # Directory holding the uploaded file until the job has run.
+    storage_path = Column(String)
+    # Excel only: worksheet name or index and 1-based header row, detected when empty.
+    sheet = Column(String, nullable=True)
+    header_row = Column(Integer, nullable=True)
+    # SHA-256 of the uploaded file; empty for batch imports.
+    content_hash = Column(String(64), nullable=True)
+    # queued -> running -> completed | failed
+    status = Column(String, index=True, default='queued')
+    # Pipeline stage the job is currently in (queued, parsing, categorizing, inserting, done),
+    # or "duplicate" when the same file had already been imported.
+    stage = Column(String, default='queued')
+    rows_processed = Column(Integer, default=0)
+    rows_inserted = Column(Integer, default=0)
+    rows_skipped = Column(Integer, default=0)
+    # Row counters and seconds per stage of a completed import.
+    stats = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class ImportedFile(Base):
+    __tablename__ = 'imported_files'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey('users.id'), index=True)
+    # SHA-256 of the file content, so re-uploads are recognised whatever their name.
+    content_hash = Column(String(64), nullable=False)
+    filename = Column(String)
+    rows_processed = Column(Integer, default=0)
+    rows_inserted = Column(Integer, default=0)
+    rows_skipped = Column(Integer, default=0)
+    # Range of the transaction dates in the file; empty when it had no complete rows.
+    date_from = Column(Date, nullable=True)
+    date_to = Column(Date, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+    __table_args__ = (
+        Index('uq_imported_files_user_hash', 'user_id', 'content_hash', unique=True),
+    )
+
+class CategorizationRule(Base):
+    __tablename__ = 'categorization_rules'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey('users.id'), index=True)
+    category_id = Column(Integer, ForeignKey('categories.id'), index=True)
+    # "contains": the description contains the pattern, ignoring case. The
+    # only type for now; kept so other matchers can be added.
+    match_type = Column(String, default='contains')
+    pattern = Column(String, nullable=False)
+    # Bounds on the size of the amount, whichever way the bank signs it.
+    min_amount = Column(Float, nullable=True)
+    max_amount = Column(Float, nullable=True)
+    # Rules are tried by ascending priority, then creation; the first match wins.
+    priority = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
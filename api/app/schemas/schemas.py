@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 import datetime
-from typing import Optional
+from typing import List, Optional
 
 class UserCreate(BaseModel):
     """UserCreate schema for creating a new user."""
@@ -29,6 +29,14 @@ class DescriptionRequest(BaseModel):
     """DescriptionRequest schema for updating a transaction description."""
     description: str
 
+class BatchDescriptionRequest(BaseModel):
+    """BatchDescriptionRequest schema for predicting the categories of several descriptions."""
+    descriptions: List[str]
+
+class ModelReloadRequest(BaseModel):
+    """ModelReloadRequest schema for activating a categorization model version."""
+    version: Optional[str] = None
+
 
 class NewTransactionRequest(BaseModel):
     """NewTransactionRequest schema for creating a new transaction."""
@@ -42,3 +50,13 @@ class UpdateTransactionRequest(BaseModel):
     transaction_id: int
     category: str
     index_es: Optional[str] = None
+
+class CategorizationRuleRequest(BaseModel):
+    """CategorizationRuleRequest schema for creating or replacing a categorization rule."""
+    pattern: str
+    category: str
+    # Only "contains" is supported.
+    match_type: str = "contains"
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    priority: int = 0
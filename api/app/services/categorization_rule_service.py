@@ -0,0 +1,294 @@
+# app/services/categorization_rule_service.py
+"""
+User-defined categorization rules.
+
+A rule gives a category to the transactions whose description contains a
+text, ignoring case, and whose amount optionally lies within bounds: "anything containing SHELL is Fuel", "over 1000 and
+containing RENT is Rent". Rules are applied on import and when a
+transaction is created, after a category named in the file or the request
+and before the user's corrections and the model.
+
+Each user's rules are compiled into a RuleProgram: one combined regular
+expression that finds, in a single pass per description, the rows any rule
+could match, followed by the rules themselves, evaluated over whole columns
+for those rows only. Programs are cached per user with a signature of the
+user's rules (their number, highest id and latest update), read with one
+aggregate query. Any change, made in any process, changes the signature, so
+the program is compiled again on its next use.
+
+Patterns are matched literally. Rules run over every imported row, and a
+user-supplied regular expression can backtrack for exponential time on a
+short description, so they are not accepted; an alternation of escaped
+literals is matched in time linear in the description.
+"""
+import os
+import re
+import threading
+from typing import List, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.models import CategorizationRule, Category
+from app.schemas.schemas import CategorizationRuleRequest
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MATCH_TYPES = ("contains",)
+# Limits on what one user can define; every rule runs over every imported row.
+MAX_RULES_PER_USER = int(os.getenv("MAX_RULES_PER_USER", "200"))
+MAX_PATTERN_LENGTH = 200
+# Number of users whose compiled rules are kept in memory.
+RULE_PROGRAM_USERS = int(os.getenv("RULE_PROGRAM_USERS", "1000"))
+
+class CompiledRule(NamedTuple):
+    id: int
+    category_id: int
+    pattern: re.Pattern
+    min_amount: Optional[float]
+    max_amount: Optional[float]
+
+class RuleProgram:
+    """A user's rules in priority order, compiled to categorize whole columns at once."""
+
+    def __init__(self, rules: List[CompiledRule]):
+        self.rules = rules
+        self._any = (
+            re.compile("|".join(f"(?:{rule.pattern.pattern})" for rule in rules), re.IGNORECASE)
+            if rules else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _in_bounds(self, rule: CompiledRule, size):
+        inside = True
+        if rule.min_amount is not None:
+            inside = inside & (size >= rule.min_amount)
+        if rule.max_amount is not None:
+            inside = inside & (size <= rule.max_amount)
+        return inside
+
+    def match_frame(self, descriptions: pd.Series, amounts: pd.Series) -> pd.Series:
+        """
+        The category id of the first rule each row matches.
+
+        :param descriptions: Transaction descriptions.
+        :param amounts: Their amounts, on the same index.
+        :return: Category ids on the same index, NaN where no rule matches.
+        """
+        result = pd.Series(np.nan, index=descriptions.index)
+        if self._any is None or descriptions.empty:
+            return result
+        texts = descriptions.astype(str)
+        candidates = texts.str.contains(self._any)
+        if not candidates.any():
+            return result
+        texts = texts[candidates]
+        sizes = amounts[candidates].astype(float).abs()
+        conditions = [
+            (texts.str.contains(rule.pattern) & self._in_bounds(rule, sizes)).to_numpy()
+            for rule in self.rules
+        ]
+        result[candidates] = np.select(conditions, [rule.category_id for rule in self.rules], default=np.nan)
+        return result
+
+    def match(self, description: str, amount: float) -> Optional[int]:
+        """The category id of the first rule one transaction matches, or None."""
+        if self._any is None or not self._any.search(description):
+            return None
+        for rule in self.rules:
+            if rule.pattern.search(description) and self._in_bounds(rule, abs(amount)):
+                return rule.category_id
+        return None
+
+def compile_rules(rules: List[CategorizationRule]) -> RuleProgram:
+    """Compile rules, already in priority order, into a RuleProgram."""
+    return RuleProgram([
+        CompiledRule(
+            rule.id, rule.category_id, re.compile(re.escape(rule.pattern), re.IGNORECASE),
+            rule.min_amount, rule.max_amount,
+        )
+        for rule in rules
+    ])
+
+# user_id -> (signature of the rules compiled, RuleProgram)
+_programs = LRUCache(maxsize=RULE_PROGRAM_USERS)
+_lock = threading.Lock()
+
+def get_rule_program(db: Session, user_id: str) -> RuleProgram:
+    """
+    The user's compiled rules, compiled again if they changed since last used.
+
+    :param db: Database session.
+    :param user_id: ID of the user.
+    :return: The user's RuleProgram; empty (and falsy) when they have no rules.
+    """
+    signature = tuple(
+        db.query(func.count(CategorizationRule.id), func.max(CategorizationRule.id),
+                 func.max(CategorizationRule.updated_at))
+        .filter(CategorizationRule.user_id == user_id)
+        .one()
+    )
+    with _lock:
+        cached = _programs.get(user_id)
+    if cached and cached[0] == signature:
+        return cached[1]
+    rules = (
+        db.query(CategorizationRule)
+        .filter(CategorizationRule.user_id == user_id)
+        .order_by(CategorizationRule.priority, CategorizationRule.id)
+        .all()
+    )
+    program = compile_rules(rules)
+    with _lock:
+        _programs[user_id] = (signature, program)
+    logger.info(f"Compiled {len(program)} categorization rules for user {user_id}")
+    return program
+
+def clear_rule_programs():
+    """Forget every compiled program (tests, or to release memory)."""
+    with _lock:
+        _programs.clear()
+
+def _validate(request: CategorizationRuleRequest):
+    """
+    :raises HTTPException: 400 for an unsupported match type or pattern length, or inconsistent bounds.
+    """
+    if request.match_type not in MATCH_TYPES:
+        raise HTTPException(status_code=400, detail=f"match_type must be one of {', '.join(MATCH_TYPES)}.")
+    if not request.pattern.strip() or len(request.pattern) > MAX_PATTERN_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Pattern must have 1 to {MAX_PATTERN_LENGTH} characters.")
+    for bound in (request.min_amount, request.max_amount):
+        if bound is not None and bound < 0:
+            raise HTTPException(status_code=400, detail="Amount bounds apply to the size of the amount and cannot be negative.")
+    if request.min_amount is not None and request.max_amount is not None and request.min_amount > request.max_amount:
+        raise HTTPException(status_code=400, detail="min_amount cannot be greater than max_amount.")
+
+def _user_category(db: Session, current_user: dict, name: str) -> Category:
+    category = db.query(Category).filter(Category.user_id == current_user["sub"], Category.name == name).first()
+    if not category:
+        logger.warning(f"Category not found for user: {current_user['sub']}, category: {name}")
+        raise HTTPException(status_code=404, detail="Category not found.")
+    return category
+
+def _user_rule(db: Session, current_user: dict, rule_id: int) -> CategorizationRule:
+    rule = db.query(CategorizationRule).filter(
+        CategorizationRule.id == rule_id,
+        CategorizationRule.user_id == current_user["sub"]
+    ).first()
+    if not rule:
+        logger.warning(f"Categorization rule not found for user: {current_user['sub']}, rule_id: {rule_id}")
+        raise HTTPException(status_code=404, detail="Rule not found.")
+    return rule
+
+def _rule_dict(rule: CategorizationRule, category_name: str) -> dict:
+    return {
+        "id": rule.id,
+        "pattern": rule.pattern,
+        "match_type": rule.match_type,
+        "category": category_name,
+        "min_amount": rule.min_amount,
+        "max_amount": rule.max_amount,
+        "priority": rule.priority,
+    }
+
+def _commit(db: Session, current_user: dict, action: str):
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error trying to {action} a categorization rule for user: {current_user['sub']}, error: {e}")
+        raise HTTPException(status_code=500, detail=f"Error trying to {action} the rule.")
+
+def list_rules(db: Session, current_user: dict) -> list:
+    """
+    The current user's rules, in the order they are tried.
+
+    :param db: Database session.
+    :param current_user: Current user information.
+    :return: The rules with the name of their category.
+    """
+    rules = (
+        db.query(CategorizationRule, Category.name)
+        .join(Category, CategorizationRule.category_id == Category.id)
+        .filter(CategorizationRule.user_id == current_user["sub"])
+        .order_by(CategorizationRule.priority, CategorizationRule.id)
+        .all()
+    )
+    return [_rule_dict(rule, category_name) for rule, category_name in rules]
+
+def create_rule(db: Session, current_user: dict, request: CategorizationRuleRequest) -> dict:
+    """
+    Add a rule for the current user.
+
+    :param db: Database session.
+    :param current_user: Current user information.
+    :param request: The rule.
+    :return: The created rule.
+    :raises HTTPException: 400 for an invalid rule or too many rules, 404 for an unknown category.
+    """
+    _validate(request)
+    count = db.query(func.count(CategorizationRule.id)).filter(
+        CategorizationRule.user_id == current_user["sub"]
+    ).scalar()
+    if count >= MAX_RULES_PER_USER:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RULES_PER_USER} rules can be defined.")
+    category = _user_category(db, current_user, request.category)
+    rule = CategorizationRule(
+        user_id=current_user["sub"],
+        category_id=category.id,
+        match_type=request.match_type,
+        pattern=request.pattern,
+        min_amount=request.min_amount,
+        max_amount=request.max_amount,
+        priority=request.priority,
+    )
+    db.add(rule)
+    _commit(db, current_user, "create")
+    db.refresh(rule)
+    logger.info(f"Created categorization rule {rule.id} for user: {current_user['sub']}")
+    return _rule_dict(rule, category.name)
+
+def update_rule(db: Session, current_user: dict, rule_id: int, request: CategorizationRuleRequest) -> dict:
+    """
+    Replace one of the current user's rules.
+
+    :param db: Database session.
+    :param current_user: Current user information.
+    :param rule_id: ID of the rule.
+    :param request: The new rule.
+    :return: The updated rule.
+    :raises HTTPException: 400 for an invalid rule, 404 for an unknown rule or category.
+    """
+    _validate(request)
+    rule = _user_rule(db, current_user, rule_id)
+    category = _user_category(db, current_user, request.category)
+    rule.category_id = category.id
+    rule.match_type = request.match_type
+    rule.pattern = request.pattern
+    rule.min_amount = request.min_amount
+    rule.max_amount = request.max_amount
+    rule.priority = request.priority
+    _commit(db, current_user, "update")
+    logger.info(f"Updated categorization rule {rule_id} for user: {current_user['sub']}")
+    return _rule_dict(rule, category.name)
+
+def delete_rule(db: Session, current_user: dict, rule_id: int) -> dict:
+    """
+    Delete one of the current user's rules.
+
+    :param db: Database session.
+    :param current_user: Current user information.
+    :param rule_id: ID of the rule.
+    :return: A confirmation message.
+    :raises HTTPException: 404 for an unknown rule.
+    """
+    rule = _user_rule(db, current_user, rule_id)
+    db.delete(rule)
+    _commit(db, current_user, "delete")
+    logger.info(f"Deleted categorization rule {rule_id} for user: {current_user['sub']}")
+    return {"detail": "Rule deleted."}
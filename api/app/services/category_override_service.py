@@ -0,0 +1,122 @@
+# app/services/category_override_service.py
+"""
+Per-user category overrides learned from category corrections.
+
+When a user corrects a transaction's category, every later transaction of
+the same merchant should get the corrected category without asking the
+model. Each user's corrections are folded into an index mapping merchant
+key to category id, so the lookup before prediction is a dictionary access.
+
+The index lives in process memory with a signature of the user's
+corrections (their number, highest id and latest update), read with one
+aggregate query. While the signature is unchanged every read returns the
+same read-only index without loading or copying anything. When corrections
+were only added, by this process or another worker, just the rows past the
+last correction id seen are folded in; any other change rebuilds the index.
+"""
+import os
+import threading
+from types import MappingProxyType
+from typing import Mapping, Optional
+from cachetools import LRUCache
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.categorization.preprocessing import merchant_key
+from app.models.models import CategoryCorrections, Transaction
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Number of users whose override index is kept in memory.
+OVERRIDE_INDEX_USERS = int(os.getenv("OVERRIDE_INDEX_USERS", "1000"))
+
+# user_id -> {"signature": (count, highest id, latest update) of the corrections folded in,
+#             "last_id": highest correction id folded in,
+#             "overrides": read-only {merchant key: category id}}
+# An index's overrides are never modified: changes replace them with a new mapping,
+# so a mapping handed out stays consistent while its caller uses it.
+_indexes = LRUCache(maxsize=OVERRIDE_INDEX_USERS)
+_lock = threading.Lock()
+
+def _load_corrections(db: Session, user_id: str, after_id: int) -> list:
+    """The user's corrections past after_id, in id order, with the description of the corrected transaction."""
+    return (
+        db.query(CategoryCorrections.id, CategoryCorrections.new_category_id,
+                 CategoryCorrections.updated_at, Transaction.description)
+        .outerjoin(Transaction, CategoryCorrections.transaction_id == Transaction.id)
+        .filter(CategoryCorrections.user_id == user_id, CategoryCorrections.id > after_id)
+        .order_by(CategoryCorrections.id)
+        .all()
+    )
+
+def get_user_overrides(db: Session, user_id: str) -> Mapping[str, int]:
+    """
+    The user's override index, synced with corrections committed since it was last read.
+
+    Later corrections of the same merchant win. The returned mapping is
+    read-only and is not updated by later corrections.
+
+    :param db: Database session.
+    :param user_id: ID of the user.
+    :return: Merchant key -> corrected category id.
+    """
+    signature = tuple(
+        db.query(func.count(CategoryCorrections.id), func.max(CategoryCorrections.id),
+                 func.max(CategoryCorrections.updated_at))
+        .filter(CategoryCorrections.user_id == user_id)
+        .one()
+    )
+    with _lock:
+        index = _indexes.get(user_id)
+    if index and index["signature"] == signature:
+        return index["overrides"]
+
+    appended = False
+    if index:
+        rows = _load_corrections(db, user_id, index["last_id"])
+        updates = [row.updated_at for row in rows if row.updated_at is not None]
+        if index["signature"][2] is not None:
+            updates.append(index["signature"][2])
+        # Anything but new corrections (an updated or deleted one) needs a rebuild.
+        appended = signature[0] == index["signature"][0] + len(rows) and signature[2] == max(updates, default=None)
+    if appended:
+        overrides = dict(index["overrides"])
+        last_id = index["last_id"]
+    else:
+        rows = _load_corrections(db, user_id, 0)
+        overrides = {}
+        last_id = 0
+    for correction_id, category_id, _, description in rows:
+        if description and category_id is not None:
+            overrides[merchant_key(description)] = category_id
+        last_id = correction_id
+    index = {"signature": signature, "last_id": last_id, "overrides": MappingProxyType(overrides)}
+    with _lock:
+        _indexes[user_id] = index
+    logger.debug(f"Synced {len(rows)} category corrections for user {user_id}.")
+    return index["overrides"]
+
+def record_correction(user_id: str, correction_id: int, description: str, category_id: int):
+    """
+    Fold a just-committed correction into the user's index, if it is loaded.
+
+    The signature and last_id are left alone: corrections committed by other
+    processes may sit between last_id and this one, and the next read sees
+    the changed signature and replays them together with this one in id order.
+    """
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is None or correction_id <= index["last_id"] or not description:
+            return
+        overrides = dict(index["overrides"])
+        overrides[merchant_key(description)] = category_id
+        _indexes[user_id] = {**index, "overrides": MappingProxyType(overrides)}
+
+def override_for(overrides: Mapping[str, int], description: str) -> Optional[int]:
+    """The corrected category id for a description, or None if its merchant was never corrected."""
+    return overrides.get(merchant_key(description)) if overrides else None
+
+def clear_overrides():
+    """Forget all loaded indexes; they are rebuilt from the database on the next read."""
+    with _lock:
+        _indexes.clear()
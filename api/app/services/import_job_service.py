@@ -0,0 +1,263 @@
+# app/services/import_job_service.py
+import datetime
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from typing import Callable, List, Optional
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models.models import ImportJob
+from app.services.transaction_import_service import (
+    find_imported_file,
+    import_transactions,
+    import_transaction_files,
+    record_imported_file,
+)
+from app.utils.file_parser import READ_BLOCK_SIZE, STATEMENT_EXTENSIONS, expand_archives
+from app.utils import metrics
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Where uploaded files wait for their import job. Dedicated worker processes
+# must be able to read this directory.
+IMPORT_STORAGE_DIR = os.getenv("IMPORT_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "budget-plus-imports"))
+# "inline" runs jobs as background tasks of the API process that received
+# the upload; "external" leaves them to dedicated `python -m app.worker` processes.
+IMPORT_WORKER_MODE = os.getenv("IMPORT_WORKER_MODE", "inline").lower()
+# Running jobs whose progress has not been written for this many seconds
+# are assumed to belong to a crashed worker and may be claimed again.
+# Progress is written after every stage and chunk, refreshing updated_at.
+IMPORT_JOB_STALE_SECONDS = int(os.getenv("IMPORT_JOB_STALE_SECONDS", "3600"))
+
+# Batch imports also take zip archives of statements.
+BATCH_EXTENSIONS = STATEMENT_EXTENSIONS + (".zip",)
+# Sub-directory of a job's storage path holding the files of a batch import.
+BATCH_DIR = "batch"
+
+def import_job_to_dict(job: ImportJob) -> dict:
+    """Serialize an import job for API responses."""
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "stage": job.stage,
+        "rows_processed": job.rows_processed or 0,
+        "rows_inserted": job.rows_inserted or 0,
+        "rows_skipped": job.rows_skipped or 0,
+        "stats": job.stats,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+def enqueue_import_job(file: UploadFile, db: Session, current_user: dict,
+                       sheet: Optional[str] = None, header_row: Optional[int] = None) -> ImportJob:
+    """
+    Store an uploaded statement and queue an import job for it.
+
+    The upload is copied from its spool to IMPORT_STORAGE_DIR block by block
+    and hashed on the way. If the user already imported a file with the same
+    content, nothing is queued: the job is returned completed, at stage
+    ``duplicate``, with the earlier row counts all reported as skipped.
+
+    :param sheet: Excel only: worksheet name or zero-based index to import.
+    :param header_row: Excel only: 1-based row number of the header.
+
+    :raises HTTPException: If the file format is not supported.
+    """
+    filename = os.path.basename(file.filename or "")
+    if not filename.lower().endswith(STATEMENT_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV or Excel file.")
+    if header_row is not None and header_row < 1:
+        raise HTTPException(status_code=400, detail="Header row must be 1 or greater.")
+
+    storage_path = os.path.join(IMPORT_STORAGE_DIR, uuid.uuid4().hex)
+    content_hash = _store_upload(file, storage_path, filename)
+    if sheet is not None or header_row is not None:
+        # The same workbook read with other options gives other rows.
+        return _create_job(db, current_user, filename, storage_path, sheet=sheet, header_row=header_row)
+
+    imported = find_imported_file(db, current_user, content_hash)
+    if imported is None:
+        return _create_job(db, current_user, filename, storage_path, content_hash=content_hash)
+    shutil.rmtree(storage_path, ignore_errors=True)
+    metrics.increment("import_duplicate_files_total")
+    now = datetime.datetime.now()
+    logger.info(f"File {filename} of user {current_user['sub']} was already imported on {imported.created_at}.")
+    return _create_job(
+        db, current_user, filename, storage_path, content_hash=content_hash,
+        status="completed", stage="duplicate", started_at=now, finished_at=now,
+        rows_processed=imported.rows_processed, rows_inserted=0, rows_skipped=imported.rows_processed,
+    )
+
+def enqueue_import_files(files: List[UploadFile], db: Session, current_user: dict) -> ImportJob:
+    """
+    Store several uploaded statements or zip archives and queue one batch import job for them.
+
+    :raises HTTPException: If any file format is not supported.
+    """
+    filenames = [os.path.basename(file.filename or "") for file in files]
+    unsupported = [name for name in filenames if not name.lower().endswith(BATCH_EXTENSIONS)]
+    if unsupported:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format: {', '.join(unsupported)}. Please upload CSV or Excel files or zip archives of them.",
+        )
+
+    storage_path = os.path.join(IMPORT_STORAGE_DIR, uuid.uuid4().hex)
+    # One folder per upload keeps files with the same name apart.
+    for i, (file, filename) in enumerate(zip(files, filenames)):
+        _store_upload(file, os.path.join(storage_path, BATCH_DIR, str(i)), filename)
+    return _create_job(db, current_user, ", ".join(filenames), storage_path)
+
+def _store_upload(file: UploadFile, directory: str, filename: str) -> str:
+    """Copy an upload into ``directory`` and return the SHA-256 of its content."""
+    os.makedirs(directory)
+    digest = hashlib.sha256()
+    with open(os.path.join(directory, filename), "wb") as out:
+        for block in iter(lambda: file.file.read(READ_BLOCK_SIZE), b""):
+            digest.update(block)
+            out.write(block)
+    return digest.hexdigest()
+
+def _create_job(db: Session, current_user: dict, filename: str, storage_path: str, **options) -> ImportJob:
+    values = {"status": "queued", "stage": "queued", **options}
+    job = ImportJob(
+        user_id=current_user["sub"],
+        filename=filename,
+        storage_path=storage_path,
+        **values,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info(f"Created {job.status} import job {job.id} for user {current_user['sub']} ({filename}).")
+    return job
+
+def _batch_paths(storage_path: str) -> List[str]:
+    """Paths of the statements of a batch job, in upload order, with archives expanded."""
+    batch_dir = os.path.join(storage_path, BATCH_DIR)
+    uploads = [
+        os.path.join(batch_dir, folder, name)
+        for folder in sorted(os.listdir(batch_dir), key=int)
+        for name in os.listdir(os.path.join(batch_dir, folder))
+    ]
+    return expand_archives(uploads, os.path.join(storage_path, "extracted"))
+
+def get_import_job(db: Session, current_user: dict, job_id: int) -> ImportJob:
+    """
+    Fetch one of the current user's import jobs.
+
+    :raises HTTPException: If the job does not exist for this user.
+    """
+    job = db.query(ImportJob).filter(
+        ImportJob.id == job_id,
+        ImportJob.user_id == current_user["sub"]
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found.")
+    return job
+
+def claim_import_job(db: Session, job_id: Optional[int] = None) -> Optional[ImportJob]:
+    """
+    Claim the oldest runnable job (or a specific one) for this worker.
+
+    Jobs are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent
+    workers never claim the same job. Running jobs whose progress has not
+    been written within the stale timeout are claimable again; a long import
+    that keeps reporting progress is never taken over.
+
+    :return: The claimed job, now ``running``, or None if there is nothing to do.
+    """
+    stale_before = datetime.datetime.now() - datetime.timedelta(seconds=IMPORT_JOB_STALE_SECONDS)
+    query = db.query(ImportJob).filter(or_(
+        ImportJob.status == "queued",
+        (ImportJob.status == "running") & (ImportJob.updated_at < stale_before),
+    ))
+    if job_id is not None:
+        query = query.filter(ImportJob.id == job_id)
+    job = query.order_by(ImportJob.id).with_for_update(skip_locked=True).first()
+    if not job:
+        db.rollback()
+        return None
+    job.status = "running"
+    job.stage = "parsing"
+    job.started_at = datetime.datetime.now()
+    db.commit()
+    # Load the committed state so the job can be used after the session closes.
+    db.refresh(job)
+    logger.info(f"Claimed import job {job.id}.")
+    return job
+
+def _update_job(session_factory: Callable[[], Session], job_id: int, **values):
+    """Write job progress in its own session so it is visible while the import runs."""
+    db = session_factory()
+    try:
+        db.query(ImportJob).filter(ImportJob.id == job_id).update(
+            {**values, ImportJob.updated_at: datetime.datetime.now()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def run_import_job(session_factory: Callable[[], Session], job: ImportJob):
+    """
+    Run a claimed import job to completion, recording progress and the outcome
+    on the job row, then delete the stored upload.
+    """
+    job_id = job.id
+    current_user = {"sub": job.user_id}
+
+    def on_progress(stage: str, counters: dict):
+        _update_job(session_factory, job_id, stage=stage, **counters)
+
+    db = session_factory()
+    try:
+        if os.path.isdir(os.path.join(job.storage_path, BATCH_DIR)):
+            paths = _batch_paths(job.storage_path)
+            result = import_transaction_files(paths, db, current_user, on_progress=on_progress)
+        else:
+            with open(os.path.join(job.storage_path, job.filename), "rb") as f:
+                result = import_transactions(
+                    UploadFile(file=f, filename=job.filename), db, current_user,
+                    on_progress=on_progress, sheet=job.sheet, header_row=job.header_row,
+                )
+            if job.content_hash:
+                record_imported_file(db, current_user, job.content_hash, job.filename, result)
+        _update_job(
+            session_factory, job_id,
+            status="completed", stage="done", error=None, finished_at=datetime.datetime.now(),
+            rows_processed=result["rows_processed"],
+            rows_inserted=result["rows_inserted"],
+            rows_skipped=result["rows_skipped"],
+            stats=result["stats"],
+        )
+        logger.info(f"Import job {job_id} completed.")
+    except HTTPException as e:
+        db.rollback()
+        logger.error(f"Import job {job_id} failed: {e.detail}")
+        metrics.increment("import_failed_total")
+        _update_job(session_factory, job_id, status="failed", error=str(e.detail), finished_at=datetime.datetime.now())
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Import job {job_id} failed: {e}")
+        metrics.increment("import_failed_total")
+        _update_job(session_factory, job_id, status="failed", error="Error importing transactions.", finished_at=datetime.datetime.now())
+    finally:
+        db.close()
+        shutil.rmtree(job.storage_path, ignore_errors=True)
+
+def process_import_job(session_factory: Callable[[], Session], job_id: int):
+    """Claim and run one specific job; used to run jobs in the API process."""
+    db = session_factory()
+    try:
+        job = claim_import_job(db, job_id)
+    finally:
+        db.close()
+    if job:
+        run_import_job(session_factory, job)
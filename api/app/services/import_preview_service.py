@@ -0,0 +1,167 @@
+# app/services/import_preview_service.py
+import hashlib
+import os
+import threading
+from cachetools import TTLCache
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from app.services.categorization_rule_service import get_rule_program
+from app.services.category_override_service import get_user_overrides
+from app.services.transaction_import_service import (
+    assign_uncategorized,
+    existing_fingerprints,
+    load_user_categories,
+    prepare_chunk_rows,
+    record_imported_file,
+    write_import_rows,
+)
+from app.utils.file_parser import IMPORT_CHUNK_SIZE, READ_BLOCK_SIZE, STATEMENT_EXTENSIONS, iter_transactions_file
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds a preview can be committed after it was made.
+IMPORT_PREVIEW_TTL_SECONDS = int(os.getenv("IMPORT_PREVIEW_TTL_SECONDS", "900"))
+# Total number of prepared rows kept across all cached previews; the least
+# recently used previews are evicted beyond it.
+IMPORT_PREVIEW_CACHE_ROWS = int(os.getenv("IMPORT_PREVIEW_CACHE_ROWS", "100000"))
+
+# Previews live in the memory of the API process that made them, so a
+# commit has to reach the same process (or the file is previewed again).
+_previews = TTLCache(
+    maxsize=IMPORT_PREVIEW_CACHE_ROWS,
+    ttl=IMPORT_PREVIEW_TTL_SECONDS,
+    getsizeof=lambda preview: max(len(preview["rows"]), 1),
+)
+_previews_lock = threading.Lock()
+
+def _content_hash(file: UploadFile) -> str:
+    """SHA-256 of an upload, read block by block; the file is rewound afterwards."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.file.read(READ_BLOCK_SIZE), b""):
+        digest.update(block)
+    file.file.seek(0)
+    return digest.hexdigest()
+
+def _build_preview(file: UploadFile, db: Session, current_user: dict, content_hash: str) -> dict:
+    """
+    Parse, categorize and fingerprint a whole file without writing anything.
+
+    :raises HTTPException: If the file cannot be parsed or is too large to keep.
+    """
+    categories_dict = load_user_categories(db, current_user)
+    overrides = get_user_overrides(db, current_user["sub"])
+    rules = get_rule_program(db, current_user["sub"])
+    file_counts = {}
+    rows, rows_processed = [], 0
+    for df in iter_transactions_file(file):
+        rows.extend(prepare_chunk_rows(df, current_user, categories_dict, file_counts, file.filename,
+                                       overrides=overrides, rules=rules))
+        rows_processed += len(df)
+        if len(rows) > IMPORT_PREVIEW_CACHE_ROWS:
+            raise HTTPException(status_code=413, detail="File is too large to preview. Import it directly instead.")
+    return {
+        "user_id": current_user["sub"],
+        "filename": file.filename,
+        "content_hash": content_hash,
+        "rows": rows,
+        "rows_processed": rows_processed,
+        "category_names": {cat.id: cat.name for cat in categories_dict.values()},
+    }
+
+def preview_import(file: UploadFile, db: Session, current_user: dict, limit: int = 500) -> dict:
+    """
+    Show what importing a file would do, and keep the result for commit_import_preview.
+
+    Previews are cached by user and file content, so previewing the same file
+    again only re-checks which rows are duplicates.
+
+    :param file: The uploaded CSV or Excel file.
+    :param db: Database session.
+    :param current_user: Current user information.
+    :param limit: Maximum number of rows included in the response.
+    :return: The preview id, row counters and the first ``limit`` rows with
+        their category and whether they are duplicates.
+    :raises HTTPException: If the file is not supported, cannot be parsed or is too large.
+    """
+    if not (file.filename or "").lower().endswith(STATEMENT_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV or Excel file.")
+    content_hash = _content_hash(file)
+    preview_id = hashlib.sha256(f"{current_user['sub']}|{content_hash}".encode("utf-8")).hexdigest()[:32]
+
+    with _previews_lock:
+        preview = _previews.get(preview_id)
+    if preview is None:
+        preview = _build_preview(file, db, current_user, content_hash)
+        with _previews_lock:
+            _previews[preview_id] = preview
+        logger.info(f"Prepared import preview {preview_id} ({len(preview['rows'])} rows) for user {current_user['sub']}.")
+    else:
+        logger.info(f"Reusing import preview {preview_id} for user {current_user['sub']}.")
+
+    existing = existing_fingerprints(db, current_user, [row["fingerprint"] for row in preview["rows"]])
+    names = preview["category_names"]
+    return {
+        "preview_id": preview_id,
+        "filename": preview["filename"],
+        "expires_in": IMPORT_PREVIEW_TTL_SECONDS,
+        "rows_processed": preview["rows_processed"],
+        "rows_new": len(preview["rows"]) - len(existing),
+        "rows_duplicate": len(existing),
+        "rows_skipped": preview["rows_processed"] - len(preview["rows"]),
+        "rows": [
+            {
+                "date": row["date"],
+                "description": row["description"],
+                "amount": row["amount"],
+                "category": names.get(row["category_id"], "Uncategorized"),
+                "duplicate": row["fingerprint"] in existing,
+            }
+            for row in preview["rows"][:limit]
+        ],
+    }
+
+def commit_import_preview(db: Session, current_user: dict, preview_id: str) -> dict:
+    """
+    Insert exactly the rows of a cached preview, without parsing or predicting again.
+
+    Rows that became duplicates since the preview are still skipped, and rows
+    whose category was deleted in the meantime go to "Uncategorized".
+
+    :return: A message with the number of rows processed, inserted and skipped.
+    :raises HTTPException: If the preview does not exist, expired or belongs to another user.
+    """
+    with _previews_lock:
+        preview = _previews.pop(preview_id, None)
+    if preview is None or preview["user_id"] != current_user["sub"]:
+        raise HTTPException(status_code=404, detail="Import preview not found or expired.")
+
+    categories_dict = load_user_categories(db, current_user)
+    category_ids = {cat.id for cat in categories_dict.values()}
+    rows = [
+        {**row, "category_id": row["category_id"] if row["category_id"] in category_ids else None}
+        for row in preview["rows"]
+    ]
+    try:
+        assign_uncategorized(rows, db, current_user, categories_dict)
+        inserted = sum(
+            write_import_rows(db, rows[start:start + IMPORT_CHUNK_SIZE])
+            for start in range(0, len(rows), IMPORT_CHUNK_SIZE)
+        )
+    except Exception:
+        # Keep the preview so the commit can be retried.
+        with _previews_lock:
+            _previews[preview_id] = preview
+        raise
+    logger.info(f"Committed import preview {preview_id}: {inserted} of {preview['rows_processed']} rows inserted.")
+    dates = [row["date"] for row in rows]
+    result = {
+        "detail": "Transactions imported successfully.",
+        "rows_processed": preview["rows_processed"],
+        "rows_inserted": inserted,
+        "rows_skipped": preview["rows_processed"] - inserted,
+        "date_from": min(dates, default=None),
+        "date_to": max(dates, default=None),
+    }
+    record_imported_file(db, current_user, preview["content_hash"], preview["filename"], result)
+    return result
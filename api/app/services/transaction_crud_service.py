@@ -5,7 +5,9 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.models.models import Transaction, Category, Section, CategoryCorrections
 from app.schemas.schemas import NewTransactionRequest, UpdateTransactionRequest
-from app.categorization.model import predict_category
+from app.categorization.model import predict_category_versioned
+from app.services.categorization_rule_service import get_rule_program
+from app.services.category_override_service import get_user_overrides, override_for, record_correction
 
 logger = get_logger(__name__)
 # CRUD Functions
@@ -64,10 +66,20 @@ def create_transaction(db: Session, current_user: dict, transaction: NewTransact
     """
     logger.info("Creating a new transaction for user: %s", current_user["sub"])
     category = None
+    model_version = None
     if transaction.category:
         category = db.query(Category).filter(Category.name == transaction.category).first()
     if not category:
-        predicted_category = predict_category(transaction.description)
+        rule_category_id = get_rule_program(db, current_user["sub"]).match(transaction.description, transaction.amount)
+        if rule_category_id is not None:
+            category = db.query(Category).filter(Category.id == rule_category_id).first()
+    if not category:
+        # A merchant the user corrected before keeps the corrected category.
+        override_id = override_for(get_user_overrides(db, current_user["sub"]), transaction.description)
+        if override_id is not None:
+            category = db.query(Category).filter(Category.id == override_id).first()
+    if not category:
+        model_version, predicted_category = predict_category_versioned(transaction.description)
         category = db.query(Category).filter(Category.name == predicted_category).first()
         if not category:
             category = db.query(Category).filter(Category.name == "Uncategorized").first()
@@ -78,6 +90,7 @@ def create_transaction(db: Session, current_user: dict, transaction: NewTransact
         amount=transaction.amount,
         category_id=category.id,
         is_manual=1,
+        model_version=model_version,
     )
     db.add(new_transaction)
     try:
@@ -123,8 +136,10 @@ def update_transaction_category(db: Session, current_user: dict, update_request:
     )
     db.add(correction)
     txn.category_id = new_category.id
+    txn.model_version = None
     try:
         db.commit()
+        record_correction(current_user["sub"], correction.id, txn.description, new_category.id)
         updated_txn = db.query(Transaction).filter(
             Transaction.id == update_request.transaction_id,
             Transaction.user_id == current_user["sub"]
@@ -163,6 +178,8 @@ def delete_transaction_by_id(db: Session, current_user: dict, transaction_id: in
         logger.warning("Transaction not found for user: %s, transaction_id: %s", current_user["sub"], transaction_id)
         raise HTTPException(status_code=404, detail="Transaction not found.")
     txn.is_deleted = 1
+    # Release the fingerprint so the transaction can be imported again.
+    txn.fingerprint = None
     try:
         db.commit()
         logger.info("Transaction deleted successfully for user: %s, transaction_id: %s", current_user["sub"], transaction_id)
@@ -1,135 +1,483 @@
 # app/services/transaction_service.py
 import calendar
 import datetime
+import json
+from contextlib import nullcontext
+from typing import Callable, Iterator, List, Optional
 from ..utils.logger import get_logger
 import pandas as pd
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case, inspect
 from fastapi import HTTPException
-from app.models.models import Transaction, Category, Section, CategoryCorrections
+from sqlalchemy.exc import IntegrityError
+from app.models.models import Transaction, Category, Section, CategoryCorrections, ImportedFile
 from app.schemas.schemas import NewTransactionRequest, UpdateTransactionRequest
-from app.categorization.model import predict_category
-from app.utils.file_parser import parse_transactions_file
+from app.categorization.model import predict_categories_versioned
+from app.categorization.preprocessing import merchant_key
+from app.services.categorization_rule_service import RuleProgram, get_rule_program
+from app.services.category_override_service import get_user_overrides
+from app.utils.file_parser import IMPORT_CHUNK_SIZE, iter_transactions_file, load_transactions_files
+from app.database.bulk_writer import bulk_insert
+from app.utils.fingerprint import fingerprint_keys, fingerprints_from_keys
+from app.utils.metrics import StageStats
 
 logger = get_logger(__name__)
-async def import_transactions_service(file, db: Session, current_user: dict):
-    try:
-        df = await parse_transactions_file(file)
-    except HTTPException as e:
-        logger.error(f"Error parsing file: {e.detail}")
-        raise e
 
-    new_transactions = []
-    # Pre-fetch categories for the current user.
-    categories_db = db.query(Category).filter(Category.user_id == current_user["sub"]).all()
-    # Build a lookup dictionary using lower-case keys.
-    categories_dict = {cat.name.lower(): cat for cat in categories_db}
-
-    # Determine the date range in the file.
-    min_date = df['date'].min()
-    max_date = df['date'].max()
-
-    # Pre-fetch counts of existing transactions from the DB in this date range.
-    db_txns = db.query(
-        Transaction.description,
-        Transaction.date,
-        Transaction.amount,
-        Transaction.category_id,
-        func.count(Transaction.id).label("count")
-    ).filter(
-        Transaction.user_id == current_user["sub"],
-        Transaction.date.between(min_date, max_date),
-        Transaction.is_deleted == 0,
-    ).group_by(
-        Transaction.description,
-        Transaction.date,
-        Transaction.amount,
-        Transaction.category_id
-    ).all()
-
-    # Build a lookup dictionary: key -> count
-    db_counts = {}
-    for desc, d, amt, cat_id, count in db_txns:
-        key = (desc, d, amt, cat_id)
-        db_counts[key] = count
-
-    # Dictionary to count occurrences within the file.
+# Fingerprints looked up per query when checking rows against existing transactions.
+FINGERPRINT_LOOKUP_BATCH = 1000
+
+async def import_transactions_service(file, db: Session, current_user: dict, chunk_size: Optional[int] = None):
+    """
+    Import transactions from an uploaded CSV or Excel file within the request.
+
+    :param file: The uploaded file.
+    :param db: Database session.
+    :param current_user: Current user information.
+    :param chunk_size: Maximum number of rows processed at a time.
+    :return: The import result (see import_transactions).
+    """
+    return import_transactions(file, db, current_user, chunk_size)
+
+def import_transactions(file, db: Session, current_user: dict, chunk_size: Optional[int] = None,
+                        on_progress: Optional[Callable[[str, dict], None]] = None,
+                        sheet: Optional[str] = None, header_row: Optional[int] = None) -> dict:
+    """
+    Import transactions from a CSV or Excel file.
+
+    The file is streamed in DataFrame chunks of at most ``chunk_size`` rows;
+    each chunk is categorized, fingerprinted, written with bulk_insert and
+    committed before the next one is read. Duplicates of existing
+    transactions are skipped by the unique (user_id, fingerprint) index,
+    which also makes re-running an interrupted import safe. Chunks whose
+    dates lie within files imported before are checked against the existing
+    fingerprints first, so their duplicates are never categorized.
+
+    :param file: The file to import (anything with ``filename`` and a binary ``file``).
+    :param db: Database session.
+    :param current_user: Current user information.
+    :param chunk_size: Maximum number of rows processed at a time.
+    :param on_progress: Called with the current stage and the row counters
+        whenever the import moves to another stage of a chunk.
+    :param sheet: Excel only: worksheet to import (see iter_transactions_file).
+    :param header_row: Excel only: 1-based header row (see iter_transactions_file).
+    :return: A message with the number of rows processed, inserted and
+        skipped, the range of the transaction dates in the file and the
+        import statistics (see _import_chunks).
+    """
+    chunks = iter_transactions_file(file, chunk_size, sheet=sheet, header_row=header_row)
+    return _import_chunks(chunks, db, current_user, file.filename, on_progress)
+
+def import_transaction_files(paths: List[str], db: Session, current_user: dict, chunk_size: Optional[int] = None,
+                             on_progress: Optional[Callable[[str, dict], None]] = None) -> dict:
+    """
+    Import several CSV or Excel statements as one batch.
+
+    The files are parsed in parallel worker processes and merged. Statements
+    covering overlapping periods repeat the same transactions, so the merged
+    rows are collapsed first: a transaction that occurs n times in one file
+    and m times in another is kept max(n, m) times. The rest is the same
+    chunked, batch-categorized insert as import_transactions.
+
+    :param paths: Paths of the stored statements (see expand_archives for zip uploads).
+    :param db: Database session.
+    :param current_user: Current user information.
+    :param chunk_size: Maximum number of rows processed at a time.
+    :param on_progress: See import_transactions.
+    :return: A message with the number of rows processed, inserted and skipped.
+    """
+    if on_progress:
+        on_progress("parsing", {"rows_processed": 0, "rows_inserted": 0, "rows_skipped": 0})
+    stats = StageStats()
+    with stats.stage("parse"):
+        frames = load_transactions_files(paths)
+    total = sum(len(df) for df in frames)
+    merged = _collapse_duplicates(frames, stats)
+    dropped = total - len(merged)
+    logger.info(f"Merged {len(paths)} files: {total} rows, {dropped} incomplete or repeated across files.")
+
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    chunks = (merged.iloc[start:start + chunk_size] for start in range(0, len(merged), chunk_size))
+    label = f"{len(paths)} files"
+    return _import_chunks(chunks, db, current_user, label, on_progress, already_skipped=dropped, stats=stats)
+
+def _collapse_duplicates(frames: List[pd.DataFrame], stats: Optional[StageStats] = None) -> pd.DataFrame:
+    """
+    Merge parsed files, dropping incomplete rows and transactions repeated across files.
+
+    Rows are numbered within their own file per fingerprint key, the same
+    ordinal the fingerprint uses, and only the first row for each
+    (key, ordinal) pair is kept.
+    """
+    keyed = []
+    for df in frames:
+        complete = _complete_rows(df)
+        if stats:
+            stats.count("invalid", (~complete).sum())
+        df = df[complete]
+        keys = fingerprint_keys(df['description'], df['date'], df['amount'])
+        keyed.append(df.assign(_key=keys, _ordinal=keys.groupby(keys).cumcount()))
+    if not keyed:
+        return pd.DataFrame(columns=["date", "description", "amount"])
+    merged = pd.concat(keyed, ignore_index=True)
+    merged = merged[~merged.duplicated(["_key", "_ordinal"])]
+    return merged.drop(columns=["_key", "_ordinal"]).reset_index(drop=True)
+
+def _complete_rows(df) -> pd.Series:
+    """Mask of the rows that have a date, a description and an amount."""
+    return df[['date', 'description', 'amount']].notna().all(axis=1) & (df['description'] != "")
+
+def _import_chunks(chunks: Iterator[pd.DataFrame], db: Session, current_user: dict, filename: str,
+                   on_progress: Optional[Callable[[str, dict], None]] = None, already_skipped: int = 0,
+                   stats: Optional[StageStats] = None) -> dict:
+    """
+    Categorize, fingerprint and insert normalized chunks, committing after each one.
+
+    The time spent parsing (which includes decoding, as the file is decoded
+    while it is read), predicting, looking up existing fingerprints and
+    inserting is measured per import, along with the number of rows parsed,
+    invalid, duplicate, predicted and inserted. These statistics are
+    returned under ``stats``, added to the process metrics and logged as
+    one JSON line.
+
+    :param already_skipped: Rows dropped before reaching this stage; counted
+        as processed and skipped.
+    :param stats: Statistics already collected for this import, if any.
+    """
+    counters = {"rows_processed": already_skipped, "rows_inserted": 0, "rows_skipped": already_skipped}
+    stats = stats or StageStats()
+    for name in ("parsed", "invalid", "rule_matched", "overridden", "predicted", "inserted"):
+        stats.count(name, 0)
+    stats.count("parsed", already_skipped)
+    date_from, date_to = None, None
+
+    def report(stage: str):
+        if on_progress:
+            on_progress(stage, dict(counters))
+
+    def skip_existing(fingerprints: list) -> set:
+        return existing_fingerprints(db, current_user, fingerprints)
+
+    categories_dict = load_user_categories(db, current_user)
+    overrides = get_user_overrides(db, current_user["sub"])
+    rules = get_rule_program(db, current_user["sub"])
+    imported_ranges = load_imported_ranges(db, current_user)
+
+    # Occurrences of each fingerprint key within the file so far, used as
+    # the ordinal that tells repeated identical transactions apart.
     file_counts = {}
 
-    # Process each row of the DataFrame.
-    for idx, row in df.iterrows():
-        # Skip rows with missing required fields.
-        if pd.isna(row['date']) or pd.isna(row['description']) or pd.isna(row['amount']) or row['description'] == "":
-            logger.warning(f"Row {idx} is missing required fields. Skipping.")
-            continue
-
-        logger.debug(f"Processing row {idx} of file {file.filename}.")
-        
-        # Determine the final category.
-        file_category = row.get('category', None)
-        # check file category is a valid string
-        if file_category and isinstance(file_category, str) and file_category.strip().lower() in categories_dict:
-            final_category = file_category
-            logger.debug(f"Row {idx}: Using provided category: {final_category}")
+    while True:
+        report("parsing")
+        try:
+            with stats.stage("parse"):
+                df = next(chunks, None)
+        except HTTPException as e:
+            logger.error(f"Error parsing file: {e.detail}")
+            raise e
+        if df is None:
+            break
+        stats.count("parsed", len(df))
+
+        dates = pd.to_datetime(df.loc[_complete_rows(df), 'date']).dropna()
+        overlaps = False
+        if not dates.empty:
+            first, last = dates.min().date(), dates.max().date()
+            date_from = first if date_from is None else min(date_from, first)
+            date_to = last if date_to is None else max(date_to, last)
+            overlaps = any(start <= first and last <= end for start, end in imported_ranges)
+
+        report("categorizing")
+        new_rows = _build_chunk_rows(
+            df, db, current_user, categories_dict, file_counts, filename,
+            skip_existing=skip_existing if overlaps else None, stats=stats, overrides=overrides, rules=rules,
+        )
+        inserted = 0
+        if new_rows:
+            report("inserting")
+            with stats.stage("insert"):
+                inserted = write_import_rows(db, new_rows)
+        counters["rows_processed"] += len(df)
+        counters["rows_inserted"] += inserted
+        counters["rows_skipped"] += len(df) - inserted
+    stats.count("inserted", counters["rows_inserted"])
+    rows = stats.counters
+    stats.count("duplicate", rows["parsed"] - rows["invalid"] - rows["inserted"])
+    summary = stats.as_dict()
+    stats.record("import")
+    logger.info(f"Imported {counters['rows_inserted']} of {counters['rows_processed']} rows from {filename}.")
+    logger.info("Import stats " + json.dumps({"user_id": current_user["sub"], "filename": filename, **summary}))
+    return {
+        "detail": "Transactions imported successfully.",
+        **counters,
+        "date_from": date_from,
+        "date_to": date_to,
+        "stats": summary,
+    }
+
+def existing_fingerprints(db: Session, current_user: dict, fingerprints: list) -> set:
+    """The fingerprints among ``fingerprints`` that the user's transactions already have."""
+    existing = set()
+    for start in range(0, len(fingerprints), FINGERPRINT_LOOKUP_BATCH):
+        batch = fingerprints[start:start + FINGERPRINT_LOOKUP_BATCH]
+        existing.update(fingerprint for (fingerprint,) in db.query(Transaction.fingerprint).filter(
+            Transaction.user_id == current_user["sub"],
+            Transaction.fingerprint.in_(batch)
+        ))
+    return existing
+
+def load_imported_ranges(db: Session, current_user: dict) -> list:
+    """
+    Date ranges covered by the files the user imported before.
+
+    Overlapping and adjacent ranges are merged, so consecutive monthly
+    statements form one range.
+
+    :return: Sorted, disjoint (date_from, date_to) pairs.
+    """
+    ranges = db.query(ImportedFile.date_from, ImportedFile.date_to).filter(
+        ImportedFile.user_id == current_user["sub"],
+        ImportedFile.date_from.isnot(None)
+    ).order_by(ImportedFile.date_from).all()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
         else:
-            # Use Predictor to get category.
-            predicted_category = predict_category(row['description'])
-            logger.debug(f"Row {idx}: Predicted category: {predicted_category}")
-
-            # If the predicted category is valid, use it.
-            # If not, default to "Uncategorized".
-            if predicted_category.lower() in categories_dict:
-                final_category = predicted_category
-                logger.debug(f"Row {idx}: Using predicted category: {final_category}")
-            else:
-                final_category = "Uncategorized"
-                logger.warning(f"Row {idx}: No valid category found. Defaulting to 'Uncategorized'.")
-        
-        # Look up the category in our pre-fetched dictionary.
-        cat_entry = categories_dict.get(final_category.lower())
-        if not cat_entry:
-            logger.warning(f"Category '{final_category}' not found for row {idx}. Using 'Uncategorized'.")
-            cat_entry = categories_dict.get("Uncategorized")
-            if not cat_entry:
-                logger.info("Creating default 'Uncategorized' category.")
-                cat_entry = Category(
-                    user_id=current_user["sub"],
-                    section_id=None,  # Adjust if you want to assign a default section
-                    name="Uncategorized",
-                    description="Fallback category when no match is found"
-                )
-                db.add(cat_entry)
-                db.commit()
-                db.refresh(cat_entry)
-                # Add to our dictionary for subsequent lookups.
-                categories_dict["Uncategorized"] = cat_entry
-        
-        # Build a duplicate key for this transaction.
-        txn_key = (row['description'], row['date'], row['amount'], cat_entry.id)
-        file_counts[txn_key] = file_counts.get(txn_key, 0) + 1
-
-        # Compare file count to DB count.
-        db_count = db_counts.get(txn_key, 0)
-        if file_counts[txn_key] <= db_count:
-            logger.debug(f"Row {idx}: Duplicate detected (file count {file_counts[txn_key]}, DB count {db_count}). Skipping.")
-            continue
-
-        # Create a new Transaction record.
-        new_txn = Transaction(
+            merged.append((start, end))
+    return merged
+
+def find_imported_file(db: Session, current_user: dict, content_hash: str) -> Optional[ImportedFile]:
+    """
+    Look up an earlier import of a file with the same content.
+
+    The earlier result only still holds if none of the user's transactions in
+    the file's date range were deleted since: deleting a transaction frees its
+    fingerprint, so importing the file again would restore it.
+
+    :param content_hash: SHA-256 of the file.
+    :return: The earlier import, or None if there is none or it is out of date.
+    """
+    imported = db.query(ImportedFile).filter(
+        ImportedFile.user_id == current_user["sub"],
+        ImportedFile.content_hash == content_hash
+    ).first()
+    if imported is None or imported.date_from is None:
+        return imported
+    deleted_since = db.query(Transaction.id).filter(
+        Transaction.user_id == current_user["sub"],
+        Transaction.is_deleted == 1,
+        Transaction.date.between(imported.date_from, imported.date_to),
+        Transaction.updated_at >= imported.created_at
+    ).first()
+    return None if deleted_since else imported
+
+def record_imported_file(db: Session, current_user: dict, content_hash: str, filename: str, result: dict):
+    """
+    Remember the result of importing a file, replacing any earlier record of the same content.
+
+    Failing to record only costs the short-circuit of a later re-upload, so
+    errors are logged and not raised.
+
+    :param result: The result of import_transactions.
+    """
+    values = {
+        "filename": filename,
+        "rows_processed": result["rows_processed"],
+        "rows_inserted": result["rows_inserted"],
+        "rows_skipped": result["rows_skipped"],
+        "date_from": result["date_from"],
+        "date_to": result["date_to"],
+        "created_at": datetime.datetime.now(),
+    }
+    try:
+        imported = db.query(ImportedFile).filter(
+            ImportedFile.user_id == current_user["sub"],
+            ImportedFile.content_hash == content_hash
+        ).first()
+        if imported is None:
+            db.add(ImportedFile(user_id=current_user["sub"], content_hash=content_hash, **values))
+        else:
+            for column, value in values.items():
+                setattr(imported, column, value)
+        db.commit()
+    except IntegrityError:
+        # Another import of the same file recorded it first.
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not record imported file {filename}: {e}")
+
+def load_user_categories(db: Session, current_user: dict) -> dict:
+    """Pre-fetch the current user's categories, keyed by lower-case name."""
+    categories_db = db.query(Category).filter(Category.user_id == current_user["sub"]).all()
+    return {cat.name.lower(): cat for cat in categories_db}
+
+def write_import_rows(db: Session, rows: list) -> int:
+    """
+    Insert prepared transaction rows and commit.
+
+    Rows whose fingerprint already exists for the user are duplicates and skipped.
+
+    :return: The number of rows inserted.
+    :raises HTTPException: If the rows cannot be saved.
+    """
+    try:
+        inserted = bulk_insert(db, Transaction, rows, conflict_columns=("user_id", "fingerprint"))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Error saving imported transactions.")
+    return inserted
+
+def _build_chunk_rows(df, db: Session, current_user: dict, categories_dict: dict,
+                      file_counts: dict, filename: str,
+                      skip_existing: Optional[Callable[[list], set]] = None,
+                      stats: Optional[StageStats] = None,
+                      overrides: Optional[dict] = None,
+                      rules: Optional[RuleProgram] = None) -> list:
+    """
+    Categorize and fingerprint one chunk of a transactions file, creating the
+    "Uncategorized" category if some rows need it.
+
+    :return: The new transaction rows to insert for this chunk.
+    """
+    rows = prepare_chunk_rows(df, current_user, categories_dict, file_counts, filename, skip_existing, stats,
+                              overrides, rules)
+    assign_uncategorized(rows, db, current_user, categories_dict)
+    return rows
+
+def assign_uncategorized(rows: list, db: Session, current_user: dict, categories_dict: dict):
+    """Give rows without a category the user's "Uncategorized" category."""
+    unresolved = [row for row in rows if row["category_id"] is None]
+    if unresolved:
+        logger.warning(f"No valid category found for {len(unresolved)} rows. Defaulting to 'Uncategorized'.")
+        uncategorized_id = _uncategorized_category(db, current_user, categories_dict).id
+        for row in unresolved:
+            row["category_id"] = uncategorized_id
+
+def prepare_chunk_rows(df, current_user: dict, categories_dict: dict, file_counts: dict, filename: str,
+                       skip_existing: Optional[Callable[[list], set]] = None,
+                       stats: Optional[StageStats] = None,
+                       overrides: Optional[dict] = None,
+                       rules: Optional[RuleProgram] = None) -> list:
+    """
+    Categorize and fingerprint one chunk of a transactions file without touching the database.
+
+    Works column by column: incomplete rows are dropped with a mask, categories
+    named in the file are resolved with a single map, then the user's rules
+    (``rules``, see categorization_rule_service), then the user's
+    corrections (``overrides``, merchant key to category id, see
+    category_override_service) and only the remaining rows go to the model,
+    in one batch.
+
+    ``file_counts`` is shared across the chunks of a file so occurrence
+    ordinals keep counting from one chunk to the next.
+
+    ``skip_existing``, if given, is called with the chunk's fingerprints and
+    returns those that already exist; these rows are dropped before they
+    are categorized.
+
+    ``stats``, if given, receives the number of invalid, rule matched, overridden and predicted rows
+    and the time spent predicting and looking up fingerprints.
+
+    :return: The new transaction rows for this chunk; ``category_id`` is None
+        where neither the file nor the model gave one of the user's categories,
+        and ``model_version`` names the model for the rows it categorized.
+    """
+    if df.empty:
+        return []
+
+    # Skip rows with missing required fields.
+    complete = _complete_rows(df)
+    if stats:
+        stats.count("invalid", (~complete).sum())
+    if not complete.all():
+        logger.warning(f"Skipping {(~complete).sum()} rows of {filename} with missing required fields.")
+    df = df[complete]
+    if df.empty:
+        return []
+
+    # Number identical transactions within the file to build the fingerprints.
+    keys = fingerprint_keys(df['description'], df['date'], df['amount'])
+    ordinals = keys.groupby(keys).cumcount() + 1 + keys.map(file_counts).fillna(0).astype(int)
+    for key, count in keys.value_counts().items():
+        file_counts[key] = file_counts.get(key, 0) + count
+
+    fingerprints = pd.Series(fingerprints_from_keys(keys, ordinals), index=df.index)
+    if skip_existing is not None:
+        with stats.stage("dedup") if stats else nullcontext():
+            existing = skip_existing(fingerprints.tolist())
+        new = ~fingerprints.isin(existing)
+        df, fingerprints = df[new], fingerprints[new]
+        if df.empty:
+            return []
+
+    # Use the category named in the file when the user has it.
+    category_ids = {name: cat.id for name, cat in categories_dict.items()}
+    if 'category' in df.columns and df['category'].dtype == object:
+        category_id = df['category'].str.strip().str.lower().map(category_ids)
+    else:
+        category_id = pd.Series(float("nan"), index=df.index)
+
+    # Then the user's rules, evaluated over the whole column.
+    valid_ids = set(category_ids.values())
+    unresolved = category_id.isna()
+    if rules and unresolved.any():
+        matched = rules.match_frame(df.loc[unresolved, 'description'], df.loc[unresolved, 'amount'])
+        matched = matched.where(matched.isin(valid_ids))
+        category_id[unresolved] = matched
+        if stats:
+            stats.count("rule_matched", matched.notna().sum())
+
+    # Merchants the user corrected before get the corrected category.
+    overrides = {key: cat_id for key, cat_id in (overrides or {}).items() if cat_id in valid_ids}
+    unresolved = category_id.isna()
+    if overrides and unresolved.any():
+        overridden = df.loc[unresolved, 'description'].astype(str).map(merchant_key).map(overrides)
+        category_id[unresolved] = overridden
+        if stats:
+            stats.count("overridden", overridden.notna().sum())
+
+    # Predict the rest in a single batch.
+    needs_prediction = category_id.isna()
+    model_version = None
+    if needs_prediction.any():
+        with stats.stage("predict") if stats else nullcontext():
+            model_version, labels = predict_categories_versioned(
+                df.loc[needs_prediction, 'description'].astype(str).tolist()
+            )
+            predicted = pd.Series(labels, index=category_id.index[needs_prediction])
+        if stats:
+            stats.count("predicted", needs_prediction.sum())
+        category_id[needs_prediction] = predicted.str.lower().map(category_ids)
+        logger.debug(f"Predicted categories for {needs_prediction.sum()} rows of {filename}.")
+
+    # Assemble the rows from plain column lists; tolist() already yields Python scalars.
+    columns = {
+        "description": df['description'].astype(str).tolist(),
+        "date": pd.to_datetime(df['date']).dt.date.tolist(),
+        "amount": df['amount'].astype(float).tolist(),
+        "category_id": [None if pd.isna(value) else int(value) for value in category_id.tolist()],
+        "fingerprint": fingerprints.tolist(),
+        "model_version": [model_version if predicted_row else None for predicted_row in needs_prediction.tolist()],
+    }
+    fixed = {"user_id": current_user["sub"], "is_imported": 1}
+    return [{**fixed, **dict(zip(columns, values))} for values in zip(*columns.values())]
+
+def _uncategorized_category(db: Session, current_user: dict, categories_dict: dict) -> Category:
+    """Return the user's "Uncategorized" category, creating it if necessary."""
+    cat_entry = categories_dict.get("uncategorized")
+    if not cat_entry:
+        logger.info("Creating default 'Uncategorized' category.")
+        cat_entry = Category(
             user_id=current_user["sub"],
-            description=row['description'],
-            date=row['date'],
-            amount=row['amount'],
-            category_id=cat_entry.id,
-            is_imported=1,
+            section_id=None,  # Adjust if you want to assign a default section
+            name="Uncategorized",
+            description="Fallback category when no match is found"
         )
-        new_transactions.append(new_txn)
-        logger.debug(f"Row {idx} processed: Transaction added.")
-
-    if new_transactions:
-        try:
-            db.bulk_save_objects(new_transactions)
-            db.commit()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail="Error saving imported transactions.")
-    return {"detail": "Transactions imported successfully."}
\ No newline at end of file
+        db.add(cat_entry)
+        db.commit()
+        db.refresh(cat_entry)
+        # Add to our dictionary for subsequent lookups.
+        categories_dict["uncategorized"] = cat_entry
+    return cat_entry
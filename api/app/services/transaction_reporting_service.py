@@ -9,6 +9,7 @@ from fastapi import HTTPException
 from app.models.models import Transaction, Category, Section, CategoryCorrections
 from app.schemas.schemas import NewTransactionRequest, UpdateTransactionRequest
 from app.categorization.model import predict_category
+from app.categorization.preprocessing import merchant_key
 
 logger = get_logger(__name__)
 # Reporting / Aggregation Functions
@@ -111,6 +112,56 @@ def get_expense_totals_service(db: Session, current_user: dict, year: int, month
         logger.error(f"Error calculating expense totals for {year}-{month:02d}: {e}")
         raise HTTPException(status_code=500, detail="Error calculating expense totals")
 
+def get_merchant_totals_service(db: Session, current_user: dict, year: int, month: int):
+    """
+    Calculate total expenses for each merchant in a specific month.
+
+    Transactions are grouped by merchant key, so "STARBUCKS STORE #1234" and
+    "STARBUCKS 01/15" count as the same merchant.
+
+    :param db: Database session
+    :param current_user: Current user information
+    :param year: Year of the transactions
+    :param month: Month of the transactions
+    :return: Merchants with their total and number of transactions, largest total first
+    """
+    logger.info(f"Calculating merchant totals for {year}-{month:02d} for user {current_user['sub']}")
+    start_date = datetime.date(year, month, 1)
+    last_day = calendar.monthrange(year, month)[1]
+    end_date = datetime.date(year, month, last_day)
+    try:
+        results = (
+            db.query(
+                Transaction.description,
+                func.sum(Transaction.amount).label("total_amount"),
+                func.count(Transaction.id).label("count")
+            )
+            .join(Category, Transaction.category_id == Category.id)
+            .join(Section, Category.section_id == Section.id)
+            .filter(
+                Transaction.date >= start_date,
+                Transaction.date <= end_date,
+                Transaction.user_id == current_user["sub"],
+                Section.name != 'Income',
+                Category.name != 'Transfer',
+                Transaction.is_deleted == 0
+            )
+            .group_by(Transaction.description)
+            .all()
+        )
+        merchants = {}
+        for description, total, count in results:
+            merchant = merchants.setdefault(merchant_key(description or ""), {"total": 0, "count": 0})
+            merchant["total"] += total
+            merchant["count"] += count
+        totals = [{"merchant": key, **values} for key, values in merchants.items()]
+        totals.sort(key=lambda merchant: abs(merchant["total"]), reverse=True)
+        logger.info(f"Successfully calculated merchant totals for {year}-{month:02d}")
+        return totals
+    except Exception as e:
+        logger.error(f"Error calculating merchant totals for {year}-{month:02d}: {e}")
+        raise HTTPException(status_code=500, detail="Error calculating merchant totals")
+
 def get_totals_service(db: Session, current_user: dict, year: int, month: int):
     """
     Calculate total income and expenses for a specific month.
@@ -1,4 +1,5 @@
 from ..utils.logger import get_logger
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from ..models.models import User, Section, Category
 from ..schemas.schemas import UserCreate
@@ -23,6 +24,20 @@ def get_user(db: Session, user_id: int):
         logger.warning(f"No user found with ID: {user_id}")
     return user
 
+def require_admin(db: Session, current_user: dict, detail: str):
+    """
+    Allow only administrators past this point.
+
+    :param db: The database session.
+    :param current_user: Current user information.
+    :param detail: The error message for everyone else.
+    :raises HTTPException: 403 if the current user is not an administrator.
+    """
+    user = db.query(User).filter(User.id == current_user["sub"]).first()
+    if not user or not user.is_admin:
+        logger.warning(f"User {current_user['sub']} is not an administrator: {detail}")
+        raise HTTPException(status_code=403, detail=detail)
+
 def create_user(db: Session, user: UserCreate):
     """
     Create a new user and return the created user object.
@@ -4,9 +4,9 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
-from app.database.database import Base, get_db
+from app.database.database import Base, get_db, get_session_factory
 from app.auth import get_current_user
-from app.models.models import Category, Section
+from app.models.models import CategorizationRule, Category, Section, User
 
 # Use a file-based SQLite database for testing.
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -28,6 +28,7 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
 
 # Override get_current_user to simulate an authenticated user.
 def override_get_current_user():
@@ -57,6 +58,7 @@ def client():
 def setup_db():
     db = TestingSessionLocal()
     # Clear tables to ensure a clean slate.
+    db.query(CategorizationRule).delete()
     db.query(Category).delete()
     db.query(Section).delete()
     db.commit()
@@ -91,4 +93,17 @@ def db_session():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@pytest.fixture
+def admin_user(db_session):
+    """Make the test user an administrator for the duration of a test."""
+    user = db_session.query(User).filter(User.id == "auth0|1234567890").first()
+    if not user:
+        user = User(id="auth0|1234567890", email="admin@example.com", name="Admin")
+        db_session.add(user)
+    user.is_admin = 1
+    db_session.commit()
+    yield user
+    user.is_admin = 0
+    db_session.commit()
@@ -1,5 +1,10 @@
 import pytest
-from app.models.models import Category, Section
+from unittest.mock import patch
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from app.categorization import model as categorization_model
+from app.categorization import registry
+from app.models.models import Category, Section, User
 from app.schemas.schemas import DescriptionRequest
 
 def test_get_categories(client, db_session):
@@ -36,12 +41,12 @@ def test_get_categories(client, db_session):
 
 def test_predict_category_endpoint(client, monkeypatch):
     # Override the prediction function in the categories endpoint.
-    def fake_predict_category_with_confidence(description):
-        return ("Fake Category", 0.95, False)
+    def fake_rank_category(description, k):
+        return "test-version", [("Fake Category", 0.95)]
     
     monkeypatch.setattr(
-        "app.endpoints.categories.predict_category_with_confidence",
-        fake_predict_category_with_confidence
+        "app.endpoints.categories.rank_category",
+        fake_rank_category
     )
 
     payload = {"description": "Test description"}
@@ -52,6 +57,7 @@ def test_predict_category_endpoint(client, monkeypatch):
     assert data["confidence"] == 0.95
     # Note: is_uncertain is returned as a string.
     assert data["is_uncertain"] == "False"
+    assert data["model_version"] == "test-version"
 
 def test_predict_category_endpoint_no_description(client):
     # Test the endpoint returns 400 if description is empty.
@@ -59,4 +65,147 @@ def test_predict_category_endpoint_no_description(client):
     response = client.post("/categories/predict", json=payload)
     assert response.status_code == 400, response.json()
     data = response.json()
-    assert "Description is required" in data["detail"]
\ No newline at end of file
+    assert "Description is required" in data["detail"]
+def test_predict_category_endpoint_uses_corrections(client, monkeypatch):
+    # A merchant the user corrected is predicted as the corrected category without the model.
+    monkeypatch.setattr(
+        "app.endpoints.categories.rank_category",
+        lambda description, k: pytest.fail("the model should not be called"),
+    )
+    created = client.post(
+        "/transactions/",
+        json={"description": "GLOBEX TRAVEL 01/15", "date": "2025-03-02", "amount": 80.0, "category": "Old Category"},
+    ).json()
+    response = client.post("/transactions/update", json={"transaction_id": created["id"], "category": "Test Category"})
+    assert response.status_code == 200, response.json()
+
+    response = client.post("/categories/predict", json={"description": "Globex Travel 02/20"})
+    assert response.status_code == 200, response.json()
+    data = response.json()
+    assert data["predicted_category"] == "Test Category"
+    assert data["confidence"] == 1.0
+    assert data["is_uncertain"] == "False"
+    assert data["model_version"] is None
+
+def test_predict_category_endpoint_top_k(client, monkeypatch):
+    # The ranked categories come from one top-k call.
+    calls = []
+    def fake_rank_category(description, k):
+        calls.append((description, k))
+        return "test-version", [("Groceries", 0.6), ("Dining", 0.3), ("Fuel", 0.1)][:k]
+
+    monkeypatch.setattr("app.endpoints.categories.rank_category", fake_rank_category)
+
+    response = client.post("/categories/predict?top_k=3", json={"description": "Corner market"})
+    assert response.status_code == 200, response.json()
+    data = response.json()
+    assert data["predicted_category"] == "Groceries"
+    assert data["confidence"] == 0.6
+    assert data["predictions"] == [
+        {"category": "Groceries", "confidence": 0.6},
+        {"category": "Dining", "confidence": 0.3},
+        {"category": "Fuel", "confidence": 0.1},
+    ]
+    assert calls == [("Corner market", 3)]
+
+def test_predict_category_endpoint_invalid_top_k(client):
+    # top_k must be between 1 and MAX_TOP_K.
+    response = client.post("/categories/predict?top_k=0", json={"description": "Corner market"})
+    assert response.status_code == 422
+
+def test_predict_categories_batch_endpoint(client, monkeypatch):
+    # All descriptions are scored in one model call and returned in request order.
+    calls = []
+    def fake_rank_categories(descriptions, k):
+        calls.append(list(descriptions))
+        return "test-version", [[(f"Category of {description}", 0.5)] for description in descriptions]
+
+    monkeypatch.setattr("app.endpoints.categories.rank_categories", fake_rank_categories)
+
+    response = client.post("/categories/predict/batch", json={"descriptions": ["Shop B", "Shop A", "Shop B"]})
+    assert response.status_code == 200, response.json()
+    predictions = response.json()["predictions"]
+    assert [prediction["predicted_category"] for prediction in predictions] == [
+        "Category of Shop B", "Category of Shop A", "Category of Shop B",
+    ]
+    assert predictions[0]["confidence"] == 0.5
+    assert predictions[0]["is_uncertain"] == "False"
+    assert calls == [["Shop B", "Shop A", "Shop B"]]
+
+def test_predict_categories_batch_endpoint_uses_corrections(client, monkeypatch):
+    # Corrected merchants are not sent to the model.
+    created = client.post(
+        "/transactions/",
+        json={"description": "INITECH SUPPLIES #44", "date": "2025-03-02", "amount": 80.0, "category": "Old Category"},
+    ).json()
+    response = client.post("/transactions/update", json={"transaction_id": created["id"], "category": "Test Category"})
+    assert response.status_code == 200, response.json()
+    calls = []
+    def fake_rank_categories(descriptions, k):
+        calls.append(list(descriptions))
+        return "test-version", [[("Fake Category", 0.9)] for _ in descriptions]
+
+    monkeypatch.setattr("app.endpoints.categories.rank_categories", fake_rank_categories)
+
+    response = client.post("/categories/predict/batch", json={"descriptions": ["Initech Supplies #45", "Other shop"]})
+    assert response.status_code == 200, response.json()
+    predictions = response.json()["predictions"]
+    assert [(p["predicted_category"], p["confidence"], p["model_version"]) for p in predictions] == [
+        ("Test Category", 1.0, None), ("Fake Category", 0.9, "test-version"),
+    ]
+    assert calls == [["Other shop"]]
+
+def test_predict_categories_batch_endpoint_invalid(client, monkeypatch):
+    # Empty batches, empty descriptions and batches over the limit are rejected.
+    monkeypatch.setattr("app.endpoints.categories.PREDICT_BATCH_MAX_DESCRIPTIONS", 2)
+    for descriptions in ([], ["Shop", ""], ["A", "B", "C"]):
+        response = client.post("/categories/predict/batch", json={"descriptions": descriptions})
+        assert response.status_code == 400, descriptions
+
+@pytest.fixture
+def registry_dir(tmp_path):
+    """Serve models from an empty registry, then go back to the packaged artifacts."""
+    path = str(tmp_path / "registry")
+    with patch.object(categorization_model, "MODEL_REGISTRY_DIR", path):
+        yield path
+    categorization_model.reload_model()
+
+def publish_model(registry_dir, activate=False):
+    texts = ["starbucks coffee", "shell gas station", "monthly rent payment"]
+    vectorizer = TfidfVectorizer()
+    model = LogisticRegression().fit(vectorizer.fit_transform(texts), ["Coffee", "Gas", "Rent"])
+    return registry.publish(model, vectorizer, registry_dir, training_size=3, activate=activate)
+
+def test_reload_model_endpoint_requires_admin(client, db_session):
+    user = db_session.query(User).filter(User.id == "auth0|1234567890").first()
+    if user:
+        user.is_admin = 0
+        db_session.commit()
+
+    response = client.post("/categories/model/reload", json={})
+    assert response.status_code == 403, response.json()
+
+def test_reload_model_endpoint(client, admin_user, registry_dir):
+    version = publish_model(registry_dir)
+
+    response = client.post("/categories/model/reload", json={"version": version})
+    assert response.status_code == 200, response.json()
+    assert response.json() == {"version": version}
+    assert registry.active_version(registry_dir) == version
+
+    response = client.post("/categories/predict", json={"description": "starbucks coffee"})
+    assert response.json()["model_version"] == version
+
+    response = client.get("/categories/model")
+    assert response.status_code == 200, response.json()
+    data = response.json()
+    assert data["version"] == version
+    assert data["metadata"]["classes"] == ["Coffee", "Gas", "Rent"]
+    assert [item["version"] for item in data["versions"]] == [version]
+
+def test_reload_model_endpoint_unknown_version(client, admin_user, registry_dir):
+    response = client.post("/categories/model/reload", json={"version": "unknown"})
+    assert response.status_code == 404, response.json()
+
+    response = client.post("/categories/model/reload", json={"version": "../unknown"})
+    assert response.status_code == 400, response.json()
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+from app.models.models import Category, Transaction
+
+def add_rule(client, **rule):
+    response = client.post("/categories/rules/", json=rule)
+    assert response.status_code == 200, response.json()
+    return response.json()
+
+def test_rule_crud(client):
+    rule = add_rule(client, pattern="SHELL", category="Test Category")
+    assert rule["match_type"] == "contains"
+    assert rule["category"] == "Test Category"
+    add_rule(client, pattern="RENT", category="Old Category", min_amount=1000, priority=-1)
+
+    response = client.get("/categories/rules/")
+    assert response.status_code == 200
+    assert [item["pattern"] for item in response.json()] == ["RENT", "SHELL"]
+
+    response = client.put(f"/categories/rules/{rule['id']}", json={"pattern": "CHEVRON", "category": "New Category"})
+    assert response.status_code == 200, response.json()
+    assert response.json()["category"] == "New Category"
+
+    response = client.delete(f"/categories/rules/{rule['id']}")
+    assert response.status_code == 200
+    assert [item["pattern"] for item in client.get("/categories/rules/").json()] == ["RENT"]
+
+    response = client.delete(f"/categories/rules/{rule['id']}")
+    assert response.status_code == 404
+
+def test_invalid_rules(client):
+    invalid = [
+        {"pattern": "(a+)+$", "match_type": "regex", "category": "Test Category"},
+        {"pattern": "SHELL", "match_type": "glob", "category": "Test Category"},
+        {"pattern": "  ", "category": "Test Category"},
+        {"pattern": "RENT", "category": "Test Category", "min_amount": 10, "max_amount": 5},
+    ]
+    for rule in invalid:
+        response = client.post("/categories/rules/", json=rule)
+        assert response.status_code == 400, rule
+
+    response = client.post("/categories/rules/", json={"pattern": "SHELL", "category": "No Such Category"})
+    assert response.status_code == 404
+
+def test_rules_apply_to_new_transactions(client, db_session):
+    """Test that a created transaction without a category gets the first matching rule's, without prediction."""
+    add_rule(client, pattern="rent", category="Old Category", min_amount=1000)
+    add_rule(client, pattern="rent", category="New Category")
+
+    with patch("app.services.transaction_crud_service.predict_category_versioned") as mock_predict:
+        large = client.post("/transactions/", json={"description": "MONTHLY RENT", "date": "2025-03-01", "amount": -1500.0})
+        small = client.post("/transactions/", json={"description": "Rent a bike", "date": "2025-03-01", "amount": 12.0})
+        mock_predict.assert_not_called()
+
+    assert db_session.get(Category, large.json()["category_id"]).name == "Old Category"
+    assert db_session.get(Category, small.json()["category_id"]).name == "New Category"
+    assert db_session.get(Transaction, large.json()["id"]).model_version is None
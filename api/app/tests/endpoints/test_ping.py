@@ -2,4 +2,13 @@ class TestPing:
     def test_ping(self, client):
         response = client.get("/ping")
         assert response.status_code == 200
-        assert response.json() == {"ping": "pong!"}
\ No newline at end of file
+        assert response.json() == {"ping": "pong!"}
+
+    def test_metrics(self, client, admin_user):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert set(response.json()) == {"counters", "gauges", "timings"}
+
+    def test_metrics_requires_admin(self, client):
+        response = client.get("/metrics")
+        assert response.status_code == 403
@@ -1,4 +1,5 @@
 import io
+import zipfile
 import pandas as pd
 import pytest
 from unittest.mock import patch, AsyncMock
@@ -11,6 +12,17 @@ def generate_csv_content(rows):
     df = pd.DataFrame(rows)
     return df.to_csv(index=False)
 
+# Helper: upload a file and return the finished import job.
+def import_and_wait(client, files):
+    response = client.post("/transactions/import", files=files)
+    assert response.status_code == 202, response.json()
+    job = response.json()
+    assert job["status"] == "queued"
+    # The TestClient runs background tasks before returning, so the job is done.
+    response = client.get(f"/transactions/import/{job['job_id']}")
+    assert response.status_code == 200, response.json()
+    return response.json()
+
 # Test valid CSV import.
 def test_import_valid_csv(client, db_session):
     # Prepare CSV content with required columns: date, description, amount, and an optional category.
@@ -23,10 +35,8 @@ def test_import_valid_csv(client, db_session):
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
     # Call the import endpoint.
-    response = client.post("/transactions/import", files=files)
-    assert response.status_code == 200, response.json()
-    data = response.json()
-    assert data.get("detail") == "Transactions imported successfully."
+    job = import_and_wait(client, files)
+    assert job["status"] == "completed", job
 
 # Test import with missing required columns.
 def test_import_missing_columns(client):
@@ -38,11 +48,10 @@ def test_import_missing_columns(client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    # Expect a 400 error due to missing column.
-    assert response.status_code == 400, response.json()
-    data = response.json()
-    assert "Missing required columns" in data.get("detail", "")
+    job = import_and_wait(client, files)
+    # The job fails due to the missing column.
+    assert job["status"] == "failed"
+    assert "Missing required columns" in job["error"]
 
 # Test import with duplicate rows.
 def test_import_duplicates(client, db_session):
@@ -75,12 +84,12 @@ def test_import_duplicates(client, db_session):
         db_session.add(txn)
         db_session.commit()
     
-    response = client.post("/transactions/import", files=files)
-    # Even though there are 3 rows in the file, the duplicates should be skipped.
-    # We only expect new transactions if not duplicated.
-    assert response.status_code == 200, response.json()
-    data = response.json()
-    assert data.get("detail") == "Transactions imported successfully."
+    job = import_and_wait(client, files)
+    # The pre-existing transaction matches the first row; the other two are new occurrences.
+    assert job["status"] == "completed", job
+    assert job["rows_processed"] == 3
+    assert job["rows_inserted"] == (2 if cat else 3)
+    assert job["rows_skipped"] == (1 if cat else 0)
 
 def test_import_valid_excel(client):
     # Create a simple DataFrame and write to a BytesIO as Excel.
@@ -95,10 +104,8 @@ def test_import_valid_excel(client):
     excel_file.seek(0)
     files = {"file": ("transactions.xlsx", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
     
-    response = client.post("/transactions/import", files=files)
-    assert response.status_code == 200, response.json()
-    data = response.json()
-    assert data.get("detail") == "Transactions imported successfully."
+    job = import_and_wait(client, files)
+    assert job["status"] == "completed", job
 
 # New tests to increase coverage
 
@@ -113,11 +120,10 @@ def test_import_empty_file(client):
     empty_file = io.BytesIO(b"")
     files = {"file": ("empty.csv", empty_file, "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    # Since the error message is "Error reading file: No columns to parse from file",
-    # adjust the assertion to match the actual error
-    assert response.status_code in [400, 500]  # Either is acceptable
-    assert "Error" in response.json()["detail"]  # Generic error check
+    job = import_and_wait(client, files)
+    # The error message is "Error reading file: No columns to parse from file"
+    assert job["status"] == "failed"
+    assert "Error" in job["error"]  # Generic error check
 
 def test_import_invalid_date_format(client):
     """Test importing transactions with invalid date format."""
@@ -128,11 +134,10 @@ def test_import_invalid_date_format(client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
+    job = import_and_wait(client, files)
     # Your implementation appears to be handling this format correctly or converting it,
     # so just verify that the import succeeds
-    assert response.status_code == 200
-    assert response.json()["detail"] == "Transactions imported successfully."
+    assert job["status"] == "completed", job
 
 def test_import_invalid_amount_format(client):
     """Test importing transactions with invalid amount format."""
@@ -143,10 +148,9 @@ def test_import_invalid_amount_format(client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    # Your implementation raises a 500 error rather than a 400 for invalid amount format
-    assert response.status_code == 500
-    assert "Error" in response.json()["detail"]
+    job = import_and_wait(client, files)
+    assert job["status"] == "failed"
+    assert "Error" in job["error"]
 
 def test_import_unsupported_file_format(client):
     """Test importing a file with unsupported format."""
@@ -164,9 +168,10 @@ def test_import_malformed_csv(client):
     file_bytes = malformed_csv.encode("utf-8")
     files = {"file": ("malformed.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
+    job = import_and_wait(client, files)
     # This might result in different errors depending on your parser
-    assert response.status_code in [400, 500]
+    assert job["status"] == "failed"
+    assert job["error"]
 
 def test_import_negative_amounts(client):
     """Test importing transactions with negative amounts (for expenses)."""
@@ -177,9 +182,8 @@ def test_import_negative_amounts(client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    assert response.status_code == 200
-    assert response.json()["detail"] == "Transactions imported successfully."
+    job = import_and_wait(client, files)
+    assert job["status"] == "completed", job
 
 def test_import_with_different_column_names(client):
     """Test importing with different column names that should be mapped."""
@@ -190,9 +194,9 @@ def test_import_with_different_column_names(client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    assert response.status_code == 400
-    assert "Missing required columns" in response.json()["detail"]
+    job = import_and_wait(client, files)
+    assert job["status"] == "failed"
+    assert "Missing required columns" in job["error"]
 
 def test_import_large_file(client):
     """Test importing a large file with many transactions."""
@@ -210,11 +214,10 @@ def test_import_large_file(client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("large_file.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    assert response.status_code == 200
-    assert response.json()["detail"] == "Transactions imported successfully."
+    job = import_and_wait(client, files)
+    assert job["status"] == "completed", job
 
-@patch("app.endpoints.transactions_import.import_transactions_service")
+@patch("app.services.import_job_service.import_transactions")
 def test_import_service_exception(mock_import_service, client):
     """Test handling of exceptions from the import service."""
     # Setup mock to raise an exception
@@ -228,13 +231,13 @@ def test_import_service_exception(mock_import_service, client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    assert response.status_code == 500
-    assert response.json()["detail"] == "Error importing transactions."
+    job = import_and_wait(client, files)
+    assert job["status"] == "failed"
+    assert job["error"] == "Error importing transactions."
 
-@patch("app.endpoints.transactions_import.import_transactions_service")
+@patch("app.services.import_job_service.import_transactions")
 def test_import_http_exception_passthrough(mock_import_service, client):
-    """Test that HTTPExceptions from the service are passed through."""
+    """Test that HTTPException details from the service are recorded on the job."""
     # Setup mock to raise an HTTPException
     mock_import_service.side_effect = HTTPException(status_code=418, detail="I'm a teapot")
     
@@ -246,9 +249,9 @@ def test_import_http_exception_passthrough(mock_import_service, client):
     file_bytes = csv_content.encode("utf-8")
     files = {"file": ("transactions.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    assert response.status_code == 418
-    assert response.json()["detail"] == "I'm a teapot"
+    job = import_and_wait(client, files)
+    assert job["status"] == "failed"
+    assert job["error"] == "I'm a teapot"
 
 def test_import_with_database_error(client):
     """Test handling of database errors during import."""
@@ -260,9 +263,216 @@ def test_import_with_database_error(client):
     file_bytes = malformed_content.encode("utf-8")
     files = {"file": ("error_test.csv", io.BytesIO(file_bytes), "text/csv")}
     
-    response = client.post("/transactions/import", files=files)
-    
-    # The error might be 400 or 500 depending on how your code handles it
-    assert response.status_code in [400, 500]
+    job = import_and_wait(client, files)
+
+    assert job["status"] == "failed"
     # Just verify there's an error message
-    assert "detail" in response.json()
\ No newline at end of file
+    assert job["error"]
+
+def test_import_job_counters(client):
+    """Test that the job reports row counters once the import completes."""
+    rows = [
+        {"date": "2025-03-01", "description": f"Counter transaction {i}", "amount": 10.0 + i, "category": "Test Category"}
+        for i in range(5)
+    ]
+    file_bytes = generate_csv_content(rows).encode("utf-8")
+
+    job = import_and_wait(client, {"file": ("counters.csv", io.BytesIO(file_bytes), "text/csv")})
+    assert job["status"] == "completed"
+    assert job["stage"] == "done"
+    assert job["rows_processed"] == 5
+    assert job["rows_inserted"] == 5
+    assert job["rows_skipped"] == 0
+    assert job["finished_at"] is not None
+    assert job["stats"]["rows"] == {"parsed": 5, "invalid": 0, "rule_matched": 0, "overridden": 0, "predicted": 0, "inserted": 5, "duplicate": 0}
+    assert {"parse", "insert", "total"} <= set(job["stats"]["seconds"])
+
+    # Uploading the same file again returns the earlier result without queueing an import.
+    with patch("app.services.import_job_service.import_transactions") as mock_import:
+        response = client.post("/transactions/import", files={"file": ("renamed.csv", io.BytesIO(file_bytes), "text/csv")})
+        mock_import.assert_not_called()
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "completed"
+    assert job["stage"] == "duplicate"
+    assert job["rows_processed"] == 5
+    assert job["rows_inserted"] == 0
+    assert job["rows_skipped"] == 5
+
+def test_reimport_after_delete(client, db_session):
+    """Test that a file is imported again once one of its transactions was deleted."""
+    from app.models.models import Transaction
+    rows = [
+        {"date": "2025-04-01", "description": f"Reimport transaction {i}", "amount": 5.0 + i, "category": "Test Category"}
+        for i in range(3)
+    ]
+    file_bytes = generate_csv_content(rows).encode("utf-8")
+    import_and_wait(client, {"file": ("reimport.csv", io.BytesIO(file_bytes), "text/csv")})
+    txn = db_session.query(Transaction).filter(Transaction.description == "Reimport transaction 1").one()
+    assert client.delete(f"/transactions/{txn.id}").status_code == 200
+
+    job = import_and_wait(client, {"file": ("reimport.csv", io.BytesIO(file_bytes), "text/csv")})
+    assert job["stage"] == "done"
+    assert job["rows_inserted"] == 1
+    assert job["rows_skipped"] == 2
+
+def test_import_overlapping_file_skips_categorization(client):
+    """Test that rows of a file within an imported date range are checked for duplicates before prediction."""
+    rows = [
+        {"date": f"2025-05-0{day}", "description": f"Overlap transaction {day}", "amount": 20.0 + day}
+        for day in range(1, 6)
+    ]
+    import_and_wait(client, {"file": ("may.csv", io.BytesIO(generate_csv_content(rows).encode("utf-8")), "text/csv")})
+
+    overlapping = rows[1:4] + [{"date": "2025-05-03", "description": "Overlap new transaction", "amount": 7.0}]
+    with patch("app.services.transaction_import_service.predict_categories_versioned") as mock_predict:
+        mock_predict.side_effect = lambda descriptions: ("test-version", ["Unknown"] * len(descriptions))
+        job = import_and_wait(
+            client, {"file": ("may-part.csv", io.BytesIO(generate_csv_content(overlapping).encode("utf-8")), "text/csv")}
+        )
+        mock_predict.assert_called_once_with(["Overlap new transaction"])
+    assert job["rows_inserted"] == 1
+    assert job["rows_skipped"] == 3
+
+def test_get_import_job_not_found(client):
+    """Test fetching an import job that does not exist."""
+    response = client.get("/transactions/import/999999")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Import job not found."
+
+def test_import_excel_with_sheet_and_header_row(client):
+    """Test importing a chosen sheet whose header is not on the first row."""
+    from openpyxl import Workbook
+    workbook = Workbook()
+    workbook.active.title = "Summary"
+    workbook.active.append(["Date", "Description", "Amount"])
+    worksheet = workbook.create_sheet("Transactions")
+    worksheet.append(["Exported 2025-03-31"])
+    worksheet.append(["Date", "Description", "Amount"])
+    worksheet.append(["2025-03-11", "Excel sheet transaction", 12.0])
+    excel_file = io.BytesIO()
+    workbook.save(excel_file)
+    excel_file.seek(0)
+    files = {"file": ("statement.xlsx", excel_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+
+    response = client.post("/transactions/import", files=files, data={"sheet": "Transactions", "header_row": "2"})
+    assert response.status_code == 202, response.json()
+    job = client.get(f"/transactions/import/{response.json()['job_id']}").json()
+    assert job["status"] == "completed", job
+    assert job["rows_inserted"] == 1
+
+def test_import_invalid_header_row(client):
+    """Test that a header row below 1 is rejected before queueing."""
+    files = {"file": ("statement.xlsx", io.BytesIO(b"not used"), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+
+    response = client.post("/transactions/import", files=files, data={"header_row": "0"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Header row must be 1 or greater."
+
+def test_import_batch_with_zip(client):
+    """Test importing a statement and a zip of statements as one job."""
+    first = generate_csv_content([
+        {"date": "2025-05-01", "description": "Batch transaction one", "amount": 11.0, "category": "Test Category"},
+        {"date": "2025-05-02", "description": "Batch transaction two", "amount": 12.0, "category": "Test Category"},
+    ])
+    second = generate_csv_content([
+        {"date": "2025-05-02", "description": "Batch transaction two", "amount": 12.0, "category": "Test Category"},
+        {"date": "2025-05-03", "description": "Batch transaction three", "amount": 13.0, "category": "Test Category"},
+    ])
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("may/second.csv", second)
+    archive.seek(0)
+    files = [
+        ("files", ("first.csv", io.BytesIO(first.encode("utf-8")), "text/csv")),
+        ("files", ("statements.zip", archive, "application/zip")),
+    ]
+
+    response = client.post("/transactions/import/batch", files=files)
+    assert response.status_code == 202, response.json()
+    assert response.json()["filename"] == "first.csv, statements.zip"
+    job = client.get(f"/transactions/import/{response.json()['job_id']}").json()
+    assert job["status"] == "completed", job
+    assert job["rows_processed"] == 4
+    assert job["rows_inserted"] == 3
+    assert job["rows_skipped"] == 1
+
+def test_import_batch_unsupported_file(client):
+    """Test that a batch with an unsupported file is rejected before queueing."""
+    files = [
+        ("files", ("first.csv", io.BytesIO(b"date,description,amount\n"), "text/csv")),
+        ("files", ("notes.txt", io.BytesIO(b"hello"), "text/plain")),
+    ]
+
+    response = client.post("/transactions/import/batch", files=files)
+    assert response.status_code == 400
+    assert "Unsupported file format: notes.txt" in response.json()["detail"]
+
+def test_import_preview_and_commit(client):
+    """Test previewing a file and then committing the preview."""
+    csv_content = generate_csv_content([
+        {"date": "2025-07-01", "description": "Previewed transaction", "amount": 9.0, "category": "Test Category"},
+    ])
+    files = {"file": ("preview.csv", io.BytesIO(csv_content.encode("utf-8")), "text/csv")}
+
+    response = client.post("/transactions/import/preview", files=files)
+    assert response.status_code == 200, response.json()
+    preview = response.json()
+    assert preview["rows_new"] == 1
+    assert preview["rows"][0]["category"] == "Test Category"
+    assert preview["rows"][0]["date"] == "2025-07-01"
+
+    response = client.post(f"/transactions/import/commit/{preview['preview_id']}")
+    assert response.status_code == 200, response.json()
+    assert response.json()["rows_inserted"] == 1
+
+    response = client.post(f"/transactions/import/commit/{preview['preview_id']}")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Import preview not found or expired."
+
+def test_import_preview_missing_columns(client):
+    """Test that preview reports parse errors directly."""
+    files = {"file": ("preview.csv", io.BytesIO(b"date,description\n2025-07-01,No amount\n"), "text/csv")}
+
+    response = client.post("/transactions/import/preview", files=files)
+    assert response.status_code == 400
+    assert "Missing required columns" in response.json()["detail"]
+
+def test_import_uses_category_corrections(client, db_session):
+    """Test that a corrected merchant gets the corrected category on the next import without prediction."""
+    from app.models.models import Transaction, Category
+    rows = [{"date": "2025-06-02", "description": "ACME HARDWARE #0012 SEATTLE WA", "amount": 31.5, "category": "Old Category"}]
+    import_and_wait(client, {"file": ("june.csv", io.BytesIO(generate_csv_content(rows).encode("utf-8")), "text/csv")})
+    txn = db_session.query(Transaction).filter(Transaction.description == "ACME HARDWARE #0012 SEATTLE WA").one()
+    response = client.post("/transactions/update", json={"transaction_id": txn.id, "category": "New Category"})
+    assert response.status_code == 200, response.json()
+
+    rows = [{"date": "2025-07-09", "description": "ACME HARDWARE #0457 HOUSTON TX", "amount": 12.0}]
+    with patch("app.services.transaction_import_service.predict_categories_versioned") as mock_predict:
+        job = import_and_wait(client, {"file": ("july.csv", io.BytesIO(generate_csv_content(rows).encode("utf-8")), "text/csv")})
+        mock_predict.assert_not_called()
+    assert job["stats"]["rows"]["overridden"] == 1
+    db_session.expire_all()
+    txn = db_session.query(Transaction).filter(Transaction.description == "ACME HARDWARE #0457 HOUSTON TX").one()
+    assert db_session.get(Category, txn.category_id).name == "New Category"
+
+def test_import_applies_rules(client, db_session):
+    """Test that rules categorize imported rows before the user's corrections and the model."""
+    from app.models.models import Transaction, Category
+    response = client.post("/categories/rules/", json={"pattern": "SHELL", "category": "Test Category"})
+    assert response.status_code == 200, response.json()
+
+    rows = [
+        {"date": "2025-08-01", "description": "SHELL OIL 5744", "amount": -40.0},
+        {"date": "2025-08-02", "description": "Shell station 12", "amount": -35.0, "category": "Old Category"},
+    ]
+    with patch("app.services.transaction_import_service.predict_categories_versioned") as mock_predict:
+        job = import_and_wait(client, {"file": ("august.csv", io.BytesIO(generate_csv_content(rows).encode("utf-8")), "text/csv")})
+        mock_predict.assert_not_called()
+    assert job["stats"]["rows"]["rule_matched"] == 1
+    db_session.expire_all()
+    categories = {
+        txn.description: db_session.get(Category, txn.category_id).name
+        for txn in db_session.query(Transaction).filter(Transaction.description.in_([row["description"] for row in rows]))
+    }
+    assert categories == {"SHELL OIL 5744": "Test Category", "Shell station 12": "Old Category"}
@@ -164,6 +164,22 @@ def test_get_expense_totals_error(client):
         assert response.status_code == 500
         assert "Error calculating expense totals" in response.json()["detail"]
 
+def test_get_merchant_totals(client, db_session):
+    """Test that expenses are totalled per merchant across description variants."""
+    db_session.query(Transaction).delete()
+    db_session.commit()
+    date = datetime.date(2025, 3, 15)
+    create_transaction(db_session, "STARBUCKS STORE #1234", date, 5.0, "Test Category")
+    create_transaction(db_session, "Starbucks 03/14", date, 4.5, "Test Category")
+    create_transaction(db_session, "SHELL OIL 57442", date, 40.0, "Test Category")
+
+    response = client.get("/transactions/merchants/2025/3")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"merchant": "shell oil", "total": 40.0, "count": 1},
+        {"merchant": "starbucks", "total": 9.5, "count": 2},
+    ]
+
 def test_get_totals(client, db_session, user_id='auth0|1234567890'):
     db_session.query(Transaction).delete()
     db_session.commit()
@@ -0,0 +1,87 @@
+import threading
+import pytest
+from app.categorization.batching import MicroBatcher
+from app.utils import metrics
+
+class BlockingPredict:
+    """Records each batch; the first one blocks until released, so later submissions queue up."""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, descriptions):
+        self.batches.append(list(descriptions))
+        self.started.set()
+        self.release.wait(5)
+        return "v1", [description.upper() for description in descriptions]
+
+@pytest.fixture
+def blocking():
+    predict = BlockingPredict()
+    yield predict
+    predict.release.set()
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_coalesces_queued_descriptions(blocking):
+    """Test that descriptions queued while a batch runs are predicted together, in order."""
+    batcher = MicroBatcher("test", blocking, max_batch_size=4, max_wait_seconds=0.001)
+    first = batcher.submit("a")
+    assert blocking.started.wait(5)
+    futures = [batcher.submit(description) for description in "bcdefghij"]
+    assert batcher.queue_depth() == 9
+    blocking.release.set()
+
+    assert first.result(5) == ("v1", "A")
+    assert [future.result(5) for future in futures] == [("v1", description.upper()) for description in "bcdefghij"]
+    batcher.stop(5)
+    assert blocking.batches == [["a"], ["b", "c", "d", "e"], ["f", "g", "h", "i"], ["j"]]
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"test_batches_total": 4, "test_items_total": 10}
+    assert snapshot["timings"]["test_batch_size"] == {"count": 4, "total": 10, "max": 4}
+    assert snapshot["timings"]["test_latency_seconds"]["count"] == 10
+    assert snapshot["gauges"]["test_queue_depth"] == 0
+
+def test_errors_reach_every_caller_of_the_batch():
+    def fail(descriptions):
+        raise RuntimeError("model unavailable")
+
+    batcher = MicroBatcher("test", fail)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        batcher.predict("a", timeout=5)
+    # The worker survives a failed batch.
+    with pytest.raises(RuntimeError):
+        batcher.predict("b", timeout=5)
+    batcher.stop(5)
+
+def test_stop_answers_queued_descriptions_and_restarts(blocking):
+    batcher = MicroBatcher("test", blocking, max_wait_seconds=0)
+    batcher.submit("a")
+    assert blocking.started.wait(5)
+    queued = batcher.submit("b")
+    blocking.release.set()
+    batcher.stop(5)
+
+    assert queued.done() and queued.result() == ("v1", "B")
+    assert batcher.predict("c", timeout=5) == ("v1", "C")
+    batcher.stop(5)
+
+def test_cancelled_descriptions_are_skipped(blocking):
+    batcher = MicroBatcher("test", blocking, max_wait_seconds=0)
+    batcher.submit("a")
+    assert blocking.started.wait(5)
+    cancelled = batcher.submit("b")
+    kept = batcher.submit("c")
+    assert cancelled.cancel()
+    blocking.release.set()
+
+    assert kept.result(5) == ("v1", "C")
+    batcher.stop(5)
+    assert blocking.batches == [["a"], ["c"]]
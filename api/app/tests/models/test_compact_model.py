@@ -0,0 +1,89 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.utils import murmurhash3_32
+from app.categorization import model as categorization_model
+from app.categorization import compact
+from app.categorization.compact import load_compact, save_compact
+from app.categorization.default_rules import default_rules
+from app.categorization.preprocessing import preprocess
+
+TEXTS = [preprocess(rule["description"]) for rule in default_rules] + ["", "zzz never seen", "Starbucks STARBUCKS"]
+
+def assert_parity(model, vectorizer, compact_model, compact_vectorizer, texts):
+    expected = vectorizer.transform(texts)
+    actual = compact_vectorizer.transform(texts)
+    assert np.allclose(actual.toarray(), expected.toarray(), atol=1e-12)
+    assert list(compact_model.predict(actual)) == list(model.predict(expected))
+    assert np.allclose(compact_model.predict_proba(actual), model.predict_proba(expected), atol=1e-6)
+
+def test_shipped_compact_artifact_matches_pickles():
+    """Test that the shipped compact export scores every default rule like the pickled model."""
+    model = joblib.load(categorization_model.MODEL_PATH)
+    vectorizer = joblib.load(categorization_model.VECTORIZER_PATH)
+    compact_model, compact_vectorizer = load_compact(categorization_model.COMPACT_MODEL_PATH)
+
+    assert_parity(model, vectorizer, compact_model, compact_vectorizer, TEXTS)
+
+def hashing_vectorizer(n_features=64, **params):
+    return make_pipeline(
+        HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, **params), TfidfTransformer(),
+    )
+
+@pytest.mark.parametrize("make_vectorizer, labels", [
+    (lambda: TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True), ["food", "fuel", "rent"]),
+    (lambda: TfidfVectorizer(norm="l1", use_idf=False), ["food", "fuel", "rent"]),
+    (lambda: TfidfVectorizer(), ["food", "fuel"]),
+    (lambda: hashing_vectorizer(), ["food", "fuel", "rent"]),
+    (lambda: hashing_vectorizer(n_features=8, ngram_range=(1, 2)), ["food", "fuel", "rent"]),
+])
+def test_export_round_trip(tmp_path, make_vectorizer, labels):
+    """Test that exported models keep scoring like scikit-learn across vectorizer settings and binary models."""
+    texts = ["whole foods market", "shell oil", "chevron gas", "landlord rent", "trader joes", "apartment rent"]
+    targets = ["food", "fuel", "fuel", "rent", "food", "rent"]
+    targets = [target if target in labels else labels[0] for target in targets]
+    vectorizer = make_vectorizer()
+    model = LogisticRegression().fit(vectorizer.fit_transform(texts), targets)
+    path = str(tmp_path / "model.npz")
+
+    save_compact(model, vectorizer, path)
+
+    compact_model, compact_vectorizer = load_compact(path)
+    assert_parity(model, vectorizer, compact_model, compact_vectorizer, texts + ["oil rent", "unknown"])
+
+@pytest.mark.parametrize("vectorizer", [
+    TfidfVectorizer(stop_words="english"),
+    make_pipeline(HashingVectorizer(n_features=64), TfidfTransformer()),
+])
+def test_export_rejects_unsupported_vectorizer(tmp_path, vectorizer):
+    """Test that a vectorizer the compact scorer cannot reproduce is not exported."""
+    model = LogisticRegression().fit(vectorizer.fit_transform(["shell oil", "rent"]), ["fuel", "rent"])
+
+    with pytest.raises(ValueError):
+        save_compact(model, vectorizer, str(tmp_path / "model.npz"))
+
+def test_hashed_export_has_fixed_width_and_no_vocabulary(tmp_path):
+    """Test that a hashed model keeps its width whatever it is trained on, and stores no terms."""
+    texts = ["whole foods market", "shell oil", "landlord rent"]
+    paths = []
+    for corpus in (texts, texts + [f"new merchant {i}" for i in range(50)]):
+        vectorizer = hashing_vectorizer(n_features=256)
+        labels = (["food", "fuel", "rent"] * len(corpus))[:len(corpus)]
+        model = LogisticRegression().fit(vectorizer.fit_transform(corpus), labels)
+        paths.append(str(tmp_path / f"model{len(paths)}.npz"))
+        save_compact(model, vectorizer, paths[-1])
+
+    for path in paths:
+        compact_model, compact_vectorizer = load_compact(path)
+        assert compact_vectorizer.vocabulary is None
+        assert compact_model.coef.shape == (3, 256)
+        assert "terms" not in np.load(path).files
+
+def test_murmurhash_matches_scikit_learn():
+    """Test that terms hash to the same columns as scikit-learn's HashingVectorizer."""
+    for term in ["", "a", "ab", "abc", "abcd", "starbucks coffee", "café", "日本語", "x" * 37]:
+        data = term.encode("utf-8")
+        assert compact.murmurhash3_32(data) == murmurhash3_32(data, seed=0)
@@ -0,0 +1,56 @@
+import pytest
+from app.categorization.default_rules import default_rules
+from app.categorization.keywords import KeywordAutomaton, default_automaton, derive_keywords
+from app.categorization.preprocessing import preprocess
+
+def test_automaton_finds_overlapping_keywords():
+    """Test that keywords sharing words, or nested in one another, are all found."""
+    automaton = KeywordAutomaton({"car insurance": "Car Insurance", "insurance premium": "Home Insurance",
+                                  "premium": "Subscriptions", "car": "Car Rentals"})
+
+    assert automaton.match("car insurance premium") == ["Car Rentals", "Car Insurance", "Home Insurance", "Subscriptions"]
+    assert automaton.match("car car insurance") == ["Car Rentals", "Car Rentals", "Car Insurance"]
+    assert automaton.match("insurance") == []
+
+@pytest.mark.parametrize("text, expected", [
+    ("payroll acme corp", "Salary"),
+    ("acme payroll direct deposit", "Salary"),
+    ("payroll uber", None),
+    ("walmart", None),
+    ("", None),
+])
+def test_categorize(text, expected):
+    automaton = KeywordAutomaton({"payroll": "Salary", "direct deposit": "Salary", "uber": "Taxi Service"})
+
+    assert automaton.categorize(text) == expected
+
+def test_derive_keywords():
+    """Test that only frequent, unambiguous and specific keywords are kept."""
+    rules = [
+        {"description": "ACME PAYROLL", "category": "Salary"},
+        {"description": "PAYROLL DEPOSIT", "category": "Salary"},
+        {"description": "WEEKLY PAYROLL", "category": "Salary"},
+        {"description": "WEEKLY PAY", "category": "Salary"},
+        {"description": "UBER TRIP", "category": "Taxi Service"},
+        {"description": "UBER EATS", "category": "Fast Food"},
+        {"description": "UBER RIDE", "category": "Taxi Service"},
+    ]
+
+    assert derive_keywords(rules, min_support=2) == {"payroll": "Salary"}
+    assert derive_keywords(rules, min_support=4) == {}
+
+def test_default_keywords_agree_with_rules():
+    """Test that every default rule with a keyword has the keyword's category."""
+    automaton = default_automaton()
+    labels = {}
+    for rule in default_rules:
+        labels.setdefault(preprocess(rule["description"]), set()).add(rule["category"])
+
+    matched = 0
+    for text, categories in labels.items():
+        category = automaton.categorize(text)
+        if category is not None:
+            matched += 1
+            assert categories == {category}, text
+    assert len(automaton) > 50
+    assert matched > len(labels) // 4
@@ -0,0 +1,25 @@
+import sys
+import numpy as np
+from unittest.mock import patch
+from app.categorization import model as categorization_model
+from app.categorization.compact import CompactClassifier, CompactVectorizer
+
+def test_artifacts_are_memory_mapped():
+    """Test that the shipped pickles load with their arrays mapped read-only from disk."""
+    with patch.object(categorization_model, "MODEL_FORMAT", "pickle"):
+        model, vectorizer = categorization_model._load_artifacts()
+
+    assert isinstance(model.coef_, np.memmap)
+    assert isinstance(vectorizer.idf_, np.memmap)
+    assert not model.coef_.flags.writeable
+    assert len(model.predict(vectorizer.transform(["starbucks"]))) == 1
+
+def test_compact_artifact_served_by_default():
+    """Test that the API serves the compact export unless told otherwise."""
+    with patch.object(categorization_model, "MODEL_FORMAT", "compact"):
+        model, vectorizer = categorization_model._load_artifacts()
+        version = categorization_model._artifact_version()
+
+    assert isinstance(model, CompactClassifier)
+    assert isinstance(vectorizer, CompactVectorizer)
+    assert version.count("-") == 0
@@ -0,0 +1,45 @@
+import pytest
+from app.categorization.preprocessing import merchant_key, preprocess
+
+class TestMerchantKey:
+    @pytest.mark.parametrize("description, expected", [
+        ("STARBUCKS STORE #1234", "starbucks"),
+        ("Starbucks 01/15 #987", "starbucks"),
+        ("POS PURCHASE WALMART SUPERCENTER #5678 DALLAS TX", "walmart supercenter"),
+        ("PURCHASE AUTHORIZED ON 01/15 SHELL OIL 57442 SAN JOSE CA CARD 1234", "shell oil"),
+        ("SQ *BLUE BOTTLE COFFEE XXXX4321", "sq blue bottle coffee"),
+        ("NETFLIX.COM", "netflix"),
+        ("PAYROLL DIRECT DEPOSIT REF 8X7Y6Z", "payroll direct deposit"),
+        ("AMZN Mktp US*1M76U2OC1", "amzn mktp us"),
+        ("JIMMY JOHNS 3017 HOUSTON TX                  08/22", "jimmy johns"),
+        ("AMAZON MKTPLACE PMTS   AMZN.COM/BILL   WA", "amazon mktplace pmts"),
+        ("AT&T", "att"),
+    ])
+    def test_merchant_key(self, description, expected):
+        """Test that bank decorations are stripped down to the merchant."""
+        assert merchant_key(description) == expected
+
+    def test_keeps_short_merchants(self):
+        """Test that a state-like word is only stripped with enough words in front of it."""
+        assert merchant_key("JUST ENERGY 866-587-8674 TX") == "just energy"
+        assert merchant_key("CHECK IN") == "check in"
+
+    def test_same_merchant_key_in_every_city(self):
+        """Test that the city and state after a store number are stripped, even for one-word merchants."""
+        descriptions = [
+            "POS PURCHASE STARBUCKS STORE #1234 SEATTLE WA",
+            "POS PURCHASE STARBUCKS STORE #5678 PORTLAND OR",
+            "STARBUCKS STORE 12 NEW YORK NY",
+            "STARBUCKS #12 WA",
+        ]
+        assert {merchant_key(description) for description in descriptions} == {"starbucks"}
+        # Without a store number in front, a one-word merchant keeps the words after it.
+        assert merchant_key("STARBUCKS SEATTLE WA") == "starbucks seattle"
+
+    def test_falls_back_when_nothing_is_left(self):
+        """Test that descriptions made only of numbers keep them."""
+        assert merchant_key("12345") == "12345"
+
+    def test_preprocess_uses_merchant_key(self):
+        """Test that training and prediction see the merchant key."""
+        assert preprocess("Starbucks 01/15 #987") == merchant_key("STARBUCKS STORE #1234")
@@ -0,0 +1,88 @@
+import os
+import pytest
+from unittest.mock import patch
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from app.categorization import model as categorization_model
+from app.categorization import registry
+
+def train(labels):
+    texts = ["starbucks coffee", "shell gas station", "monthly rent payment"]
+    vectorizer = TfidfVectorizer()
+    model = LogisticRegression().fit(vectorizer.fit_transform(texts), labels)
+    return model, vectorizer
+
+@pytest.fixture
+def registry_dir(tmp_path):
+    """Serve models from an empty registry, then go back to the packaged artifacts."""
+    path = str(tmp_path / "registry")
+    with patch.object(categorization_model, "MODEL_REGISTRY_DIR", path):
+        yield path
+    categorization_model.reload_model()
+
+def test_publish_adds_an_active_version(registry_dir):
+    """Test that publishing writes the artifact and its metadata, and activates the version."""
+    model, vectorizer = train(["food", "fuel", "rent"])
+    version = registry.publish(model, vectorizer, registry_dir, training_size=3, accuracy=1.0)
+
+    assert registry.active_version(registry_dir) == version
+    metadata = registry.verify(registry_dir, version)
+    assert metadata["classes"] == ["food", "fuel", "rent"]
+    assert metadata["training_size"] == 3
+    assert metadata["accuracy"] == 1.0
+    assert [item["version"] for item in registry.list_versions(registry_dir)] == [version]
+    assert not [name for name in os.listdir(registry_dir) if name.startswith(".")]
+
+def test_publish_without_activating(registry_dir):
+    """Test that a version can be published without being served."""
+    model, vectorizer = train(["food", "fuel", "rent"])
+    registry.publish(model, vectorizer, registry_dir, training_size=3, activate=False)
+
+    assert registry.active_version(registry_dir) is None
+
+def test_corrupted_version_is_rejected(registry_dir):
+    """Test that a version whose artifact does not match its checksum cannot be activated."""
+    model, vectorizer = train(["food", "fuel", "rent"])
+    version = registry.publish(model, vectorizer, registry_dir, training_size=3, activate=False)
+    with open(os.path.join(registry_dir, version, registry.ARTIFACT_FILE), "ab") as f:
+        f.write(b"garbage")
+
+    with pytest.raises(ValueError):
+        registry.activate_version(registry_dir, version)
+    assert registry.active_version(registry_dir) is None
+
+def test_version_names_are_checked(registry_dir):
+    """Test that versions cannot name paths outside the registry."""
+    for version in ["../elsewhere", ".staging-x", ""]:
+        with pytest.raises(ValueError):
+            registry.read_metadata(registry_dir, version)
+    with pytest.raises(FileNotFoundError):
+        registry.activate_version(registry_dir, "unknown")
+
+def test_reload_swaps_the_served_model(registry_dir):
+    """Test that reloading serves the new version while predictions in flight keep the old one."""
+    first = registry.publish(*train(["food", "fuel", "rent"]), registry_dir, training_size=3)
+    assert categorization_model.reload_model() == first
+    in_flight_model, in_flight_vectorizer, in_flight_version = categorization_model.get_model()
+
+    second = registry.publish(*train(["coffee", "gas", "housing"]), registry_dir, training_size=3, activate=False)
+    assert categorization_model.reload_model(second) == second
+
+    version, rankings = categorization_model.rank_categories(["starbucks"], 1)
+    assert version == second
+    assert rankings[0][0][0] in {"coffee", "gas", "housing"}
+    assert categorization_model.model_info()["metadata"]["version"] == second
+    # The snapshot taken before the swap still scores with the first model.
+    assert in_flight_version == first
+    assert in_flight_model.predict(in_flight_vectorizer.transform(["starbucks"]))[0] in {"food", "fuel", "rent"}
+
+def test_failed_load_keeps_the_served_model(registry_dir):
+    """Test that a version that fails to load leaves the current model in place."""
+    first = registry.publish(*train(["food", "fuel", "rent"]), registry_dir, training_size=3)
+    categorization_model.reload_model()
+    second = registry.publish(*train(["coffee", "gas", "housing"]), registry_dir, training_size=3)
+    with open(os.path.join(registry_dir, second, registry.ARTIFACT_FILE), "ab") as f:
+        f.write(b"garbage")
+
+    assert categorization_model.reload_model() == first
+    assert categorization_model.predict_categories_versioned(["starbucks"])[0] == first
@@ -0,0 +1,104 @@
+import datetime
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from app.categorization import registry
+from app.categorization.default_rules import default_rules
+from app.categorization.retraining import load_training_data, param_grid, retrain
+from app.categorization.training import build_vectorizer
+from app.models.models import Category, CategoryCorrections, Section, Transaction
+
+USERS = ["auth0|retrain-a", "auth0|retrain-b", "auth0|retrain-c"]
+
+@pytest.fixture
+def corrections(db_session):
+    """Start from an empty corrections table; let each test add corrections for the test users."""
+    db_session.query(CategoryCorrections).delete()
+    section = Section(name="Retraining Section")
+    db_session.add(section)
+    db_session.flush()
+    categories = {}
+
+    def correct(user_id, description, category_name):
+        if (user_id, category_name) not in categories:
+            category = Category(name=category_name, section_id=section.id, user_id=user_id)
+            db_session.add(category)
+            db_session.flush()
+            categories[(user_id, category_name)] = category
+        txn = Transaction(user_id=user_id, description=description, date=datetime.date(2025, 3, 1), amount=10.0)
+        db_session.add(txn)
+        db_session.flush()
+        db_session.add(CategoryCorrections(
+            user_id=user_id, transaction_id=txn.id, new_category_id=categories[(user_id, category_name)].id,
+        ))
+        db_session.commit()
+
+    yield correct
+    db_session.query(CategoryCorrections).filter(CategoryCorrections.user_id.in_(USERS)).delete()
+    db_session.query(Transaction).filter(Transaction.user_id.in_(USERS)).delete()
+    db_session.query(Category).filter(Category.section_id == section.id).delete()
+    db_session.delete(section)
+    db_session.commit()
+
+def examples(db_session, **kwargs):
+    texts, labels, stats = load_training_data(db_session, batch_size=2, **kwargs)
+    return dict(zip(texts, labels)), stats
+
+def test_default_rules_are_deduplicated(db_session, corrections):
+    """Test that every preprocessed description becomes a single example."""
+    data, stats = examples(db_session)
+
+    assert len(data) == stats["examples"] < len(default_rules)
+    assert stats["duplicates_removed"] > 0
+    assert data["payroll direct deposit"] == "Salary"
+
+def test_corrections_outvote_default_rules(db_session, corrections):
+    """Test that corrections relabel descriptions and add new ones, each user's latest correction voting once."""
+    corrections(USERS[0], "PAYROLL DIRECT DEPOSIT", "Bonus")
+    corrections(USERS[1], "PAYROLL DIRECT DEPOSIT #991", "Bonus")
+    corrections(USERS[2], "Payroll direct deposit", "Salary")
+    corrections(USERS[0], "ACME WIDGETS 01/15", "Groceries")
+    corrections(USERS[0], "ACME WIDGETS 02/15", "Household Items")
+
+    data, stats = examples(db_session)
+
+    assert data["payroll direct deposit"] == "Bonus"
+    assert data["acme widgets"] == "Household Items"
+    assert stats["corrections"] == 5
+    assert stats["relabeled_descriptions"] == 1
+
+def test_custom_categories_are_opt_in(db_session, corrections):
+    """Test that corrections to categories default_rules does not know are only learned on request."""
+    corrections(USERS[0], "BLUE BOTTLE COFFEE", "My Coffee Habit")
+
+    data, stats = examples(db_session)
+    assert "blue bottle coffee" not in data
+    assert stats["corrections_skipped"] == 1
+
+    data, _ = examples(db_session, include_custom_categories=True)
+    assert data["blue bottle coffee"] == "My Coffee Habit"
+
+@pytest.mark.parametrize("features", ["tfidf", "hashing"])
+def test_param_grid_matches_pipeline(features):
+    """Test that the searched hyperparameters name parameters of the feature mode's pipeline."""
+    pipeline = Pipeline([("vectorizer", build_vectorizer(features)), ("classifier", LogisticRegression())])
+
+    assert set(param_grid(features)) <= set(pipeline.get_params())
+
+def test_retrain_publishes_a_version(db_session, corrections, tmp_path):
+    """Test that retraining publishes a verified, scoring version with its report."""
+    corrections(USERS[0], "ACME WIDGETS", "Groceries")
+    registry_dir = str(tmp_path / "registry")
+
+    report = retrain(
+        db_session, cv=2, n_jobs=1, grid={"classifier__C": [1.0, 10.0]},
+        registry_dir=registry_dir, activate=False,
+    )
+
+    assert registry.active_version(registry_dir) is None
+    model, vectorizer, metadata = registry.load_version(registry_dir, report["version"])
+    assert metadata["training_size"] == report["data"]["examples"]
+    assert metadata["accuracy"] == report["holdout_accuracy"]
+    assert metadata["report"]["candidates"] == 2
+    assert set(report["timings"]) >= {"load_seconds", "search_seconds", "fit_seconds", "publish_seconds"}
+    assert model.predict(vectorizer.transform(["acme widgets"]))[0] == "Groceries"
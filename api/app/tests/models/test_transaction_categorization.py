@@ -14,6 +14,7 @@ def mock_model_loading():
     mock_model = MagicMock()
     mock_model.predict.return_value = np.array(["Groceries"])
     mock_model.predict_proba.return_value = np.array([[0.8, 0.1, 0.1]])
+    mock_model.classes_ = np.array(["Groceries", "Dining", "Transportation"])
     
     # Create mock vectorizer
     mock_vectorizer = MagicMock()
@@ -22,7 +23,7 @@ def mock_model_loading():
     # Patch joblib.load to return our mocks
     with patch("joblib.load") as mock_load:
         # Configure mock_load to return different values based on the argument
-        def side_effect(path):
+        def side_effect(path, **kwargs):
             if "transaction_categorizer.pkl" in path:
                 return mock_model
             elif "tfidf_vectorizer.pkl" in path:
@@ -38,8 +39,13 @@ def mock_model_loading():
             # Force reload if it was already imported
             import importlib
             importlib.reload(app.categorization.model)
-            
-            yield mock_model, mock_vectorizer
+
+            # Serve the mocked pickles rather than the compact export, and
+            # send every description to them.
+            with patch.object(app.categorization.model, "MODEL_FORMAT", "pickle"), \
+                    patch.object(app.categorization.model, "KEYWORD_FAST_PATH", False):
+                yield mock_model, mock_vectorizer
+            app.categorization.model.stop_batching()
 
 class TestTransactionCategorization:
     def test_preprocessing_integration(self):
@@ -50,15 +56,8 @@ class TestTransactionCategorization:
         description = "WALMART GROCERY STORE 12345"
         processed = preprocess(description)
         
-        # Check basic preprocessing was applied
-        assert processed == processed.lower()  # Should be lowercase
-        assert "walmart" in processed
-        assert "grocery" in processed
-        assert "store" in processed
-        
-        # Your preprocessing might not remove numbers - adjust based on actual implementation
-        # Instead of asserting numbers are removed, just check that preprocessing did something
-        assert processed != description
+        # The description is reduced to its merchant key: store number dropped.
+        assert processed == "walmart grocery"
 
     def test_predict_category(self, mock_model_loading):
         """Test the predict_category function."""
@@ -83,9 +82,9 @@ class TestTransactionCategorization:
         # Test prediction with confidence
         category, confidence, is_uncertain = predict_category_with_confidence("Test Transaction")
         
-        # Check the preprocessing and transformation flow
+        # Check the preprocessing and transformation flow: the vector is scored once.
         mock_vectorizer.transform.assert_called_once()
-        mock_model.predict.assert_called_once()
+        mock_model.predict.assert_not_called()
         mock_model.predict_proba.assert_called_once()
         
         # Check the results
@@ -162,4 +161,165 @@ class TestTransactionCategorization:
         with pytest.raises(Exception) as exc_info:
             predict_category("Test Transaction")
         
-        assert "Model error" in str(exc_info.value)
\ No newline at end of file
+        assert "Model error" in str(exc_info.value)
+
+    def test_predict_categories_batch(self, mock_model_loading):
+        """Test that batch prediction collapses duplicates and preserves order."""
+        mock_model, mock_vectorizer = mock_model_loading
+        from app.categorization.model import predict_categories
+
+        mock_model.predict.return_value = np.array(["Groceries", "Dining"])
+
+        result = predict_categories(["WALMART", "MCDONALD'S", "walmart", "WALMART"])
+
+        # The vectorizer and model each run once over the distinct texts
+        mock_vectorizer.transform.assert_called_once_with(["walmart", "mcdonalds"])
+        mock_model.predict.assert_called_once()
+        assert result == ["Groceries", "Dining", "Groceries", "Groceries"]
+
+    def test_predict_categories_empty(self, mock_model_loading):
+        """Test that an empty batch does not touch the model."""
+        mock_model, mock_vectorizer = mock_model_loading
+        from app.categorization.model import predict_categories
+
+        assert predict_categories([]) == []
+        mock_vectorizer.transform.assert_not_called()
+        mock_model.predict.assert_not_called()
+
+    def test_prediction_cache(self, mock_model_loading):
+        """Test that repeated descriptions are served from the cache without vectorizing again."""
+        mock_model, mock_vectorizer = mock_model_loading
+        from app.categorization.model import predict_categories, prediction_cache_info
+
+        mock_model.predict.return_value = np.array(["Groceries"])
+        assert predict_categories(["WALMART #123"]) == ["Groceries"]
+        mock_model.predict.return_value = np.array(["Dining"])
+        # "walmart 123" is cached; only "starbucks" is scored.
+        assert predict_categories(["Walmart 123", "STARBUCKS"]) == ["Groceries", "Dining"]
+
+        assert mock_vectorizer.transform.call_args_list[-1].args == (["starbucks"],)
+        info = prediction_cache_info()
+        assert info["hits"] == 1
+        assert info["misses"] == 2
+        assert info["size"] == 2
+
+    def test_keyword_fast_path(self, mock_model_loading):
+        """Test that descriptions with a keyword skip the model, and each stage's hits are counted."""
+        mock_model, mock_vectorizer = mock_model_loading
+        import app.categorization.model as categorization_model
+
+        mock_model.predict.return_value = np.array(["Groceries"])
+        with patch.object(categorization_model, "KEYWORD_FAST_PATH", True):
+            labels = categorization_model.predict_categories(["PAYROLL ACME CORP", "WALMART", "Uber 01/15"])
+            ranking = categorization_model.predict_top_k(["PAYROLL ACME CORP"], k=3)
+            categorization_model.predict_categories(["WALMART"])
+
+        assert labels == ["Salary", "Groceries", "Taxi Service"]
+        assert ranking == [[("Salary", 1.0)]]
+        assert mock_vectorizer.transform.call_args_list == [((["walmart"],),)]
+        stages = categorization_model.prediction_stage_info()
+        assert {stage: info["count"] for stage, info in stages.items()} == {"keyword": 3, "cache": 1, "model": 1}
+        assert stages["keyword"]["rate"] == 0.6
+
+    def test_prediction_cache_is_bounded(self, mock_model_loading):
+        """Test that the least recently used predictions are evicted."""
+        mock_model, mock_vectorizer = mock_model_loading
+        import app.categorization.model as categorization_model
+        from cachetools import LRUCache
+
+        with patch.object(categorization_model, "_label_cache", LRUCache(maxsize=2)):
+            for description in ["A", "B", "A", "C"]:
+                categorization_model.predict_categories([description])
+            assert set(categorization_model._label_cache) == {
+                (categorization_model.model_version, "a"), (categorization_model.model_version, "c")
+            }
+
+    def test_prediction_cache_invalidated_by_new_artifacts(self, mock_model_loading):
+        """Test that changed artifacts are reloaded and earlier predictions are not reused."""
+        mock_model, mock_vectorizer = mock_model_loading
+        import app.categorization.model as categorization_model
+
+        categorization_model.predict_categories(["WALMART"])
+        with patch.object(categorization_model, "MODEL_CHECK_INTERVAL_SECONDS", 0), \
+                patch.object(categorization_model, "_artifact_version", return_value="retrained"):
+            categorization_model.predict_categories(["WALMART"])
+
+        assert categorization_model.model_version == "retrained"
+        assert mock_vectorizer.transform.call_count == 2
+        assert categorization_model.prediction_cache_info()["hits"] == 0
+
+    def test_model_loaded_lazily(self, mock_model_loading):
+        """Test that importing the module loads nothing and the first prediction loads the artifacts memory-mapped."""
+        mock_model, mock_vectorizer = mock_model_loading
+        import joblib
+        import app.categorization.model as categorization_model
+
+        assert categorization_model.model is None
+        assert joblib.load.call_count == 0
+
+        categorization_model.predict_categories(["WALMART"])
+        categorization_model.predict_categories(["TARGET"])
+
+        assert joblib.load.call_count == 2
+        for call in joblib.load.call_args_list:
+            assert call.kwargs == {"mmap_mode": "r"}
+        assert categorization_model.model is mock_model
+
+    def test_warmup(self, mock_model_loading):
+        """Test that warmup loads the artifacts and scores once without filling the prediction cache."""
+        mock_model, mock_vectorizer = mock_model_loading
+        import app.categorization.model as categorization_model
+
+        categorization_model.warmup()
+
+        assert categorization_model.vectorizer is mock_vectorizer
+        mock_model.predict_proba.assert_called_once()
+        assert categorization_model.prediction_cache_info()["size"] == 0
+
+    def test_predict_top_k(self, mock_model_loading):
+        """Test that top-k predictions are ranked from a single probability matrix."""
+        mock_model, mock_vectorizer = mock_model_loading
+        from app.categorization.model import predict_top_k, predict_category_with_confidence
+
+        mock_model.predict_proba.return_value = np.array([[0.2, 0.5, 0.3], [0.1, 0.1, 0.8]])
+
+        result = predict_top_k(["WALMART", "UBER RIDE", "walmart"], k=2)
+
+        assert result == [
+            [("Dining", 0.5), ("Transportation", 0.3)],
+            [("Transportation", 0.8), ("Groceries", 0.1)],
+            [("Dining", 0.5), ("Transportation", 0.3)],
+        ]
+        # Confidences and larger k reuse the cached ranking.
+        assert predict_category_with_confidence("Walmart") == ("Dining", 0.5, False)
+        assert predict_top_k(["UBER RIDE"], k=3) == [[("Transportation", 0.8), ("Groceries", 0.1), ("Dining", 0.1)]]
+        mock_model.predict_proba.assert_called_once()
+        mock_model.predict.assert_not_called()
+
+    def test_predict_top_k_invalid_k(self, mock_model_loading):
+        """Test that k outside 1..MAX_TOP_K is rejected."""
+        from app.categorization.model import MAX_TOP_K, predict_top_k
+
+        with pytest.raises(ValueError):
+            predict_top_k(["WALMART"], k=0)
+        with pytest.raises(ValueError):
+            predict_top_k(["WALMART"], k=MAX_TOP_K + 1)
+
+def test_single_predictions_are_micro_batched(mock_model_loading):
+    """Test that single descriptions go through the batchers and give the same results either way."""
+    mock_model, _ = mock_model_loading
+    import app.categorization.model as categorization_model
+
+    with patch.object(categorization_model, "MICRO_BATCHING", True):
+        batched = (categorization_model.predict_category_versioned("Corner market"),
+                   categorization_model.rank_category("Corner market", 2))
+    categorization_model.clear_prediction_cache()
+    with patch.object(categorization_model, "MICRO_BATCHING", False):
+        direct = (categorization_model.predict_category_versioned("Corner market"),
+                  categorization_model.rank_category("Corner market", 2))
+
+    assert batched == direct
+    assert batched[1][1] == [("Groceries", 0.8), ("Dining", 0.1)]
+    assert categorization_model.batching_info()["prediction_labels"]["queue_depth"] == 0
+    with pytest.raises(ValueError):
+        categorization_model.rank_category("Corner market", 0)
@@ -135,3 +135,36 @@ class TestTransactionModel:
         assert result.name == "Relationship Test Transaction"
         assert result.user_id == user.id
         assert result.category_id == category.id
+
+    def test_fingerprint_assigned_on_insert(self, db_session):
+        """Test that identical transactions get consecutive fingerprint ordinals"""
+        from app.utils.fingerprint import transaction_fingerprint
+
+        category = db_session.query(Category).filter(Category.name == "Test Category").first()
+        first, second = (
+            Transaction(
+                user_id="auth0|1234567890",
+                category_id=category.id,
+                description="Fingerprinted purchase",
+                date=date(2025, 4, 1),
+                amount=9.99
+            )
+            for _ in range(2)
+        )
+        db_session.add_all([first, second])
+        db_session.commit()
+        third = Transaction(
+            user_id="auth0|1234567890",
+            category_id=category.id,
+            description="FINGERPRINTED  PURCHASE",
+            date=date(2025, 4, 1),
+            amount=9.99
+        )
+        db_session.add(third)
+        db_session.commit()
+
+        fingerprints = {first.fingerprint, second.fingerprint, third.fingerprint}
+        assert fingerprints == {
+            transaction_fingerprint("Fingerprinted purchase", date(2025, 4, 1), 9.99, ordinal)
+            for ordinal in (1, 2, 3)
+        }
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from app.models.models import CategorizationRule, Category
+from app.schemas.schemas import CategorizationRuleRequest
+from app.services.categorization_rule_service import (
+    _validate, clear_rule_programs, compile_rules, get_rule_program
+)
+
+USER_ID = "auth0|1234567890"
+
+def make_rule(id, category_id, pattern, min_amount=None, max_amount=None):
+    return CategorizationRule(id=id, category_id=category_id, pattern=pattern, match_type="contains",
+                              min_amount=min_amount, max_amount=max_amount)
+
+def test_match_frame_uses_first_matching_rule():
+    """Test that each row gets the first rule it matches, with bounds on the size of the amount."""
+    program = compile_rules([
+        make_rule(1, 10, "rent", min_amount=1000),
+        make_rule(2, 20, "shell 5"),
+        make_rule(3, 30, "rent"),
+        make_rule(4, 40, "a.b"),
+    ])
+    descriptions = pd.Series(["MONTHLY RENT", "Rent a bike", "SHELL 5744", "SHELL OIL", "AXB", "A.B STORE"], index=[5, 6, 7, 8, 9, 10])
+    amounts = pd.Series([-1500.0, 12.0, -40.0, -40.0, -1.0, -1.0], index=descriptions.index)
+
+    result = program.match_frame(descriptions, amounts)
+
+    assert result.index.equals(descriptions.index)
+    assert result.loc[[5, 6, 7, 10]].tolist() == [10, 30, 20, 40]
+    assert result.loc[[8, 9]].isna().all()
+    assert program.match("monthly rent", 1500) == 10
+    assert program.match("monthly rent", -999) == 30
+    assert program.match("shell oil", -40) is None
+
+def test_empty_program():
+    program = compile_rules([])
+
+    assert not program
+    assert program.match_frame(pd.Series(["RENT"]), pd.Series([1.0])).isna().all()
+    assert program.match("RENT", 1.0) is None
+
+@pytest.mark.parametrize("request_fields", [
+    {"pattern": "(a+)+$", "match_type": "regex"},
+    {"pattern": "rent", "match_type": "startswith"},
+    {"pattern": ""},
+    {"pattern": "x" * 201},
+    {"pattern": "rent", "min_amount": -1},
+    {"pattern": "rent", "min_amount": 10, "max_amount": 5},
+])
+def test_validate_rejects(request_fields):
+    with pytest.raises(HTTPException) as exc_info:
+        _validate(CategorizationRuleRequest(category="Test Category", **request_fields))
+    assert exc_info.value.status_code == 400
+
+def test_patterns_are_literal():
+    """Test that regular expression syntax in a pattern is matched as text, without backtracking."""
+    request = CategorizationRuleRequest(pattern="(a+)+$", category="Test Category")
+    _validate(request)
+    program = compile_rules([make_rule(1, 10, request.pattern)])
+
+    assert program.match("a" * 10_000 + "!", 1.0) is None
+    assert program.match("PAID (A+)+$ TWICE", 1.0) == 10
+
+def test_get_rule_program_recompiles_after_changes(db_session):
+    """Test that the cached program is reused until the user's rules change."""
+    clear_rule_programs()
+    category = db_session.query(Category).filter(Category.user_id == USER_ID, Category.name == "Test Category").first()
+    first = CategorizationRule(user_id=USER_ID, category_id=category.id, pattern="shell")
+    db_session.add(first)
+    db_session.commit()
+
+    program = get_rule_program(db_session, USER_ID)
+    assert len(program) == 1
+    assert get_rule_program(db_session, USER_ID) is program
+
+    rule = CategorizationRule(user_id=USER_ID, category_id=category.id, pattern="chevron", priority=-1)
+    db_session.add(rule)
+    db_session.commit()
+    program = get_rule_program(db_session, USER_ID)
+    assert [compiled.id for compiled in program.rules] == [rule.id, first.id]
+
+    db_session.delete(rule)
+    db_session.commit()
+    assert len(get_rule_program(db_session, USER_ID)) == 1
+    assert not get_rule_program(db_session, "someone-else")
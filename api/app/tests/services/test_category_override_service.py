@@ -0,0 +1,84 @@
+import datetime
+import pytest
+from app.models.models import Category, CategoryCorrections, Transaction
+from app.services import category_override_service
+from app.services.category_override_service import get_user_overrides, override_for, record_correction
+
+USER_ID = "auth0|overrides"
+
+class TestCategoryOverrideService:
+
+    @pytest.fixture(autouse=True)
+    def clean_state(self, db_session):
+        """Start every test with no loaded indexes and no corrections for the test user."""
+        category_override_service.clear_overrides()
+        db_session.query(CategoryCorrections).filter(CategoryCorrections.user_id == USER_ID).delete()
+        db_session.query(Transaction).filter(Transaction.user_id == USER_ID).delete()
+        db_session.commit()
+        yield
+        category_override_service.clear_overrides()
+
+    def correct(self, db_session, description, category_name):
+        category = db_session.query(Category).filter(Category.name == category_name).one()
+        txn = Transaction(user_id=USER_ID, description=description, date=datetime.date(2025, 3, 1), amount=10.0)
+        db_session.add(txn)
+        db_session.flush()
+        correction = CategoryCorrections(user_id=USER_ID, transaction_id=txn.id, new_category_id=category.id)
+        db_session.add(correction)
+        db_session.commit()
+        return correction, category
+
+    def test_overrides_built_from_corrections(self, db_session):
+        """Test that corrections map merchant keys to the corrected category, the latest one winning."""
+        self.correct(db_session, "STARBUCKS STORE #1234", "Old Category")
+        _, latest = self.correct(db_session, "POS PURCHASE STARBUCKS 01/15", "New Category")
+
+        overrides = get_user_overrides(db_session, USER_ID)
+
+        assert overrides == {"starbucks": latest.id}
+        assert override_for(overrides, "Starbucks #987") == latest.id
+        assert override_for(overrides, "Unknown merchant") is None
+        assert get_user_overrides(db_session, "auth0|someone-else") == {}
+
+    def test_overrides_synced_incrementally(self, db_session):
+        """Test that later corrections are picked up on the next read, whichever process made them."""
+        assert get_user_overrides(db_session, USER_ID) == {}
+
+        correction, category = self.correct(db_session, "NETFLIX.COM", "Test Category")
+        record_correction(USER_ID, correction.id, "NETFLIX.COM", category.id)
+        _, other = self.correct(db_session, "SHELL OIL 5744", "New Category")
+
+        assert get_user_overrides(db_session, USER_ID) == {"netflix": category.id, "shell oil": other.id}
+
+    def test_record_correction_updates_loaded_index(self, db_session):
+        """Test that a recorded correction is visible without reading the corrections table again."""
+        get_user_overrides(db_session, USER_ID)
+        record_correction(USER_ID, 10 ** 9, "Acme Hardware #12", 42)
+
+        assert category_override_service._indexes[USER_ID]["overrides"] == {"acme hardware": 42}
+
+    def test_unchanged_corrections_return_the_cached_index(self, db_session):
+        """Test that the same read-only index is returned until the user's corrections change."""
+        correction, category = self.correct(db_session, "NETFLIX.COM", "Test Category")
+        overrides = get_user_overrides(db_session, USER_ID)
+
+        assert get_user_overrides(db_session, USER_ID) is overrides
+        with pytest.raises(TypeError):
+            overrides["netflix"] = 0
+
+        _, other = self.correct(db_session, "SHELL OIL 5744", "New Category")
+        synced = get_user_overrides(db_session, USER_ID)
+        assert synced is not overrides
+        assert overrides == {"netflix": category.id}
+        assert synced == {"netflix": category.id, "shell oil": other.id}
+
+    def test_deleted_correction_rebuilds_the_index(self, db_session):
+        """Test that removing a correction, which adds no rows, still refreshes the index."""
+        correction, _ = self.correct(db_session, "NETFLIX.COM", "Test Category")
+        _, other = self.correct(db_session, "SHELL OIL 5744", "New Category")
+        assert set(get_user_overrides(db_session, USER_ID)) == {"netflix", "shell oil"}
+
+        db_session.delete(correction)
+        db_session.commit()
+
+        assert get_user_overrides(db_session, USER_ID) == {"shell oil": other.id}
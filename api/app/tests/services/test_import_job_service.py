@@ -0,0 +1,103 @@
+import os
+import io
+import datetime
+import pytest
+from fastapi import UploadFile
+from app.models.models import ImportJob, Transaction
+from app.services import import_job_service
+from app.services.import_job_service import enqueue_import_job, claim_import_job, process_import_job
+from app.tests.conftest import TestingSessionLocal
+from app.worker import run_worker
+
+# Mock user for testing
+MOCK_USER = {"sub": "auth0|1234567890", "email": "test@example.com"}
+
+CSV_CONTENT = (
+    "date,description,amount,category\n"
+    "2025-04-01,Worker transaction one,12.5,Test Category\n"
+    "2025-04-02,Worker transaction two,20.0,Test Category\n"
+)
+
+class TestImportJobService:
+
+    @pytest.fixture(autouse=True)
+    def storage_dir(self, tmp_path, monkeypatch):
+        """Store uploads in a per-test directory."""
+        monkeypatch.setattr(import_job_service, "IMPORT_STORAGE_DIR", str(tmp_path))
+        return tmp_path
+
+    def _enqueue(self, db_session, filename="statement.csv", content=CSV_CONTENT):
+        upload = UploadFile(file=io.BytesIO(content.encode("utf-8")), filename=filename)
+        return enqueue_import_job(upload, db_session, MOCK_USER)
+
+    def test_enqueue_stores_upload(self, db_session):
+        """Test that enqueueing copies the upload and creates a queued job."""
+        job = self._enqueue(db_session)
+
+        assert job.status == "queued"
+        assert job.user_id == MOCK_USER["sub"]
+        with open(os.path.join(job.storage_path, job.filename)) as f:
+            assert f.read() == CSV_CONTENT
+
+    def test_claim_import_job(self, db_session):
+        """Test that a claimed job is running and cannot be claimed twice."""
+        job = self._enqueue(db_session)
+
+        claimed = claim_import_job(db_session, job.id)
+        assert claimed.id == job.id
+        assert claimed.status == "running"
+        assert claimed.started_at is not None
+        assert claim_import_job(db_session, job.id) is None
+
+    def test_claim_stale_running_job(self, db_session):
+        """Test that jobs left running by a crashed worker are claimed again."""
+        job = self._enqueue(db_session)
+        stale = datetime.datetime.now() - datetime.timedelta(seconds=import_job_service.IMPORT_JOB_STALE_SECONDS + 60)
+        job.status = "running"
+        job.started_at = stale
+        job.updated_at = stale
+        db_session.commit()
+
+        claimed = claim_import_job(db_session, job.id)
+        assert claimed is not None
+        assert claimed.status == "running"
+
+    def test_long_running_job_with_progress_is_not_claimed(self, db_session):
+        """Test that a job started long ago but still reporting progress stays with its worker."""
+        job = self._enqueue(db_session)
+        job.status = "running"
+        job.started_at = datetime.datetime.now() - datetime.timedelta(seconds=import_job_service.IMPORT_JOB_STALE_SECONDS + 60)
+        job.updated_at = datetime.datetime.now()
+        db_session.commit()
+
+        assert claim_import_job(db_session, job.id) is None
+
+    def test_process_import_job(self, db_session):
+        """Test running a job inserts its transactions and removes the stored upload."""
+        job = self._enqueue(db_session)
+
+        process_import_job(TestingSessionLocal, job.id)
+
+        db_session.expire_all()
+        job = db_session.get(ImportJob, job.id)
+        assert job.status == "completed"
+        assert job.rows_inserted == 2
+        assert job.finished_at is not None
+        assert not os.path.exists(job.storage_path)
+        assert db_session.query(Transaction).filter(
+            Transaction.description == "Worker transaction one"
+        ).count() == 1
+
+    def test_run_worker_once(self, db_session):
+        """Test that the worker drains the queue and exits."""
+        first = self._enqueue(db_session, filename="first.csv")
+        second = self._enqueue(db_session, filename="second.csv", content="date,description\n2025-04-01,No amount\n")
+
+        run_worker(once=True, session_factory=TestingSessionLocal)
+
+        db_session.expire_all()
+        assert db_session.get(ImportJob, first.id).status == "completed"
+        failed = db_session.get(ImportJob, second.id)
+        assert failed.status == "failed"
+        assert "Missing required columns" in failed.error
+        assert db_session.query(ImportJob).filter(ImportJob.status == "queued").count() == 0
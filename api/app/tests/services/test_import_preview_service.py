@@ -0,0 +1,105 @@
+import io
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException, UploadFile
+from app.models.models import Category, Transaction
+from app.services import import_preview_service
+from app.services.import_preview_service import commit_import_preview, preview_import
+
+# Mock user for testing
+MOCK_USER = {"sub": "auth0|1234567890", "email": "test@example.com"}
+
+CSV_CONTENT = (
+    "date,description,amount,category\n"
+    "2025-06-01,Preview coffee,3.5,Test Category\n"
+    "2025-06-01,Preview coffee,3.5,Test Category\n"
+    "2025-06-02,Preview mystery shop,20.0,\n"
+    "2025-06-03,,5.0,Test Category\n"
+)
+
+def upload(content=CSV_CONTENT, filename="preview.csv"):
+    return UploadFile(file=io.BytesIO(content.encode("utf-8")), filename=filename)
+
+class TestImportPreviewService:
+
+    @pytest.fixture(autouse=True)
+    def clean_state(self, db_session):
+        """Start every test with no cached previews and no preview transactions."""
+        import_preview_service._previews.clear()
+        db_session.query(Transaction).filter(Transaction.description.like("Preview%")).delete(synchronize_session=False)
+        db_session.commit()
+        with patch("app.services.transaction_import_service.predict_categories_versioned") as mock_predict:
+            mock_predict.side_effect = lambda descriptions: ("test-version", ["Unknown"] * len(descriptions))
+            yield mock_predict
+
+    def test_preview_writes_nothing(self, db_session, clean_state):
+        """Test that a preview reports rows and categories without inserting them."""
+        preview = preview_import(upload(), db_session, MOCK_USER)
+
+        assert preview["rows_processed"] == 4
+        assert preview["rows_new"] == 3
+        assert preview["rows_duplicate"] == 0
+        assert preview["rows_skipped"] == 1
+        assert [row["category"] for row in preview["rows"]] == ["Test Category", "Test Category", "Uncategorized"]
+        assert db_session.query(Transaction).filter(Transaction.description.like("Preview%")).count() == 0
+
+    def test_preview_is_cached_by_content(self, db_session, clean_state):
+        """Test that previewing the same file again reuses the cached result."""
+        first = preview_import(upload(), db_session, MOCK_USER)
+        second = preview_import(upload(filename="renamed.csv"), db_session, MOCK_USER, limit=1)
+
+        assert second["preview_id"] == first["preview_id"]
+        assert len(second["rows"]) == 1
+        clean_state.assert_called_once_with(["Preview mystery shop"])
+
+    def test_commit_writes_preview_without_reparsing(self, db_session, clean_state):
+        """Test that commit inserts the previewed rows without parsing or predicting again."""
+        preview = preview_import(upload(), db_session, MOCK_USER)
+
+        with patch("app.services.import_preview_service.iter_transactions_file") as mock_parse:
+            result = commit_import_preview(db_session, MOCK_USER, preview["preview_id"])
+            mock_parse.assert_not_called()
+        assert clean_state.call_count == 1
+
+        assert result["rows_inserted"] == 3
+        assert result["rows_skipped"] == 1
+        assert db_session.query(Transaction).filter(Transaction.description.like("Preview%")).count() == 3
+
+        # The preview is used up; previewing again shows every row as a duplicate.
+        with pytest.raises(HTTPException) as exc_info:
+            commit_import_preview(db_session, MOCK_USER, preview["preview_id"])
+        assert exc_info.value.status_code == 404
+        again = preview_import(upload(), db_session, MOCK_USER)
+        assert again["rows_duplicate"] == 3
+        assert all(row["duplicate"] for row in again["rows"])
+
+    def test_commit_other_user(self, db_session):
+        """Test that a preview cannot be committed by another user."""
+        preview = preview_import(upload(), db_session, MOCK_USER)
+
+        with pytest.raises(HTTPException) as exc_info:
+            commit_import_preview(db_session, {"sub": "auth0|someone-else"}, preview["preview_id"])
+        assert exc_info.value.status_code == 404
+
+    def test_commit_after_category_deleted(self, db_session):
+        """Test that rows whose category disappeared since the preview become uncategorized."""
+        category = Category(name="Preview Only", user_id=MOCK_USER["sub"])
+        db_session.add(category)
+        db_session.commit()
+        content = "date,description,amount,category\n2025-06-05,Preview gift,15.0,Preview Only\n"
+        preview = preview_import(upload(content), db_session, MOCK_USER)
+        db_session.delete(category)
+        db_session.commit()
+
+        commit_import_preview(db_session, MOCK_USER, preview["preview_id"])
+
+        txn = db_session.query(Transaction).filter(Transaction.description == "Preview gift").one()
+        assert db_session.get(Category, txn.category_id).name == "Uncategorized"
+
+    def test_preview_too_large(self, db_session, monkeypatch):
+        """Test that files with more rows than the cache holds are refused."""
+        monkeypatch.setattr(import_preview_service, "IMPORT_PREVIEW_CACHE_ROWS", 2)
+
+        with pytest.raises(HTTPException) as exc_info:
+            preview_import(upload(), db_session, MOCK_USER)
+        assert exc_info.value.status_code == 413
@@ -118,7 +118,7 @@ class TestTransactionService:
         db_txn = db_session.query(Transaction).filter(Transaction.id == result.id).first()
         assert db_txn is not None
     
-    @patch("app.services.transaction_crud_service.predict_category")
+    @patch("app.services.transaction_crud_service.predict_category_versioned")
     def test_create_transaction_without_category(self, mock_predict, db_session):
         """Test creating a transaction without a specified category (should use prediction)."""
         # Setup: Ensure categories exist
@@ -140,7 +140,7 @@ class TestTransactionService:
         db_session.commit()
 
         # Setup mock
-        mock_predict.return_value = predicted_category
+        mock_predict.return_value = ("test-version", predicted_category)
         
         # Create transaction request without category
         transaction_request = NewTransactionRequest(
@@ -160,8 +160,9 @@ class TestTransactionService:
         
         # Verify prediction was called
         mock_predict.assert_called_once_with("Predictable transaction")
+        assert result.model_version == "test-version"
     
-    @patch("app.services.transaction_crud_service.predict_category")
+    @patch("app.services.transaction_crud_service.predict_category_versioned")
     def test_create_transaction_fallback_to_uncategorized(self, mock_predict, db_session):
         """Test creating a transaction when prediction fails to find a category."""
         # Setup: Ensure categories exist
@@ -171,7 +172,7 @@ class TestTransactionService:
         uncategorized = db_session.query(Category).filter(Category.name == "Uncategorized").first()
         
         # Setup mock to return a non-existent category
-        mock_predict.return_value = "NonExistentCategory"
+        mock_predict.return_value = ("test-version", "NonExistentCategory")
         
         # Create transaction request without category
         transaction_request = NewTransactionRequest(
@@ -403,6 +404,8 @@ class TestTransactionService:
             # Verify DB state (soft delete)
             deleted_txn = db_session.query(Transaction).filter(Transaction.id == txn.id).first()
             assert deleted_txn.is_deleted == 1
+            # The fingerprint is released so the transaction can be re-imported
+            assert deleted_txn.fingerprint is None
     
     def test_delete_transaction_not_found(self, db_session):
         """Test deleting a non-existent transaction."""
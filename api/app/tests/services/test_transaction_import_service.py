@@ -4,8 +4,14 @@ import datetime
 from unittest.mock import patch, AsyncMock, MagicMock
 from fastapi import HTTPException, UploadFile
 from sqlalchemy import func
-from app.models.models import Transaction, Category, Section
-from app.services.transaction_import_service import import_transactions_service
+from app.models.models import Transaction, Category, Section, ImportedFile
+from app.services.transaction_import_service import (
+    find_imported_file,
+    import_transactions_service,
+    import_transaction_files,
+    load_imported_ranges,
+    record_imported_file,
+)
 
 # Mock user for testing
 MOCK_USER = {"sub": "auth0|1234567890", "email": "test@example.com"}
@@ -40,8 +46,8 @@ class TestImportTransactionsService:
     
     @pytest.fixture
     def mock_parse_file(self):
-        """Create a mock for the parse_transactions_file function."""
-        with patch('app.services.transaction_import_service.parse_transactions_file') as mock_parse:
+        """Create a mock for the iter_transactions_file function."""
+        with patch('app.services.transaction_import_service.iter_transactions_file') as mock_parse:
             # Default DataFrame with test data
             test_df = pd.DataFrame({
                 'date': [datetime.date(2025, 3, 1), datetime.date(2025, 3, 2), datetime.date(2025, 3, 3)],
@@ -50,19 +56,17 @@ class TestImportTransactionsService:
                 'category': ['Groceries', 'Dining', 'Transportation']
             })
             
-            # Create an AsyncMock that returns the test DataFrame
-            async_mock = AsyncMock(return_value=test_df)
-            mock_parse.return_value = test_df
-            mock_parse.side_effect = async_mock
+            # Stream the test DataFrame as a single chunk
+            mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([test_df])
             
             yield mock_parse, test_df
     
     @pytest.fixture
     def mock_predict_category(self):
-        """Create a mock for the predict_category function."""
-        with patch('app.services.transaction_import_service.predict_category') as mock_predict:
+        """Create a mock for the predict_categories_versioned batch function."""
+        with patch('app.services.transaction_import_service.predict_categories_versioned') as mock_predict:
             # Default to "Uncategorized" for any prediction
-            mock_predict.return_value = "Uncategorized"
+            mock_predict.side_effect = lambda descriptions: ("test-version", ["Uncategorized"] * len(descriptions))
             yield mock_predict
     
     @pytest.mark.asyncio
@@ -199,12 +203,11 @@ class TestImportTransactionsService:
         })
         
         # Update the mock to return our custom DataFrame
-        mock_parse.return_value = test_df
-        async_mock = AsyncMock(return_value=test_df)
-        mock_parse.side_effect = async_mock
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([test_df])
         
         # Setup prediction to return "Dining"
-        mock_predict_category.return_value = "Dining"
+        mock_predict_category.side_effect = None
+        mock_predict_category.return_value = ("test-version", ["Dining"])
         
         # Clear existing transactions
         db_session.query(Transaction).delete()
@@ -239,7 +242,7 @@ class TestImportTransactionsService:
         assert transactions[0].category_id == dining_category.id
         
         # Verify prediction was called
-        mock_predict_category.assert_called_once_with("Unknown transaction")
+        mock_predict_category.assert_called_once_with(["Unknown transaction"])
     
     @pytest.mark.asyncio
     async def test_import_transactions_invalid_category(self, db_session, setup_categories, mock_parse_file, mock_predict_category):
@@ -255,12 +258,11 @@ class TestImportTransactionsService:
         })
         
         # Update the mock to return our custom DataFrame
-        mock_parse.return_value = test_df
-        async_mock = AsyncMock(return_value=test_df)
-        mock_parse.side_effect = async_mock
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([test_df])
         
         # Setup prediction to return a non-existent category
-        mock_predict_category.return_value = "AnotherNonExistentCategory"
+        mock_predict_category.side_effect = None
+        mock_predict_category.return_value = ("test-version", ["AnotherNonExistentCategory"])
         
         # Clear existing transactions
         db_session.query(Transaction).delete()
@@ -310,9 +312,7 @@ class TestImportTransactionsService:
         })
         
         # Update the mock to return our custom DataFrame
-        mock_parse.return_value = test_df
-        async_mock = AsyncMock(return_value=test_df)
-        mock_parse.side_effect = async_mock
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([test_df])
         
         # Clear existing transactions
         db_session.query(Transaction).delete()
@@ -340,8 +340,8 @@ class TestImportTransactionsService:
     @pytest.mark.asyncio
     async def test_import_transactions_file_parsing_error(self, db_session):
         """Test error handling when file parsing fails."""
-        # Mock parse_transactions_file to raise an HTTPException
-        with patch('app.services.transaction_import_service.parse_transactions_file') as mock_parse:
+        # Mock iter_transactions_file to raise an HTTPException
+        with patch('app.services.transaction_import_service.iter_transactions_file') as mock_parse:
             mock_parse.side_effect = HTTPException(
                 status_code=400, 
                 detail="Error parsing file: Invalid format"
@@ -367,9 +367,9 @@ class TestImportTransactionsService:
         mock_file = MagicMock(spec=UploadFile)
         mock_file.filename = "test_transactions.csv"
         
-        # Mock db.bulk_save_objects to raise an exception
-        with patch.object(db_session, 'bulk_save_objects') as mock_bulk_save:
-            mock_bulk_save.side_effect = Exception("Database error")
+        # Mock bulk_insert to raise an exception
+        with patch('app.services.transaction_import_service.bulk_insert') as mock_bulk_insert:
+            mock_bulk_insert.side_effect = Exception("Database error")
             
             # Call the import service and verify exception is raised
             with pytest.raises(HTTPException) as exc_info:
@@ -392,9 +392,7 @@ class TestImportTransactionsService:
         })
         
         # Update the mock to return the empty DataFrame
-        mock_parse.return_value = empty_df
-        async_mock = AsyncMock(return_value=empty_df)
-        mock_parse.side_effect = async_mock
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([empty_df])
         
         # Clear existing transactions
         db_session.query(Transaction).delete()
@@ -432,9 +430,7 @@ class TestImportTransactionsService:
         })
         
         # Update the mock to return our custom DataFrame
-        mock_parse.return_value = test_df
-        async_mock = AsyncMock(return_value=test_df)
-        mock_parse.side_effect = async_mock
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([test_df])
         
         # Clear existing transactions
         db_session.query(Transaction).delete()
@@ -475,12 +471,11 @@ class TestImportTransactionsService:
         })
         
         # Update the mock to return our custom DataFrame
-        mock_parse.return_value = test_df
-        async_mock = AsyncMock(return_value=test_df)
-        mock_parse.side_effect = async_mock
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([test_df])
         
         # Setup prediction to return a non-existent category
-        mock_predict_category.return_value = "NonExistentCategory"
+        mock_predict_category.side_effect = None
+        mock_predict_category.return_value = ("test-version", ["NonExistentCategory"])
         
         # Clear ALL categories for this test
         db_session.query(Category).filter(
@@ -529,3 +524,212 @@ class TestImportTransactionsService:
         
         assert len(transactions) == 1
         assert transactions[0].category_id == uncategorized.id
+
+    @pytest.mark.asyncio
+    async def test_import_transactions_across_chunks(self, db_session, setup_categories, mock_parse_file):
+        """Test that duplicates are detected consistently when a file is streamed in several chunks."""
+        mock_parse, _ = mock_parse_file
+
+        first_chunk = pd.DataFrame({
+            'date': [datetime.date(2025, 3, 9), datetime.date(2025, 3, 10)],
+            'description': ['Chunked transaction', 'Existing transaction'],
+            'amount': [10.0, 20.0],
+            'category': ['Groceries', 'Groceries']
+        })
+        second_chunk = pd.DataFrame({
+            'date': [datetime.date(2025, 3, 9), datetime.date(2025, 3, 10)],
+            'description': ['Chunked transaction', 'Existing transaction'],
+            'amount': [10.0, 20.0],
+            'category': ['Groceries', 'Groceries']
+        })
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([first_chunk, second_chunk])
+
+        # Clear existing transactions and add one that matches a file row.
+        db_session.query(Transaction).delete()
+        grocery_category = db_session.query(Category).filter(
+            Category.name == "Groceries",
+            Category.user_id == MOCK_USER["sub"]
+        ).first()
+        db_session.add(Transaction(
+            user_id=MOCK_USER["sub"],
+            description="Existing transaction",
+            date=datetime.date(2025, 3, 10),
+            amount=20.0,
+            category_id=grocery_category.id,
+            is_imported=1,
+            is_deleted=0
+        ))
+        db_session.commit()
+
+        mock_file = MagicMock(spec=UploadFile)
+        mock_file.filename = "chunked.csv"
+
+        result = await import_transactions_service(mock_file, db_session, MOCK_USER, chunk_size=2)
+        assert result["detail"] == "Transactions imported successfully."
+
+        counts = dict(db_session.query(
+            Transaction.description,
+            func.count(Transaction.id)
+        ).filter(
+            Transaction.user_id == MOCK_USER["sub"],
+            Transaction.is_deleted == 0
+        ).group_by(Transaction.description).all())
+
+        # Both copies of the new row are kept, and only the second copy of
+        # the existing row is new.
+        assert counts["Chunked transaction"] == 2
+        assert counts["Existing transaction"] == 2
+
+    @pytest.mark.asyncio
+    async def test_import_transactions_duplicate_after_category_change(self, db_session, setup_categories, mock_parse_file):
+        """Test that re-importing a transaction whose category was corrected is still a duplicate."""
+        mock_parse, test_df = mock_parse_file
+
+        db_session.query(Transaction).delete()
+        db_session.commit()
+
+        mock_file = MagicMock(spec=UploadFile)
+        mock_file.filename = "test_transactions.csv"
+        await import_transactions_service(mock_file, db_session, MOCK_USER)
+
+        # The user moves the grocery transaction to another category.
+        dining_category = db_session.query(Category).filter(
+            Category.name == "Dining",
+            Category.user_id == MOCK_USER["sub"]
+        ).first()
+        grocery_txn = db_session.query(Transaction).filter(Transaction.description == "Grocery store").first()
+        grocery_txn.category_id = dining_category.id
+        db_session.commit()
+
+        # Importing the same statement again adds nothing.
+        await import_transactions_service(mock_file, db_session, MOCK_USER)
+
+        transactions = db_session.query(Transaction).filter(
+            Transaction.user_id == MOCK_USER["sub"],
+            Transaction.is_deleted == 0
+        ).all()
+        assert len(transactions) == 3
+        assert all(t.fingerprint is not None for t in transactions)
+
+    @pytest.mark.asyncio
+    async def test_import_transactions_mixed_categories(self, db_session, setup_categories, mock_parse_file, mock_predict_category):
+        """Test that only rows without a known file category are sent for prediction."""
+        mock_parse, _ = mock_parse_file
+        mock_parse.side_effect = lambda file, chunk_size=None, **options: iter([pd.DataFrame({
+            'date': [datetime.date(2025, 3, 1)] * 4,
+            'description': ['Grocery store', 'Taxi', 'Unknown shop', None],
+            'amount': [10.0, 20.0, 30.0, 40.0],
+            'category': ['  GROCERIES ', 'Transportation', None, 'Dining'],
+        })])
+        mock_predict_category.side_effect = lambda descriptions: ("test-version", ["Dining"] * len(descriptions))
+
+        db_session.query(Transaction).delete()
+        db_session.commit()
+
+        mock_file = MagicMock(spec=UploadFile)
+        mock_file.filename = "test_transactions.csv"
+        result = await import_transactions_service(mock_file, db_session, MOCK_USER)
+
+        # The row without a description is skipped and only "Unknown shop" needs the model.
+        assert result["rows_inserted"] == 3
+        mock_predict_category.assert_called_once_with(["Unknown shop"])
+        assert result["stats"]["rows"] == {"parsed": 4, "invalid": 1, "rule_matched": 0, "overridden": 0, "predicted": 1, "inserted": 3, "duplicate": 0}
+        assert {"parse", "predict", "insert", "total"} <= set(result["stats"]["seconds"])
+        categories = {
+            t.description: db_session.get(Category, t.category_id).name
+            for t in db_session.query(Transaction).filter(Transaction.user_id == MOCK_USER["sub"]).all()
+        }
+        assert categories == {"Grocery store": "Groceries", "Taxi": "Transportation", "Unknown shop": "Dining"}
+        # Only the predicted row records the model version.
+        versions = {
+            t.description: t.model_version
+            for t in db_session.query(Transaction).filter(Transaction.user_id == MOCK_USER["sub"]).all()
+        }
+        assert versions == {"Grocery store": None, "Taxi": None, "Unknown shop": "test-version"}
+
+    def test_import_transaction_files_collapses_overlaps(self, db_session, setup_categories, tmp_path):
+        """Test that transactions repeated across overlapping statements are imported once."""
+        january = tmp_path / "january.csv"
+        january.write_text(
+            "Date,Description,Amount,Category\n"
+            "2025-01-30,Coffee,3.50,Dining\n"
+            "2025-01-30,Coffee,3.50,Dining\n"
+            "2025-01-31,Groceries run,42.00,Groceries\n"
+        )
+        # February's statement starts two days early and repeats one coffee and the groceries.
+        february = tmp_path / "february.csv"
+        february.write_text(
+            "Posting Date,Description,Debit,Category\n"
+            "2025-01-30,COFFEE,3.50,Dining\n"
+            "2025-01-31,Groceries run,42.00,Groceries\n"
+            "2025-02-01,Bus ticket,2.75,Transportation\n"
+        )
+        db_session.query(Transaction).delete()
+        db_session.commit()
+
+        result = import_transaction_files([str(january), str(february)], db_session, MOCK_USER)
+
+        assert result["rows_processed"] == 6
+        assert result["rows_inserted"] == 4
+        assert result["rows_skipped"] == 2
+        descriptions = sorted(t.description for t in db_session.query(Transaction).filter(
+            Transaction.user_id == MOCK_USER["sub"]
+        ).all())
+        assert descriptions == ["Bus ticket", "Coffee", "Coffee", "Groceries run"]
+
+        # Importing January again on its own adds nothing.
+        result = import_transaction_files([str(january)], db_session, MOCK_USER)
+        assert result["rows_inserted"] == 0
+
+class TestImportedFiles:
+
+    @pytest.fixture(autouse=True)
+    def clean_imported_files(self, db_session):
+        db_session.query(ImportedFile).delete()
+        db_session.commit()
+
+    def result(self, date_from, date_to, rows=3):
+        return {"rows_processed": rows, "rows_inserted": rows, "rows_skipped": 0, "date_from": date_from, "date_to": date_to}
+
+    def test_record_and_find(self, db_session):
+        """Test that a recorded file is found by user and content hash, and recording again replaces it."""
+        record_imported_file(db_session, MOCK_USER, "a" * 64, "march.csv",
+                             self.result(datetime.date(2025, 3, 1), datetime.date(2025, 3, 31)))
+        record_imported_file(db_session, MOCK_USER, "a" * 64, "march-again.csv",
+                             self.result(datetime.date(2025, 3, 1), datetime.date(2025, 3, 31), rows=4))
+
+        imported = find_imported_file(db_session, MOCK_USER, "a" * 64)
+        assert imported.filename == "march-again.csv"
+        assert imported.rows_processed == 4
+        assert find_imported_file(db_session, MOCK_USER, "b" * 64) is None
+        assert find_imported_file(db_session, {"sub": "auth0|someone-else"}, "a" * 64) is None
+
+    def test_find_ignores_files_with_deleted_transactions(self, db_session):
+        """Test that deleting a transaction in a file's date range invalidates its record."""
+        record_imported_file(db_session, MOCK_USER, "c" * 64, "april.csv",
+                             self.result(datetime.date(2025, 4, 1), datetime.date(2025, 4, 30)))
+        txn = Transaction(user_id=MOCK_USER["sub"], description="Deleted later", date=datetime.date(2025, 4, 10),
+                          amount=1.0, is_deleted=1, updated_at=datetime.datetime.now() + datetime.timedelta(seconds=1))
+        db_session.add(txn)
+        db_session.commit()
+
+        assert find_imported_file(db_session, MOCK_USER, "c" * 64) is None
+
+        db_session.delete(txn)
+        db_session.commit()
+
+    def test_load_imported_ranges_merges_adjacent(self, db_session):
+        """Test that consecutive statements form one range."""
+        for name, date_from, date_to in [
+            ("march", datetime.date(2025, 3, 1), datetime.date(2025, 3, 31)),
+            ("january", datetime.date(2025, 1, 1), datetime.date(2025, 1, 31)),
+            ("february", datetime.date(2025, 2, 1), datetime.date(2025, 2, 28)),
+            ("june", datetime.date(2025, 6, 1), datetime.date(2025, 6, 30)),
+            ("empty", None, None),
+        ]:
+            record_imported_file(db_session, MOCK_USER, name.ljust(64, "0"), f"{name}.csv", self.result(date_from, date_to))
+
+        assert load_imported_ranges(db_session, MOCK_USER) == [
+            (datetime.date(2025, 1, 1), datetime.date(2025, 3, 31)),
+            (datetime.date(2025, 6, 1), datetime.date(2025, 6, 30)),
+        ]
@@ -182,4 +182,82 @@ class TestDatabaseConfiguration:
         
         # Check for expected log messages
         assert any('Connecting to database' in msg for msg in debug_calls)
-        assert any('successfully' in msg for msg in debug_calls)
\ No newline at end of file
+        assert any('successfully' in msg for msg in debug_calls)
+
+class TestBulkInsert:
+    def test_bulk_insert_executemany(self, db_session):
+        """Test the Core executemany path used on SQLite."""
+        import datetime
+        from app.database.bulk_writer import bulk_insert
+        from app.models.models import Transaction
+
+        db_session.query(Transaction).filter(Transaction.description.like("Bulk %")).delete()
+        rows = [
+            {"user_id": "auth0|1234567890", "description": f"Bulk {i}", "date": datetime.date(2025, 3, 1), "amount": float(i)}
+            for i in range(3)
+        ]
+
+        assert bulk_insert(db_session, Transaction, rows) == 3
+        db_session.commit()
+
+        inserted = db_session.query(Transaction).filter(Transaction.description.like("Bulk %")).all()
+        assert sorted(txn.amount for txn in inserted) == [0.0, 1.0, 2.0]
+        # Model defaults are applied to columns the rows leave out
+        assert all(txn.is_deleted == 0 and txn.created_at is not None for txn in inserted)
+
+    def test_bulk_insert_empty(self):
+        """Test that an empty batch does not touch the database."""
+        from app.database.bulk_writer import bulk_insert
+        from app.models.models import Transaction
+
+        db = MagicMock()
+        assert bulk_insert(db, Transaction, []) == 0
+        db.execute.assert_not_called()
+
+    def test_bulk_insert_copy(self):
+        """Test the COPY path used on PostgreSQL with psycopg2."""
+        import datetime
+        from app.database.bulk_writer import bulk_insert
+        from app.models.models import Transaction
+
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        db.get_bind.return_value.dialect.driver = "psycopg2"
+        cursor = db.connection.return_value.connection.cursor.return_value
+        copied = {}
+        cursor.copy_expert.side_effect = lambda sql, buffer: copied.update(sql=sql, data=buffer.read())
+
+        rows = [
+            {"user_id": "u1", "description": 'Say "hi", twice', "date": datetime.date(2025, 3, 1), "amount": 1.5, "category_id": None},
+        ]
+        assert bulk_insert(db, Transaction, rows) == 1
+
+        db.execute.assert_not_called()
+        assert copied["sql"].startswith('COPY transactions ("is_indexed", ')
+        assert "FROM STDIN WITH (FORMAT csv, NULL '\\N')" in copied["sql"]
+        assert '"Say ""hi"", twice",2025-03-01,1.5,\\N' in copied["data"]
+        cursor.close.assert_called_once()
+
+    def test_bulk_insert_skips_conflicts_without_on_conflict(self, db_session):
+        """Test that dialects without ON CONFLICT skip existing and repeated keys before a plain insert."""
+        import datetime
+        from app.database import bulk_writer
+        from app.models.models import Transaction
+
+        db_session.query(Transaction).filter(Transaction.description.like("Conflict %")).delete()
+        db_session.commit()
+
+        def row(fingerprint, description):
+            return {"user_id": "auth0|1234567890", "description": description, "date": datetime.date(2025, 3, 1),
+                    "amount": 1.0, "fingerprint": fingerprint}
+
+        assert bulk_writer.bulk_insert(db_session, Transaction, [row("fp-conflict-1", "Conflict 1")]) == 1
+        db_session.commit()
+        rows = [row("fp-conflict-1", "Conflict 1 again"), row("fp-conflict-2", "Conflict 2"),
+                row("fp-conflict-2", "Conflict 2 again"), row(None, "Conflict none")]
+        with patch.dict(bulk_writer.ON_CONFLICT_DIALECTS, clear=True):
+            assert bulk_writer.bulk_insert(db_session, Transaction, rows, conflict_columns=("user_id", "fingerprint")) == 2
+        db_session.commit()
+
+        inserted = db_session.query(Transaction.description).filter(Transaction.description.like("Conflict %")).all()
+        assert sorted(description for description, in inserted) == ["Conflict 1", "Conflict 2", "Conflict none"]
@@ -0,0 +1,80 @@
+import io
+import pandas as pd
+import pytest
+from fastapi import HTTPException, UploadFile
+from app.utils.bank_profiles import detect_profile, missing_columns, normalize_header, read_dtypes
+from app.utils.file_parser import iter_transactions_file
+
+class TestBankProfiles:
+    def test_detect_known_bank(self):
+        """Test that specific bank layouts win over the generic ones."""
+        header = normalize_header(["Transaction Date", "Post Date", "Description", "Category", "Type", "Amount", "Memo"])
+        assert detect_profile(header)["name"] == "chase_credit_card"
+
+    def test_detect_generic_precedence(self):
+        """Test that generic layouts prefer transaction date and debit/credit columns."""
+        header = normalize_header(["Date", "Transaction Date", "Description", "Amount", "Debit", "Credit"])
+        profile = detect_profile(header)
+        assert profile["columns"]["transaction date"] == "date"
+        assert profile["amount"] == {"debit": -1, "credit": -1}
+
+    def test_detect_profile_is_cached(self):
+        """Test that a header seen before is matched from the cache."""
+        header = normalize_header([" Date ", "DESCRIPTION", "Amount", "Extra"])
+        detect_profile(header)
+        hits = detect_profile.cache_info().hits
+        assert detect_profile(header)["name"] == "generic_date_amount"
+        assert detect_profile.cache_info().hits == hits + 1
+
+    def test_missing_columns(self):
+        """Test the missing columns reported when no profile matches."""
+        assert detect_profile(normalize_header(["Date", "Description"])) is None
+        assert missing_columns(normalize_header(["Date", "Description"])) == {"amount"}
+        assert missing_columns(normalize_header(["transaction_date", "memo", "debit"])) == {"date", "description"}
+
+    def test_read_dtypes(self):
+        """Test that dtypes are explicit for every column the profile reads."""
+        header = normalize_header(["Date", "Description", "Category", "Debit", "Credit"])
+        assert read_dtypes(detect_profile(header), header) == {
+            "description": str, "category": str, "debit": "float64", "credit": "float64"
+        }
+
+    def test_parse_capital_one(self):
+        """Test the Capital One sign convention: debits are spending, credits are payments."""
+        content = (
+            "Transaction Date,Posted Date,Card No.,Description,Category,Debit,Credit\n"
+            "2025-01-05,2025-01-06,1234,STARBUCKS,Dining,4.50,\n"
+            "2025-01-07,2025-01-07,1234,CAPITAL ONE PAYMENT,Payment/Credit,,100.00\n"
+        )
+        file = UploadFile(file=io.BytesIO(content.encode("utf-8")), filename="capital_one.csv")
+
+        df = pd.concat(iter_transactions_file(file), ignore_index=True)
+
+        assert list(df.columns) == ["date", "description", "category", "amount"]
+        assert df['amount'].tolist() == [-4.5, 100.0]
+        assert df['category'].tolist() == ["Dining", "Payment/Credit"]
+
+    def test_parse_chase_checking_dates(self):
+        """Test that a profile's date format is applied to every chunk."""
+        content = (
+            "Details,Posting Date,Description,Amount,Type,Balance,Check or Slip #,\n"
+            "DEBIT,01/15/2025,GROCERY STORE,-52.10,DEBIT_CARD,1000.00,,\n"
+            "CREDIT,01/31/2025,PAYROLL,2000.00,ACH_CREDIT,3000.00,,\n"
+            "DEBIT,02/01/2025,RENT,-1500.00,ACH_DEBIT,1500.00,,\n"
+        )
+        file = UploadFile(file=io.BytesIO(content.encode("utf-8")), filename="chase.csv")
+
+        df = pd.concat(iter_transactions_file(file, chunk_size=2), ignore_index=True)
+
+        assert df['date'].dt.strftime("%Y-%m-%d").tolist() == ["2025-01-15", "2025-01-31", "2025-02-01"]
+        assert df['amount'].tolist() == [-52.10, 2000.00, -1500.00]
+
+    def test_parse_invalid_amount(self):
+        """Test that amounts that are not numbers are rejected."""
+        content = "Date,Description,Amount\n2025-01-15,Coffee,not-a-number\n"
+        file = UploadFile(file=io.BytesIO(content.encode("utf-8")), filename="bad.csv")
+
+        with pytest.raises(HTTPException) as exc_info:
+            list(iter_transactions_file(file))
+
+        assert exc_info.value.status_code == 400
@@ -1,10 +1,16 @@
 import pytest
 import pandas as pd
 import io
+import os
+import zipfile
 from datetime import datetime
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import MagicMock, patch
 from fastapi import HTTPException, UploadFile
-from app.utils.file_parser import parse_transactions_file
+from app.utils.file_parser import iter_transactions_file, expand_archives, load_transactions_files
+
+def parse(file: UploadFile) -> pd.DataFrame:
+    """Read a whole file through the streaming parser."""
+    return pd.concat(list(iter_transactions_file(file)), ignore_index=True)
 
 class TestFileParser:
     @pytest.fixture
@@ -15,10 +21,7 @@ class TestFileParser:
 2025-01-16,Restaurant,,75.25
 2025-01-17,Gas Station,45.00,
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
     @pytest.fixture
     def mock_excel_file(self):
@@ -36,10 +39,7 @@ class TestFileParser:
         excel_binary.seek(0)
         
         # Create mock file
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.xlsx"
-        file.read = AsyncMock(return_value=excel_binary.getvalue())
-        return file
+        return UploadFile(file=io.BytesIO(excel_binary.getvalue()), filename="test.xlsx")
 
     @pytest.fixture
     def mock_xls_file(self):
@@ -57,10 +57,7 @@ class TestFileParser:
         excel_binary.seek(0)
         
         # Create mock file
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.xls"  # Only the extension matters for the test
-        file.read = AsyncMock(return_value=excel_binary.getvalue())
-        return file
+        return UploadFile(file=io.BytesIO(excel_binary.getvalue()), filename="test.xls")
 
     @pytest.fixture
     def mock_csv_posting_date(self):
@@ -70,10 +67,7 @@ class TestFileParser:
 2025-01-16,Restaurant,-75.25
 2025-01-17,Gas Station,45.00
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
     @pytest.fixture
     def mock_csv_credit_only(self):
@@ -83,10 +77,7 @@ class TestFileParser:
 2025-01-16,Restaurant,75.25
 2025-01-17,Gas Station,45.00
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
     @pytest.fixture
     def mock_csv_debit_only(self):
@@ -96,10 +87,7 @@ class TestFileParser:
 2025-01-16,Restaurant,75.25
 2025-01-17,Gas Station,45.00
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
     @pytest.fixture
     def mock_csv_missing_columns(self):
@@ -109,10 +97,7 @@ class TestFileParser:
 2025-01-16,-75.25
 2025-01-17,45.00
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
     @pytest.fixture
     def mock_csv_invalid_date(self):
@@ -122,10 +107,7 @@ invalid-date,Grocery Store,100.50
 2025-01-16,Restaurant,-75.25
 2025-01-17,Gas Station,45.00
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
     @pytest.fixture
     def mock_csv_date_error(self):
@@ -135,18 +117,12 @@ invalid-date,Grocery Store,100.50
 2025/01/16,Restaurant,-75.25
 not-a-date,Gas Station,45.00
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
     @pytest.fixture
     def mock_unsupported_file(self):
         """Create a mock file with unsupported format."""
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.txt"
-        file.read = AsyncMock(return_value=b"Some text content")
-        return file
+        return UploadFile(file=io.BytesIO(b"Some text content"), filename="test.txt")
 
     @pytest.fixture
     def mock_csv_with_trailing_commas(self):
@@ -156,15 +132,11 @@ not-a-date,Gas Station,45.00
 2025-01-16,Restaurant,-75.25,,,,
 2025-01-17,Gas Station,45.00,,,,
 """
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=content.encode('utf-8'))
-        return file
+        return UploadFile(file=io.BytesIO(content.encode('utf-8')), filename="test.csv")
 
-    @pytest.mark.asyncio
-    async def test_parse_csv_with_debit_credit(self, mock_csv_file):
+    def test_parse_csv_with_debit_credit(self, mock_csv_file):
         """Test parsing a CSV file with debit and credit columns."""
-        df = await parse_transactions_file(mock_csv_file)
+        df = parse(mock_csv_file)
         
         # Verify data was parsed correctly
         assert len(df) == 3
@@ -179,10 +151,9 @@ not-a-date,Gas Station,45.00
         assert all(isinstance(date, pd.Timestamp) for date in df['date'])
         assert df['date'][0].strftime('%Y-%m-%d') == '2025-01-15'
 
-    @pytest.mark.asyncio
-    async def test_parse_excel_file(self, mock_excel_file):
+    def test_parse_excel_file(self, mock_excel_file):
         """Test parsing an Excel file."""
-        df = await parse_transactions_file(mock_excel_file)
+        df = parse(mock_excel_file)
         
         # Verify data was parsed correctly
         assert len(df) == 3
@@ -195,10 +166,9 @@ not-a-date,Gas Station,45.00
         assert df['date'][0].month == 1
         assert df['date'][0].day == 15
 
-    @pytest.mark.asyncio
-    async def test_parse_xls_file(self, mock_xls_file):
+    def test_parse_xls_file(self, mock_xls_file):
         """Test parsing an XLS file."""
-        df = await parse_transactions_file(mock_xls_file)
+        df = parse(mock_xls_file)
         
         # Verify data was parsed correctly
         assert len(df) == 3
@@ -211,10 +181,9 @@ not-a-date,Gas Station,45.00
         assert df['date'][0].month == 1
         assert df['date'][0].day == 15
 
-    @pytest.mark.asyncio
-    async def test_parse_csv_with_posting_date(self, mock_csv_posting_date):
+    def test_parse_csv_with_posting_date(self, mock_csv_posting_date):
         """Test parsing a CSV file with Posting Date instead of Transaction Date."""
-        df = await parse_transactions_file(mock_csv_posting_date)
+        df = parse(mock_csv_posting_date)
         
         # Verify date column was correctly handled
         assert 'date' in df.columns
@@ -226,10 +195,9 @@ not-a-date,Gas Station,45.00
         assert len(df) == 3
         assert list(df.columns) == ['date', 'description', 'amount']
 
-    @pytest.mark.asyncio
-    async def test_csv_with_credit_only(self, mock_csv_credit_only):
+    def test_csv_with_credit_only(self, mock_csv_credit_only):
         """Test parsing a CSV file with only Credit column."""
-        df = await parse_transactions_file(mock_csv_credit_only)
+        df = parse(mock_csv_credit_only)
         
         # Verify Credit was correctly converted to amount
         assert 'amount' in df.columns
@@ -237,10 +205,9 @@ not-a-date,Gas Station,45.00
         assert df['amount'][1] == 75.25
         assert df['amount'][2] == 45.00
 
-    @pytest.mark.asyncio
-    async def test_csv_with_debit_only(self, mock_csv_debit_only):
+    def test_csv_with_debit_only(self, mock_csv_debit_only):
         """Test parsing a CSV file with only Debit column."""
-        df = await parse_transactions_file(mock_csv_debit_only)
+        df = parse(mock_csv_debit_only)
         
         # Verify Debit was correctly converted to amount
         assert 'amount' in df.columns
@@ -248,66 +215,60 @@ not-a-date,Gas Station,45.00
         assert df['amount'][1] == 75.25
         assert df['amount'][2] == 45.00
 
-    @pytest.mark.asyncio
-    async def test_missing_required_columns(self, mock_csv_missing_columns):
+    def test_missing_required_columns(self, mock_csv_missing_columns):
         """Test error handling when required columns are missing."""
         with pytest.raises(HTTPException) as exc_info:
-            await parse_transactions_file(mock_csv_missing_columns)
+            parse(mock_csv_missing_columns)
         
         # Verify error details
         assert exc_info.value.status_code == 400
         assert "Missing required columns" in exc_info.value.detail
         assert "description" in exc_info.value.detail.lower()
 
-    @pytest.mark.asyncio
-    async def test_invalid_date_format(self, mock_csv_invalid_date):
+    def test_invalid_date_format(self, mock_csv_invalid_date):
         """Test error handling when date format is invalid."""
         with pytest.raises(HTTPException) as exc_info:
-            await parse_transactions_file(mock_csv_invalid_date)
+            parse(mock_csv_invalid_date)
         
         # Verify error details
         assert exc_info.value.status_code == 400
         assert "Invalid date format" in exc_info.value.detail
 
-    @pytest.mark.asyncio
-    async def test_date_conversion_error(self, mock_csv_date_error):
+    def test_date_conversion_error(self, mock_csv_date_error):
         """Test error handling when date conversion fails."""
         with pytest.raises(HTTPException) as exc_info:
-            await parse_transactions_file(mock_csv_date_error)
+            parse(mock_csv_date_error)
         
         # Verify error details
         assert exc_info.value.status_code == 400
         assert "Invalid date format" in exc_info.value.detail
 
-    @pytest.mark.asyncio
-    async def test_unsupported_file_format(self, mock_unsupported_file):
+    def test_unsupported_file_format(self, mock_unsupported_file):
         """Test error handling when file format is unsupported."""
         with pytest.raises(HTTPException) as exc_info:
-            await parse_transactions_file(mock_unsupported_file)
+            parse(mock_unsupported_file)
         
         # Verify error details
         assert exc_info.value.status_code == 400
         assert "Unsupported file format" in exc_info.value.detail
 
-    @pytest.mark.asyncio
-    async def test_file_read_error(self):
+    def test_file_read_error(self):
         """Test error handling when file reading fails."""
-        # Create a mock file that raises an exception when read
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(side_effect=Exception("File read error"))
+        # Create a file that raises an exception when read
+        raw = MagicMock()
+        raw.read.side_effect = Exception("File read error")
+        file = UploadFile(file=raw, filename="test.csv")
         
         with pytest.raises(HTTPException) as exc_info:
-            await parse_transactions_file(file)
+            parse(file)
         
         # Verify error details
         assert exc_info.value.status_code == 400
         assert "Error reading file" in exc_info.value.detail
 
-    @pytest.mark.asyncio
-    async def test_csv_with_trailing_commas(self, mock_csv_with_trailing_commas):
+    def test_csv_with_trailing_commas(self, mock_csv_with_trailing_commas):
         """Test handling CSV files with trailing commas."""
-        df = await parse_transactions_file(mock_csv_with_trailing_commas)
+        df = parse(mock_csv_with_trailing_commas)
         
         # Verify data was parsed correctly despite trailing commas
         assert len(df) == 3
@@ -316,18 +277,208 @@ not-a-date,Gas Station,45.00
         assert df['amount'][1] == -75.25
         assert df['amount'][2] == 45.00
 
-    @pytest.mark.asyncio
-    async def test_general_exception_handling(self):
+    def test_general_exception_handling(self):
         """Test general exception handling during file processing."""
-        file = AsyncMock(spec=UploadFile)
-        file.filename = "test.csv"
-        file.read = AsyncMock(return_value=b"Valid content")
+        file = UploadFile(file=io.BytesIO(b"Valid content"), filename="test.csv")
         
         # Mock pd.read_csv to raise a general exception
         with patch('pandas.read_csv', side_effect=Exception("General processing error")):
             with pytest.raises(HTTPException) as exc_info:
-                await parse_transactions_file(file)
+                parse(file)
             
             # Verify error details
             assert exc_info.value.status_code == 400
-            assert "Error reading file" in exc_info.value.detail
\ No newline at end of file
+            assert "Error reading file" in exc_info.value.detail
+
+class TestStreamingFileParser:
+    def test_iter_csv_in_chunks(self):
+        """Test that a CSV is streamed as normalized chunks of the requested size."""
+        content = "Transaction Date,Description,Amount,,\n" + "".join(
+            f"2025-01-{day:02d},Store {day},{day}.50,,\n" for day in range(1, 8)
+        )
+        file = UploadFile(file=io.BytesIO(content.encode("utf-8")), filename="test.csv")
+
+        chunks = list(iter_transactions_file(file, chunk_size=3))
+
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+        for chunk in chunks:
+            assert list(chunk.columns) == ['date', 'description', 'amount']
+            assert pd.api.types.is_datetime64_any_dtype(chunk['date'])
+        df = pd.concat(chunks, ignore_index=True)
+        assert df['description'].tolist() == [f"Store {day}" for day in range(1, 8)]
+        assert df['amount'][6] == 7.50
+
+    def test_iter_csv_small_read_blocks(self):
+        """Test that lines split across read blocks are reassembled."""
+        content = "Date,Description,Debit,Credit\r\n2025-01-15,Grocery Store,100.50,\r\n2025-01-16,Café,,75.25\r\n"
+        file = UploadFile(file=io.BytesIO(content.encode("utf-8")), filename="test.csv")
+
+        with patch("app.utils.file_parser.READ_BLOCK_SIZE", 5):
+            df = pd.concat(iter_transactions_file(file), ignore_index=True)
+
+        assert df['description'].tolist() == ["Grocery Store", "Café"]
+        assert df['amount'].round(2).tolist() == [-100.50, -75.25]
+
+    def test_iter_excel_in_chunks(self):
+        """Test that Excel files are yielded in chunks as well."""
+        excel_binary = io.BytesIO()
+        pd.DataFrame({
+            'Posting Date': ['2025-01-15', '2025-01-16', '2025-01-17'],
+            'Description': ['Grocery Store', 'Restaurant', 'Gas Station'],
+            'Amount': [100.50, -75.25, 45.00]
+        }).to_excel(excel_binary, index=False)
+        excel_binary.seek(0)
+        file = UploadFile(file=excel_binary, filename="test.xlsx")
+
+        chunks = list(iter_transactions_file(file, chunk_size=2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert chunks[1]['description'].iloc[0] == "Gas Station"
+
+    def _workbook(self, sheets):
+        """Build an .xlsx upload from {sheet name: list of rows}."""
+        from openpyxl import Workbook
+        workbook = Workbook()
+        workbook.remove(workbook.active)
+        for title, rows in sheets.items():
+            worksheet = workbook.create_sheet(title)
+            for row in rows:
+                worksheet.append(row)
+        binary = io.BytesIO()
+        workbook.save(binary)
+        binary.seek(0)
+        return UploadFile(file=binary, filename="statement.xlsx")
+
+    def test_iter_excel_detects_sheet_and_header(self):
+        """Test that the data sheet and header row are found below a summary."""
+        file = self._workbook({
+            "Summary": [["Account summary"], ["Balance", 1200]],
+            "Transactions": [
+                ["Bank statement export"],
+                [],
+                ["Transaction Date", "Description", "Debit", "Credit"],
+                [datetime(2025, 1, 15), "Grocery Store", 100.5, None],
+                [datetime(2025, 1, 16), "Refund", None, -20],
+                [],
+            ],
+        })
+
+        df = pd.concat(iter_transactions_file(file), ignore_index=True)
+
+        assert df['description'].tolist() == ["Grocery Store", "Refund"]
+        assert df['amount'].tolist() == [-100.5, 20]
+        assert df['date'].iloc[0] == pd.Timestamp("2025-01-15")
+
+    def test_iter_excel_explicit_sheet_and_header(self):
+        """Test choosing the sheet by name or index and the 1-based header row."""
+        rows = [
+            ["Date", "Description", "Amount"],
+            ["Date", "Description", "Amount"],
+            ["2025-02-01", "Second sheet", 10],
+        ]
+        sheets = {"First": [["Date", "Description", "Amount"], ["2025-01-01", "First sheet", 5]], "Second": rows}
+
+        by_name = pd.concat(iter_transactions_file(self._workbook(sheets), sheet="Second", header_row=2))
+        by_index = pd.concat(iter_transactions_file(self._workbook(sheets), sheet="1", header_row=2))
+
+        assert by_name['description'].tolist() == ["Second sheet"]
+        assert by_index['description'].tolist() == ["Second sheet"]
+
+    def test_iter_excel_unknown_sheet(self):
+        """Test that an unknown sheet is reported as a client error."""
+        file = self._workbook({"Transactions": [["Date", "Description", "Amount"]]})
+
+        with pytest.raises(HTTPException) as exc_info:
+            list(iter_transactions_file(file, sheet="Missing"))
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "Sheet 'Missing' not found in workbook."
+
+    def test_iter_excel_missing_columns(self):
+        """Test that a workbook without a recognizable header still fails validation."""
+        file = self._workbook({"Sheet": [["Foo", "Bar"], [1, 2]]})
+
+        with pytest.raises(HTTPException) as exc_info:
+            list(iter_transactions_file(file))
+
+        assert "Missing required columns" in exc_info.value.detail
+
+    def test_iter_unsupported_file_format(self):
+        """Test error handling when file format is unsupported."""
+        file = UploadFile(file=io.BytesIO(b"Some text content"), filename="test.txt")
+
+        with pytest.raises(HTTPException) as exc_info:
+            list(iter_transactions_file(file))
+
+        assert exc_info.value.status_code == 400
+        assert "Unsupported file format" in exc_info.value.detail
+
+    def test_iter_empty_file(self):
+        """Test that an empty upload is reported as a read error."""
+        file = UploadFile(file=io.BytesIO(b""), filename="test.csv")
+
+        with pytest.raises(HTTPException) as exc_info:
+            list(iter_transactions_file(file))
+
+        assert exc_info.value.status_code == 400
+        assert "Error reading file" in exc_info.value.detail
+
+class TestMultiFileParser:
+    def _write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+        return str(path)
+
+    def test_expand_archives(self, tmp_path):
+        """Test that only statements are extracted, flat and inside the extract folder."""
+        archive = tmp_path / "statements.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("2024/january.csv", "Date,Description,Amount\n2024-01-02,Coffee,3.5\n")
+            zf.writestr("../escape.csv", "Date,Description,Amount\n2024-02-02,Tea,2.5\n")
+            zf.writestr("__MACOSX/2024/._january.csv", "junk")
+            zf.writestr("notes.txt", "not a statement")
+            zf.writestr("2024/", "")
+        plain = self._write(tmp_path / "february.csv", "Date,Description,Amount\n")
+        extract_dir = str(tmp_path / "extracted")
+
+        paths = expand_archives([str(archive), plain], extract_dir)
+
+        assert [os.path.basename(p) for p in paths] == ["january.csv", "escape.csv", "february.csv"]
+        assert all(p.startswith(extract_dir) for p in paths[:2])
+        assert paths[2] == plain
+
+    def test_expand_invalid_archive(self, tmp_path):
+        """Test that archives that are broken or hold no statements are rejected."""
+        broken = self._write(tmp_path / "broken.zip", "not a zip")
+        empty = tmp_path / "empty.zip"
+        with zipfile.ZipFile(empty, "w") as zf:
+            zf.writestr("readme.txt", "nothing here")
+
+        with pytest.raises(HTTPException) as exc_info:
+            expand_archives([broken], str(tmp_path / "out"))
+        assert exc_info.value.detail == "broken.zip is not a valid zip archive."
+
+        with pytest.raises(HTTPException) as exc_info:
+            expand_archives([str(empty)], str(tmp_path / "out"))
+        assert exc_info.value.detail == "No CSV or Excel files found in empty.zip."
+
+    def test_load_transactions_files_in_parallel(self, tmp_path):
+        """Test that files are parsed in worker processes and returned in order."""
+        first = self._write(tmp_path / "first.csv", "Date,Description,Amount\n2025-01-01,First,1\n")
+        second = self._write(tmp_path / "second.csv", "Posting Date,Description,Debit\n2025-01-02,Second,2\n")
+
+        frames = load_transactions_files([first, second], max_workers=2)
+
+        assert [df['description'].tolist() for df in frames] == [["First"], ["Second"]]
+        assert frames[1]['amount'].tolist() == [2]
+
+    def test_load_transactions_files_names_failing_file(self, tmp_path):
+        """Test that a parse error from a worker process names the file."""
+        good = self._write(tmp_path / "good.csv", "Date,Description,Amount\n2025-01-01,Fine,1\n")
+        bad = self._write(tmp_path / "bad.csv", "Date,Description\n2025-01-01,No amount\n")
+
+        with pytest.raises(HTTPException) as exc_info:
+            load_transactions_files([good, bad], max_workers=2)
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "bad.csv: Missing required columns: amount"
@@ -0,0 +1,41 @@
+import datetime
+import pandas as pd
+from app.utils.fingerprint import (
+    normalize_description, fingerprint_key, transaction_fingerprint, fingerprint_keys, fingerprints_from_keys
+)
+
+class TestFingerprint:
+    def test_normalize_description(self):
+        """Test that case and whitespace differences are ignored."""
+        assert normalize_description("  STARBUCKS   Store\t#12 ") == "starbucks store #12"
+
+    def test_fingerprint_key_normalizes_values(self):
+        """Test that dates, timestamps and amounts normalize to the same key."""
+        key = fingerprint_key("Coffee", datetime.date(2025, 3, 1), 4.5)
+        assert key == ("coffee", "2025-03-01", "4.50")
+        assert fingerprint_key("COFFEE ", pd.Timestamp("2025-03-01"), 4.499999) == key
+        assert fingerprint_key("Refund", datetime.date(2025, 3, 1), -0.0)[2] == "0.00"
+
+    def test_transaction_fingerprint(self):
+        """Test that only the ordinal distinguishes identical transactions."""
+        first = transaction_fingerprint("Coffee", datetime.date(2025, 3, 1), 4.5, 1)
+        assert len(first) == 64
+        assert transaction_fingerprint(" coffee", datetime.date(2025, 3, 1), 4.50, 1) == first
+        assert transaction_fingerprint("Coffee", datetime.date(2025, 3, 1), 4.5, 2) != first
+        assert transaction_fingerprint("Coffee", datetime.date(2025, 3, 2), 4.5, 1) != first
+
+    def test_column_fingerprints_match_scalar(self):
+        """Test that the column-wise helpers produce the same fingerprints as transaction_fingerprint."""
+        df = pd.DataFrame({
+            "description": ["  STARBUCKS   Store\t#12 ", "Refund", "Coffee", "Rounding"],
+            "date": pd.to_datetime(["2025-03-01", "2025-03-02", "2025-03-01 13:45", "2025-12-31"], format="mixed"),
+            "amount": [4.5, -0.0, 4.499999, 2.675],
+        })
+        ordinals = pd.Series([1, 2, 1, 3])
+
+        keys = fingerprint_keys(df["description"], df["date"], df["amount"])
+        assert keys.tolist() == ["|".join(fingerprint_key(*row)) for row in df.itertuples(index=False)]
+        assert fingerprints_from_keys(keys, ordinals) == [
+            transaction_fingerprint(row.description, row.date, row.amount, ordinal)
+            for row, ordinal in zip(df.itertuples(index=False), ordinals)
+        ]
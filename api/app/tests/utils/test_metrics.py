@@ -0,0 +1,51 @@
+import pytest
+from app.utils import metrics
+from app.utils.metrics import StageStats
+
+class TestMetrics:
+    @pytest.fixture(autouse=True)
+    def clean_metrics(self):
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    def test_counters_and_timings(self):
+        """Test that counters add up, gauges keep their last value and timings keep count, total and max."""
+        metrics.increment("things_total")
+        metrics.increment("things_total", 2)
+        metrics.set_gauge("queue_depth", 4)
+        metrics.set_gauge("queue_depth", 1)
+        metrics.observe("thing_seconds", 0.5)
+        metrics.observe("thing_seconds", 1.5)
+
+        assert metrics.snapshot() == {
+            "counters": {"things_total": 3},
+            "gauges": {"queue_depth": 1},
+            "timings": {"thing_seconds": {"count": 2, "total": 2.0, "max": 1.5}},
+        }
+
+    def test_stage_stats(self):
+        """Test that repeated stages add up and the stats are recorded under a prefix."""
+        stats = StageStats()
+        for _ in range(2):
+            with stats.stage("parse"):
+                pass
+            stats.count("parsed", 10)
+
+        summary = stats.as_dict()
+        assert summary["rows"] == {"parsed": 20}
+        assert set(summary["seconds"]) == {"parse", "total"}
+        assert summary["seconds"]["parse"] <= summary["seconds"]["total"]
+
+        stats.record("import")
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"] == {"import_total": 1, "import_rows_parsed_total": 20}
+        assert set(snapshot["timings"]) == {"import_parse_seconds", "import_total_seconds"}
+
+    def test_stage_time_recorded_on_error(self):
+        """Test that a stage that raises still counts its time."""
+        stats = StageStats()
+        with pytest.raises(ValueError):
+            with stats.stage("insert"):
+                raise ValueError()
+        assert "insert" in stats.as_dict()["seconds"]
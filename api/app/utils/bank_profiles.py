@@ -0,0 +1,117 @@
+# app/utils/bank_profiles.py
+"""
+Registry of bank statement layouts.
+
+Each profile describes one export format:
+
+- ``name``: identifier used in logs.
+- ``signature``: lower-case header names that must all be present.
+- ``columns``: source header -> target column (date, description, category).
+- ``amount``: source header -> sign; the amount is the signed sum of these
+  columns, so debit/credit layouts map onto one signed amount.
+- ``date_format``: strftime format of the date column, or None to guess it
+  once per file from the first value.
+- ``optional``: like ``columns`` but only used when the header has them.
+
+Profiles are tried in order, so specific bank layouts come before the
+generic ones. Detection is cached by header, so files with a known header
+are matched without scanning the registry again.
+"""
+import itertools
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Header names accepted for the date and amount columns of generic layouts,
+# in order of preference.
+DATE_COLUMNS = ("transaction date", "posting date", "date")
+AMOUNT_LAYOUTS = (
+    # Debits and credits are both subtracted: banks that use this layout
+    # export credits as negative numbers.
+    {"debit": -1, "credit": -1},
+    {"debit": 1},
+    {"credit": 1},
+    {"amount": 1},
+)
+
+BANK_PROFILES: List[dict] = [
+    {
+        "name": "chase_credit_card",
+        "signature": ("transaction date", "post date", "description", "category", "type", "amount", "memo"),
+        "columns": {"transaction date": "date", "description": "description", "category": "category"},
+        "amount": {"amount": 1},
+        "date_format": "%m/%d/%Y",
+    },
+    {
+        "name": "chase_checking",
+        "signature": ("details", "posting date", "description", "amount", "type", "balance", "check or slip #"),
+        "columns": {"posting date": "date", "description": "description"},
+        "amount": {"amount": 1},
+        "date_format": "%m/%d/%Y",
+    },
+    {
+        # Capital One exports purchases as positive debits and payments as positive credits.
+        "name": "capital_one",
+        "signature": ("transaction date", "posted date", "card no.", "description", "category", "debit", "credit"),
+        "columns": {"transaction date": "date", "description": "description", "category": "category"},
+        "amount": {"debit": -1, "credit": 1},
+        "date_format": "%Y-%m-%d",
+    },
+]
+
+def _generic_profiles() -> List[dict]:
+    """One profile per combination of accepted date and amount columns."""
+    return [
+        {
+            "name": f"generic_{date_column.replace(' ', '_')}_{'_'.join(amount)}",
+            "signature": (date_column, "description", *amount),
+            "columns": {date_column: "date", "description": "description"},
+            "optional": {"category": "category"},
+            "amount": amount,
+            "date_format": None,
+        }
+        for amount, date_column in itertools.product(AMOUNT_LAYOUTS, DATE_COLUMNS)
+    ]
+
+BANK_PROFILES.extend(_generic_profiles())
+
+def normalize_header(columns: Iterable) -> Tuple[str, ...]:
+    """Lower-case, stripped header names; blank cells become empty strings."""
+    return tuple("" if column is None else str(column).strip().lower() for column in columns)
+
+@lru_cache(maxsize=256)
+def detect_profile(header: Tuple[str, ...]) -> Optional[dict]:
+    """
+    Find the first profile whose signature the header contains.
+
+    :param header: A header as returned by normalize_header.
+    :return: The profile, or None if no profile matches.
+    """
+    names = set(header)
+    for profile in BANK_PROFILES:
+        if names.issuperset(profile["signature"]):
+            return profile
+    return None
+
+def missing_columns(header: Tuple[str, ...]) -> Set[str]:
+    """The required target columns a header that matched no profile lacks."""
+    names = set(header)
+    missing = set()
+    if not names.intersection(DATE_COLUMNS):
+        missing.add("date")
+    if "description" not in names:
+        missing.add("description")
+    if not any(names.intersection(layout) for layout in AMOUNT_LAYOUTS):
+        missing.add("amount")
+    return missing
+
+def source_columns(profile: dict, header: Tuple[str, ...]) -> Dict[str, str]:
+    """Source header -> target column for every non-amount column the profile reads from this header."""
+    columns = dict(profile["columns"])
+    columns.update({source: target for source, target in profile.get("optional", {}).items() if source in header})
+    return columns
+
+def read_dtypes(profile: dict, header: Tuple[str, ...]) -> Dict[str, object]:
+    """Explicit dtypes, by lower-case source header, for the columns the profile reads."""
+    dtypes = {source: str for source, target in source_columns(profile, header).items() if target != "date"}
+    dtypes.update({source: "float64" for source in profile["amount"]})
+    return dtypes
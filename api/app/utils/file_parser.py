@@ -1,57 +1,387 @@
 # app/utils/file_parser.py
-import io
+import os
+import csv
+import codecs
+import multiprocessing
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Union
 import pandas as pd
+from openpyxl import load_workbook
+from pandas.tseries.api import guess_datetime_format
 from fastapi import HTTPException, UploadFile
 from ..utils.logger import get_logger
+from ..utils.bank_profiles import detect_profile, missing_columns, normalize_header, read_dtypes, source_columns
 
 # Configure logging
 logger = get_logger(__name__)   
 
-async def parse_transactions_file(file: UploadFile) -> pd.DataFrame:
-    logger.info("Parsing transactions file.")
-    file_ext = file.filename.lower()
-    try:
-        contents = await file.read()
-        if file_ext.endswith(".csv"):
-            contents_str = contents.decode('utf-8')
-            cleaned_contents = "\n".join(line.rstrip(",") for line in contents_str.splitlines())
-            df = pd.read_csv(io.StringIO(cleaned_contents))
-        elif file_ext.endswith((".xlsx", ".xls")):
-            df = pd.read_excel(io.BytesIO(contents))
+# Number of rows per DataFrame chunk yielded by iter_transactions_file.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# Number of bytes read from the upload spool at a time.
+READ_BLOCK_SIZE = 64 * 1024
+# Number of leading rows of each worksheet searched for the header row.
+HEADER_SCAN_ROWS = 20
+# Processes used to parse the files of a multi-file import.
+IMPORT_PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Upper bound on the uncompressed size of the statements in a zip archive.
+IMPORT_MAX_ARCHIVE_BYTES = int(os.getenv("IMPORT_MAX_ARCHIVE_BYTES", str(512 * 1024 * 1024)))
+
+STATEMENT_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+class _TrailingCommaStripper:
+    """
+    Text stream over a binary file that decodes it block by block and strips
+    trailing commas from every line, so pandas can read it in chunks without
+    the whole upload ever being held in memory.
+    """
+
+    def __init__(self, raw, block_size: int = READ_BLOCK_SIZE):
+        self._raw = raw
+        self._block_size = block_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._partial_line = ""
+        self._buffer = ""
+        self._eof = False
+
+    def _fill(self):
+        block = self._raw.read(self._block_size)
+        if block:
+            text = self._partial_line + self._decoder.decode(block)
         else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV or Excel file.")
-    except Exception as e:
-        logger.error(f"Error reading file: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
-
-    logger.info("File read successfully. Processing data.")
-    # Convert columns to lower case and rename as needed.
-    df.columns = map(str.lower, df.columns)
-    if 'transaction date' in df.columns:
-        df.rename(columns={'transaction date': 'date'}, inplace=True)
-    elif 'posting date' in df.columns:
-        df.rename(columns={'posting date': 'date'}, inplace=True)
-    if 'debit' in df.columns and 'credit' in df.columns:
-        df['amount'] = 0 - df['debit'].fillna(0) - df['credit'].fillna(0)
-        df.drop(columns=['debit', 'credit'], inplace=True)
-    elif 'debit' in df.columns:
-        df['amount'] = df['debit']
-        df.drop(columns=['debit'], inplace=True)
-    elif 'credit' in df.columns:
-        df['amount'] = df['credit']
-        df.drop(columns=['credit'], inplace=True)
-
-    logger.info("Validating required columns.")
-    required_columns = {"date", "description", "amount"}
-    if not required_columns.issubset(set(df.columns)):
-        logger.error("Missing required columns.")
-        missing = required_columns - set(df.columns)
-        logger.error(f"Missing columns: {', '.join(missing)}")
-        raise HTTPException(status_code=400, detail=f"Missing required columns: {', '.join(missing)}")
+            text = self._partial_line + self._decoder.decode(b"", final=True)
+            self._eof = True
+        lines = [(line, line.splitlines()[0]) for line in text.splitlines(keepends=True)]
+        # Keep an unterminated last line (or a "\r" that may start a "\r\n")
+        # until the rest of it has been read.
+        if lines and not self._eof and (lines[-1][0] == lines[-1][1] or text.endswith("\r")):
+            self._partial_line = lines.pop()[0]
+        else:
+            self._partial_line = ""
+        self._buffer += "".join(content.rstrip(",") + "\n" for _, content in lines)
+
+    def read(self, size: int = -1) -> str:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def __iter__(self):
+        return iter(self.read().splitlines(keepends=True))
+
+    def peek_line(self) -> str:
+        """Return the first unread line without consuming it."""
+        while not self._eof and "\n" not in self._buffer:
+            self._fill()
+        return self._buffer.split("\n", 1)[0]
+
+def _chunk_profile(df: pd.DataFrame) -> dict:
+    """
+    Find the bank profile for a chunk's header.
+
+    :raises HTTPException: If no profile matches, naming the missing columns.
+    """
+    header = normalize_header(df.columns)
+    profile = detect_profile(header)
+    if profile is None:
+        missing = ", ".join(sorted(missing_columns(header)))
+        logger.error(f"Missing columns: {missing}")
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing}")
+    logger.debug(f"Matched bank profile {profile['name']}.")
+    return profile
+
+def _guess_date_format(dates: pd.Series) -> Optional[str]:
+    """Guess a date format from the first date string, or None to let pandas infer it."""
+    first = dates.dropna()
+    if first.empty or not isinstance(first.iloc[0], str):
+        return None
+    return guess_datetime_format(first.iloc[0])
+
+def _raw_dates(df: pd.DataFrame, profile: dict) -> pd.Series:
+    """The date column of a chunk that has not been normalized yet."""
+    date_source = next(source for source, target in profile["columns"].items() if target == "date")
+    return df.iloc[:, normalize_header(df.columns).index(date_source)]
+
+def _normalize_transactions(df: pd.DataFrame, profile: Optional[dict] = None,
+                            date_format: Optional[str] = None) -> pd.DataFrame:
+    """
+    Map a bank-specific chunk onto date/description/amount (and category when
+    present) using its bank profile, and convert dates and amounts.
+
+    :param profile: The file's bank profile; detected from the header when omitted.
+    :param date_format: Date format to use when the profile has none; guessed
+        from the first date when omitted.
+    :raises HTTPException: If columns are missing or dates or amounts are invalid.
+    """
+    header = normalize_header(df.columns)
+    profile = profile or _chunk_profile(df)
+    df.columns = header
+    normalized = pd.DataFrame(
+        {target: df[source] for source, target in source_columns(profile, header).items()}, index=df.index
+    )
+
+    try:
+        amounts = {source: pd.to_numeric(df[source]) for source in profile["amount"]}
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid amount in file.")
+    if len(amounts) == 1:
+        ((source, values),) = amounts.items()
+        normalized['amount'] = values * profile["amount"][source]
+    else:
+        # Debit/credit layouts leave one of the two columns empty on every row.
+        normalized['amount'] = sum(values.fillna(0) * profile["amount"][source] for source, values in amounts.items())
+
+    date_format = profile["date_format"] or date_format or _guess_date_format(normalized['date'])
     try:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        if df['date'].isnull().any():
-            raise HTTPException(status_code=400, detail="Invalid date format in file.")
+        normalized['date'] = pd.to_datetime(normalized['date'], format=date_format, errors='coerce')
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid date format in file.")
-    return df
+    if normalized['date'].isnull().any():
+        raise HTTPException(status_code=400, detail="Invalid date format in file.")
+    return normalized
+
+def _csv_read_options(header_line: str) -> dict:
+    """
+    Explicit read options for a CSV whose header matches a bank profile, so
+    pandas does not infer column types.
+
+    Every column gets a dtype; columns the profile does not use are read as
+    plain strings. They are not skipped with ``usecols``, since the C engine
+    would then silently drop the surplus fields of ragged rows.
+    """
+    names = next(csv.reader([header_line]), [])
+    header = normalize_header(names)
+    profile = detect_profile(header)
+    if profile is None:
+        # Read the file as is; validation reports the missing columns.
+        return {}
+    dtypes = read_dtypes(profile, header)
+    return {"dtype": {name: dtypes.get(column, str) for name, column in zip(names, header)}}
+
+def _is_header_row(values: tuple) -> bool:
+    """Whether a worksheet row is the header of a known bank layout."""
+    return detect_profile(normalize_header(values)) is not None
+
+def _select_worksheet(workbook, sheet: Optional[Union[str, int]]):
+    """Look a worksheet up by name or zero-based index."""
+    if sheet in workbook.sheetnames:
+        return workbook[sheet]
+    if str(sheet).isdigit() and int(sheet) < len(workbook.worksheets):
+        return workbook.worksheets[int(sheet)]
+    raise HTTPException(status_code=400, detail=f"Sheet '{sheet}' not found in workbook.")
+
+def _find_header(workbook, sheet: Optional[Union[str, int]], header_row: Optional[int]):
+    """
+    Locate the transactions table of a workbook.
+
+    Without an explicit sheet, worksheets are searched in order for a header
+    row within their first HEADER_SCAN_ROWS rows; without an explicit header
+    row, the first row that looks like a header is used. When nothing looks
+    like a header the first row of the (first) sheet is used, so validation
+    reports the missing columns.
+
+    :return: The worksheet and the 1-based number of its header row.
+    """
+    worksheets = [_select_worksheet(workbook, sheet)] if sheet is not None else workbook.worksheets
+    if header_row is not None:
+        return worksheets[0], header_row
+    for worksheet in worksheets:
+        rows = worksheet.iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True)
+        for number, values in enumerate(rows, start=1):
+            if _is_header_row(values):
+                logger.info(f"Found header in row {number} of sheet '{worksheet.title}'.")
+                return worksheet, number
+    return worksheets[0], 1
+
+def _header_names(values: tuple) -> List[str]:
+    # Name blank header cells the way pandas does.
+    return [f"Unnamed: {i}" if value is None else str(value).strip() for i, value in enumerate(values)]
+
+def _read_xlsx_chunks(raw, chunk_size: int, sheet: Optional[Union[str, int]] = None,
+                      header_row: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield DataFrame chunks from an .xlsx workbook without loading it whole.
+
+    The workbook is opened with openpyxl in read-only mode, which streams
+    worksheet rows from the archive instead of building the full DOM, so
+    memory is bounded by the chunk size.
+    """
+    if header_row is not None and header_row < 1:
+        raise HTTPException(status_code=400, detail="Header row must be 1 or greater.")
+    workbook = load_workbook(raw, read_only=True, data_only=True)
+    try:
+        worksheet, header_row = _find_header(workbook, sheet, header_row)
+        rows = worksheet.iter_rows(min_row=header_row, values_only=True)
+        columns = _header_names(next(rows, ()))
+        width = len(columns)
+        batch, yielded = [], False
+        for values in rows:
+            # Read-only worksheets often report trailing blank rows.
+            if all(value is None for value in values):
+                continue
+            batch.append(tuple(values[:width]) + (None,) * (width - len(values)))
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=columns)
+                batch, yielded = [], True
+        # Always yield at least one chunk so the columns get validated.
+        if batch or not yielded:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+def _read_chunks(file: UploadFile, chunk_size: int, sheet: Optional[Union[str, int]] = None,
+                 header_row: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Yield raw DataFrame chunks of at most chunk_size rows from the upload spool."""
+    file_ext = file.filename.lower()
+    if file_ext.endswith(".csv"):
+        stream = _TrailingCommaStripper(file.file)
+        options = _csv_read_options(stream.peek_line())
+        with pd.read_csv(stream, chunksize=chunk_size, **options) as reader:
+            yield from reader
+    elif file_ext.endswith(".xlsx"):
+        yield from _read_xlsx_chunks(file.file, chunk_size, sheet, header_row)
+    elif file_ext.endswith(".xls"):
+        # Legacy .xls workbooks have no streaming reader; load them through pandas.
+        sheet_name = int(sheet) if str(sheet).isdigit() else sheet
+        df = pd.read_excel(file.file, sheet_name=sheet_name or 0, header=(header_row or 1) - 1)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].copy()
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV or Excel file.")
+
+def iter_transactions_file(file: UploadFile, chunk_size: Optional[int] = None,
+                           sheet: Optional[Union[str, int]] = None,
+                           header_row: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a transactions file as normalized DataFrame chunks.
+
+    CSV uploads are read from the spooled file in fixed-size blocks with
+    trailing commas stripped on the fly, and .xlsx workbooks are read row by
+    row in openpyxl's read-only mode, so peak memory is bounded by the chunk
+    size rather than by the size of the statement. Each chunk is mapped
+    onto date/description/amount with the file's bank profile, detected
+    once from the first chunk.
+
+    :param file: The uploaded file (anything with ``filename`` and a binary ``file``).
+    :param chunk_size: Maximum number of rows per chunk.
+    :param sheet: Excel only: worksheet name or zero-based index. Detected from
+        the header row when omitted.
+    :param header_row: Excel only: 1-based row number of the header. Detected
+        when omitted.
+    :raises HTTPException: If the file cannot be read or fails validation.
+    """
+    logger.info("Streaming transactions file %s.", file.filename)
+    chunks = _read_chunks(file, chunk_size or IMPORT_CHUNK_SIZE, sheet, header_row)
+    profile, date_format = None, None
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error reading file: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+        # Detect the layout and date format once and reuse them for every chunk.
+        if profile is None:
+            profile = _chunk_profile(chunk)
+        if date_format is None and profile["date_format"] is None:
+            date_format = _guess_date_format(_raw_dates(chunk, profile))
+        yield _normalize_transactions(chunk, profile, date_format)
+
+def expand_archives(paths: List[str], extract_dir: str) -> List[str]:
+    """
+    Replace every .zip in ``paths`` by the statements it contains.
+
+    Each member is extracted by its base name into a numbered folder of
+    ``extract_dir``, so archive paths can never point outside it. Entries that are not CSV or
+    Excel files (folders, macOS metadata, nested archives) are skipped.
+
+    :raises HTTPException: If an archive is invalid, too large or holds no statements.
+    """
+    expanded = []
+    for path in paths:
+        if not path.lower().endswith(".zip"):
+            expanded.append(path)
+            continue
+        try:
+            with zipfile.ZipFile(path) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir()
+                    and not info.filename.startswith("__MACOSX/")
+                    and not os.path.basename(info.filename).startswith(".")
+                    and info.filename.lower().endswith(STATEMENT_EXTENSIONS)
+                ]
+                if not members:
+                    raise HTTPException(status_code=400, detail=f"No CSV or Excel files found in {os.path.basename(path)}.")
+                if sum(info.file_size for info in members) > IMPORT_MAX_ARCHIVE_BYTES:
+                    raise HTTPException(status_code=400, detail=f"{os.path.basename(path)} is too large to import.")
+                for info in members:
+                    target_dir = os.path.join(extract_dir, str(len(expanded)))
+                    os.makedirs(target_dir)
+                    target = os.path.join(target_dir, os.path.basename(info.filename))
+                    with archive.open(info) as src, open(target, "wb") as out:
+                        shutil.copyfileobj(src, out, READ_BLOCK_SIZE)
+                    expanded.append(target)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"{os.path.basename(path)} is not a valid zip archive.")
+    return expanded
+
+def load_transactions_file(path: str) -> pd.DataFrame:
+    """
+    Parse a whole statement from disk into one normalized DataFrame.
+
+    Runs in the worker processes of load_transactions_files, so it takes a
+    path rather than an open upload.
+
+    :raises HTTPException: If the file cannot be parsed; the detail names the file.
+    """
+    try:
+        with open(path, "rb") as f:
+            upload = UploadFile(file=f, filename=os.path.basename(path))
+            return pd.concat(list(iter_transactions_file(upload)), ignore_index=True)
+    except HTTPException as e:
+        raise HTTPException(status_code=e.status_code, detail=f"{os.path.basename(path)}: {e.detail}")
+
+class _WorkerParseError(Exception):
+    """HTTPException stand-in that survives the trip back from a worker process."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _load_in_worker(path: str) -> pd.DataFrame:
+    try:
+        return load_transactions_file(path)
+    except HTTPException as e:
+        # HTTPException cannot be unpickled when created with keyword arguments.
+        raise _WorkerParseError(e.status_code, e.detail)
+
+def load_transactions_files(paths: List[str], max_workers: Optional[int] = None) -> List[pd.DataFrame]:
+    """
+    Parse several statements in parallel, one file per process.
+
+    :return: The normalized DataFrames, in the order of ``paths``.
+    :raises HTTPException: If any file cannot be parsed.
+    """
+    workers = min(max_workers or IMPORT_PARSE_WORKERS, len(paths))
+    logger.info(f"Parsing {len(paths)} files with {workers} processes.")
+    if workers <= 1:
+        return [load_transactions_file(path) for path in paths]
+    # Spawned rather than forked: the API process has threads running (the
+    # prediction batchers, the request thread pool) whose locks a fork would
+    # copy mid-use. Parsing needs no state from the parent.
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        return list(executor.map(_load_in_worker, paths))
+    except _WorkerParseError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        # Stop parsing the remaining files as soon as one fails.
+        executor.shutdown(cancel_futures=True)
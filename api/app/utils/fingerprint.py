@@ -0,0 +1,67 @@
+# app/utils/fingerprint.py
+import datetime
+import hashlib
+import re
+from typing import List
+import pandas as pd
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_description(description: str) -> str:
+    """
+    Normalize a transaction description for duplicate detection: lower-case with collapsed whitespace.
+
+    Deliberately not the merchant key used for categorization: the store
+    number or reference it strips is what tells two same-day purchases of
+    the same amount at one chain apart, and stored fingerprints depend on
+    this normalization staying the same.
+    """
+    return _WHITESPACE.sub(" ", str(description)).strip().lower()
+
+def fingerprint_key(description: str, date, amount) -> tuple:
+    """
+    Return the part of a transaction's identity that repeats for identical
+    transactions: normalized description, calendar date and amount in cents.
+    """
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    return normalize_description(description), date.isoformat(), _format_amount(amount)
+
+def _format_amount(amount) -> str:
+    # Adding 0.0 turns -0.0 into 0.0 so both format the same way.
+    return f"{round(float(amount), 2) + 0.0:.2f}"
+
+def transaction_fingerprint(description: str, date, amount, ordinal: int) -> str:
+    """
+    Compute the stored fingerprint of a transaction.
+
+    ``ordinal`` numbers identical transactions (same normalized description,
+    date and amount) 1, 2, 3... so that genuinely repeated purchases keep
+    distinct fingerprints while a re-imported statement maps onto the same ones.
+
+    :return: A 64-character hex SHA-256 digest.
+    """
+    key = fingerprint_key(description, date, amount)
+    return hashlib.sha256("|".join((*key, str(ordinal))).encode("utf-8")).hexdigest()
+
+def fingerprint_keys(descriptions: pd.Series, dates: pd.Series, amounts: pd.Series) -> pd.Series:
+    """
+    Column-wise fingerprint_key: one ``description|date|amount`` string per row,
+    with the same normalization as the scalar version.
+    """
+    # Statements repeat merchants and amounts, so each distinct value is only normalized once.
+    normalized = _map_distinct(descriptions, normalize_description)
+    iso_dates = pd.to_datetime(dates).dt.strftime("%Y-%m-%d")
+    formatted = _map_distinct(amounts, _format_amount)
+    return normalized + "|" + iso_dates + "|" + formatted
+
+def _map_distinct(values: pd.Series, func) -> pd.Series:
+    distinct = values.unique()
+    return values.map(dict(zip(distinct, map(func, distinct))))
+
+def fingerprints_from_keys(keys: pd.Series, ordinals: pd.Series) -> List[str]:
+    """Column-wise transaction_fingerprint for keys built by fingerprint_keys."""
+    return [
+        hashlib.sha256(f"{key}|{ordinal}".encode("utf-8")).hexdigest()
+        for key, ordinal in zip(keys.tolist(), ordinals.tolist())
+    ]
@@ -0,0 +1,88 @@
+# app/utils/metrics.py
+"""
+In-process metrics: counters, gauges and timing summaries, exposed by GET /metrics.
+
+Metrics live in the memory of the process that records them, so each API
+or worker process reports its own values since it started.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+# name -> {"count", "total", "max"}, in seconds for durations.
+_timings: Dict[str, Dict[str, float]] = {}
+
+def increment(name: str, value: float = 1):
+    """Add ``value`` to a counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def set_gauge(name: str, value: float):
+    """Set a value that goes up and down, such as the depth of a queue."""
+    with _lock:
+        _gauges[name] = value
+
+def observe(name: str, seconds: float):
+    """Record one duration of a timed operation, or one value of any other summarized quantity."""
+    with _lock:
+        timing = _timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+def snapshot() -> dict:
+    """A copy of all counters, gauges and timings."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": {name: dict(timing) for name, timing in _timings.items()},
+        }
+
+def reset():
+    """Forget all recorded values."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
+
+class StageStats:
+    """
+    Wall time per stage and row counters of one operation, such as one import.
+
+    Stages can be entered repeatedly (once per chunk); their times add up.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def as_dict(self) -> dict:
+        """Counters and per-stage seconds, with the total time since the operation started."""
+        timings = {name: round(seconds, 6) for name, seconds in self.timings.items()}
+        timings["total"] = round(time.perf_counter() - self._started, 6)
+        return {"rows": dict(self.counters), "seconds": timings}
+
+    def record(self, prefix: str):
+        """Add this operation to the process metrics under ``prefix``."""
+        increment(f"{prefix}_total")
+        for name, value in self.counters.items():
+            increment(f"{prefix}_rows_{name}_total", value)
+        for name, seconds in self.as_dict()["seconds"].items():
+            observe(f"{prefix}_{name}_seconds", seconds)
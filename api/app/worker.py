@@ -0,0 +1,62 @@
+# app/worker.py
+"""
+Dedicated import worker.
+
+Claims queued import jobs one at a time and runs them outside the API
+processes, so large statements never tie up request workers. Run any
+number of these next to the API (with IMPORT_WORKER_MODE=external):
+
+    python -m app.worker [--poll-interval 2] [--once]
+"""
+import argparse
+import time
+from .database.database import SessionLocal
+from .services.import_job_service import claim_import_job, run_import_job
+from .utils.logger import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+def run_next_job(session_factory=SessionLocal) -> bool:
+    """
+    Claim and run the oldest queued import job.
+
+    :return: True if a job was run, False if the queue was empty.
+    """
+    db = session_factory()
+    try:
+        job = claim_import_job(db)
+    finally:
+        db.close()
+    if not job:
+        return False
+    run_import_job(session_factory, job)
+    return True
+
+def run_worker(poll_interval: float = 2.0, once: bool = False, session_factory=SessionLocal):
+    """
+    Process import jobs until interrupted, sleeping ``poll_interval`` seconds
+    whenever the queue is empty. With ``once`` the worker drains the queue and exits.
+    """
+    logger.info("Import worker started.")
+    while True:
+        try:
+            ran = run_next_job(session_factory)
+        except Exception as e:
+            logger.error(f"Import worker error: {e}")
+            ran = False
+        if not ran:
+            if once:
+                break
+            time.sleep(poll_interval)
+    logger.info("Import worker stopped.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process queued transaction import jobs.")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+    args = parser.parse_args()
+    try:
+        run_worker(poll_interval=args.poll_interval, once=args.once)
+    except KeyboardInterrupt:
+        pass
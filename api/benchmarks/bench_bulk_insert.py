@@ -0,0 +1,86 @@
+# benchmarks/bench_bulk_insert.py
+"""
+Rows/sec of the transaction insert paths: ORM bulk_save_objects, Core
+executemany and (on PostgreSQL with psycopg2) COPY FROM STDIN.
+
+Every run happens inside a transaction that is rolled back, so it is safe to
+point at a development database. Run from the ``api`` directory:
+
+    python -m benchmarks.bench_bulk_insert [--url postgresql://...] [--rows 50000]
+
+Without ``--url`` an in-memory SQLite database is used, which only exercises
+the executemany fallback.
+"""
+import argparse
+import datetime
+import time
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.database.bulk_writer import bulk_insert
+from app.models.models import Transaction, User
+
+BENCH_USER_ID = "benchmark|bulk-insert"
+
+def make_rows(count: int) -> list:
+    start = datetime.date(2025, 1, 1)
+    return [
+        {
+            "user_id": BENCH_USER_ID,
+            "description": f"CARD PURCHASE STORE #{i % 997}",
+            "date": start + datetime.timedelta(days=i % 365),
+            "amount": float(i % 500) + 0.25,
+            "is_imported": 1,
+        }
+        for i in range(count)
+    ]
+
+def run_orm(db, rows):
+    db.bulk_save_objects([Transaction(**row) for row in rows])
+    db.flush()
+
+def run_executemany(db, rows):
+    with patch("app.database.bulk_writer._supports_copy", return_value=False):
+        bulk_insert(db, Transaction, rows)
+
+def run_copy(db, rows):
+    bulk_insert(db, Transaction, rows)
+
+def timed(session_factory, runner, rows) -> float:
+    db = session_factory()
+    try:
+        db.add(User(id=BENCH_USER_ID, name="Benchmark", email=f"{BENCH_USER_ID}@example.com"))
+        db.flush()
+        start = time.perf_counter()
+        runner(db, rows)
+        return time.perf_counter() - start
+    finally:
+        db.rollback()
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    rows = make_rows(args.rows)
+
+    paths = [("orm bulk_save_objects", run_orm), ("core executemany", run_executemany)]
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+        paths.append(("copy from stdin", run_copy))
+
+    print(f"{args.rows} rows on {engine.dialect.name}+{engine.dialect.driver}")
+    for name, runner in paths:
+        seconds = timed(session_factory, runner, rows)
+        print(f"{name:>22}: {seconds:7.2f}s {args.rows / seconds:>10,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_feature_modes.py
+"""
+Vocabulary TF-IDF features against hashed TF-IDF features for the
+categorizer: accuracy on the training split, artifact size, time and
+memory to load the compact artifact, and prediction latency.
+
+Both modes are trained like training.py trains them, on default_rules with
+the same 80/20 split. Run from the ``api`` directory:
+
+    python -m benchmarks.bench_feature_modes [--widths 4096 16384 65536] [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import joblib
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+
+from app.categorization.compact import load_compact, save_compact
+from app.categorization.default_rules import default_rules
+from app.categorization.preprocessing import preprocess
+
+def fit(vectorizer, texts, labels):
+    X_vect = vectorizer.fit_transform(texts)
+    X_train, X_test, y_train, y_test = train_test_split(X_vect, labels, test_size=0.2, random_state=42)
+    model = LogisticRegression().fit(X_train, y_train)
+    return model, model.score(X_test, y_test)
+
+def measure_load(path: str):
+    """Seconds and peak Python-allocated bytes to load a compact artifact."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    load_compact(path)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+def best_latency(path: str, texts, repeat: int) -> float:
+    """Best seconds to vectorize and score ``texts`` in one batch with the compact scorer."""
+    model, vectorizer = load_compact(path)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(vectorizer.transform(texts))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--widths", type=int, nargs="+", default=[2 ** 12, 2 ** 14, 2 ** 16])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.DataFrame(default_rules)
+    texts = df["description"].apply(preprocess)
+    labels = df["category"]
+    batch = texts.tolist()[:1000]
+
+    modes = [("tfidf", TfidfVectorizer())] + [
+        (f"hashing {width}", make_pipeline(HashingVectorizer(n_features=width, alternate_sign=False, norm=None),
+                                           TfidfTransformer()))
+        for width in args.widths
+    ]
+    print(f"{len(texts)} descriptions; latency of a {len(batch)}-row batch, best of {args.repeat}")
+    print(f"{'':>14}  {'features':>8}  {'accuracy':>8}  {'npz KB':>7}  {'pkl vect KB':>11}  "
+          f"{'load ms':>7}  {'load KB':>7}  {'batch ms':>8}  {'1 row ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, vectorizer in modes:
+            model, accuracy = fit(vectorizer, texts, labels)
+            path = os.path.join(tmp, "model.npz")
+            save_compact(model, vectorizer, path)
+            pickle_path = os.path.join(tmp, "vectorizer.pkl")
+            joblib.dump(vectorizer, pickle_path)
+            load_seconds, load_bytes = measure_load(path)
+            batch_seconds = best_latency(path, batch, args.repeat)
+            row_seconds = best_latency(path, batch[:1], args.repeat)
+            print(f"{name:>14}  {model.coef_.shape[1]:>8}  {accuracy:>8.3f}  {os.path.getsize(path) / 1024:>7.0f}  "
+                  f"{os.path.getsize(pickle_path) / 1024:>11.0f}  {load_seconds * 1000:>7.1f}  "
+                  f"{load_bytes / 1024:>7.0f}  {batch_seconds * 1000:>8.1f}  {row_seconds * 1000:>8.2f}")
+
+if __name__ == "__main__":
+    main()
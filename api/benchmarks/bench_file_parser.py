@@ -0,0 +1,92 @@
+# benchmarks/bench_file_parser.py
+"""
+Peak memory of parsing a transaction file whole (load_transactions_file,
+as batch imports do) vs chunk by chunk (iter_transactions_file, as single
+imports do).
+
+Each measurement runs in a fresh interpreter so the reported peak RSS only
+reflects parsing one file. Run from the ``api`` directory:
+
+    python -m benchmarks.bench_file_parser [--rows 10000 100000 1000000] [--format csv xlsx]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+MODES = ["whole", "streaming"]
+
+def write_statement(path: str, rows: int):
+    """Write a synthetic bank statement with trailing commas, like real exports."""
+    with open(path, "w") as f:
+        f.write("Transaction Date,Description,Debit,Credit,,\n")
+        for i in range(rows):
+            day = i % 28 + 1
+            f.write(f"2025-01-{day:02d},CARD PURCHASE STORE #{i % 997} REF {i:08d},{i % 500}.25,,,\n")
+
+def write_workbook(path: str, rows: int):
+    """Write the same statement as an .xlsx workbook."""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Transactions")
+    worksheet.append(["Transaction Date", "Description", "Debit", "Credit"])
+    for i in range(rows):
+        day = i % 28 + 1
+        worksheet.append([f"2025-01-{day:02d}", f"CARD PURCHASE STORE #{i % 997} REF {i:08d}", i % 500 + 0.25, None])
+    workbook.save(path)
+
+WRITERS = {"csv": write_statement, "xlsx": write_workbook}
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure(mode: str, path: str) -> None:
+    """Parse ``path`` in the given mode and print rows, seconds and peak RSS growth."""
+    from fastapi import UploadFile
+    from app.utils.file_parser import iter_transactions_file, load_transactions_file
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "whole":
+        rows = len(load_transactions_file(path))
+    else:
+        with open(path, "rb") as f:
+            upload = UploadFile(file=f, filename=os.path.basename(path))
+            rows = sum(len(chunk) for chunk in iter_transactions_file(upload))
+    elapsed = time.perf_counter() - start
+    print(f"{rows} {elapsed:.3f} {_peak_rss_mb() - baseline:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--format", nargs="+", choices=sorted(WRITERS), default=["csv"])
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    env = dict(os.environ, APP_ENV="production")
+    print(f"{'rows':>10} {'format':>6} {'mode':>10} {'file MB':>8} {'seconds':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows, file_format in ((r, f) for f in args.format for r in args.rows):
+            path = os.path.join(tmp, f"statement_{rows}.{file_format}")
+            WRITERS[file_format](path, rows)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_file_parser", "--measure", mode, path],
+                    check=True, capture_output=True, text=True, env=env,
+                ).stdout.split()
+                parsed, seconds, peak = out[-3:]
+                print(f"{int(parsed):>10} {file_format:>6} {mode:>10} {size_mb:>8.1f} {float(seconds):>8.2f} {float(peak):>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_keyword_fast_path.py
+"""
+The keyword fast path ahead of the categorizer: how many descriptions it
+resolves without the model, how often its categories agree with the
+model's, and the time to predict the labels and the top 3 categories of
+a statement with and without it.
+
+The statement is the synthetic one of bench_merchant_key. Predictions
+start from empty caches on every repeat. Run from the ``api`` directory:
+
+    python -m benchmarks.bench_keyword_fast_path [--rows 20000] [--repeat 3]
+"""
+import argparse
+import time
+from unittest.mock import patch
+
+from app.categorization import model as categorization_model
+from app.categorization.keywords import default_automaton
+from app.categorization.preprocessing import preprocess
+from benchmarks.bench_merchant_key import make_descriptions
+
+def best_time(predict, descriptions, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        categorization_model.clear_prediction_cache()
+        start = time.perf_counter()
+        predict(descriptions)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    descriptions = make_descriptions(args.rows)
+    categorization_model.warmup()
+
+    automaton = default_automaton()
+    texts = sorted({preprocess(description) for description in descriptions})
+    keyword_categories = {text: automaton.categorize(text) for text in texts}
+    hits = [text for text, category in keyword_categories.items() if category is not None]
+    with patch.object(categorization_model, "KEYWORD_FAST_PATH", False):
+        model_categories = dict(zip(hits, categorization_model.predict_categories(hits)))
+    agreement = sum(keyword_categories[text] == model_categories[text] for text in hits) / max(len(hits), 1)
+
+    print(f"{args.rows} descriptions ({len(texts)} distinct), {len(automaton)} keywords, best of {args.repeat}")
+    print(f"keyword hit rate {len(hits) / len(texts):.1%} of distinct descriptions, "
+          f"agreeing with the model on {agreement:.1%}")
+    print(f"{'':>10}  {'labels ms':>9}  {'top-3 ms':>9}")
+    for name, enabled in [("model", False), ("keywords", True)]:
+        with patch.object(categorization_model, "KEYWORD_FAST_PATH", enabled):
+            labels = best_time(categorization_model.predict_categories, descriptions, args.repeat)
+            top_k = best_time(lambda batch: categorization_model.predict_top_k(batch, 3), descriptions, args.repeat)
+        print(f"{name:>10}  {labels * 1000:>9.1f}  {top_k * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_micro_batching.py
+"""
+Single-description predictions from concurrent threads, as request threads
+make them, with and without micro-batching: throughput, the latency each
+caller sees, and the size of the batches the model ran.
+
+Every thread predicts its share of the synthetic statement of
+bench_merchant_key one description at a time, from empty caches and
+without the keyword fast path, so every distinct description reaches the
+model. Run from the ``api`` directory:
+
+    python -m benchmarks.bench_micro_batching [--rows 4000] [--threads 32]
+"""
+import argparse
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from app.categorization import model as categorization_model
+from app.utils import metrics
+from benchmarks.bench_merchant_key import make_descriptions
+
+def run(descriptions, threads: int) -> tuple:
+    latencies = [[] for _ in range(threads)]
+
+    def work(index: int):
+        for description in descriptions[index::threads]:
+            start = time.perf_counter()
+            categorization_model.predict_category_versioned(description)
+            latencies[index].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=work, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, np.concatenate([np.asarray(items) for items in latencies])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=4000)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+    descriptions = make_descriptions(args.rows)
+    categorization_model.warmup()
+
+    print(f"{args.rows} single predictions from {args.threads} threads, "
+          f"batching window {categorization_model.PREDICTION_BATCH_WAIT_MS} ms")
+    print(f"{'':>8}  {'rows/s':>8}  {'p50 ms':>7}  {'p99 ms':>7}  {'mean batch':>10}")
+    for name, enabled in [("direct", False), ("batched", True)]:
+        categorization_model.clear_prediction_cache()
+        metrics.reset()
+        with patch.object(categorization_model, "MICRO_BATCHING", enabled), \
+                patch.object(categorization_model, "KEYWORD_FAST_PATH", False):
+            elapsed, latencies = run(descriptions, args.threads)
+        sizes = metrics.snapshot()["timings"].get("prediction_labels_batch_size")
+        mean_batch = sizes["total"] / sizes["count"] if sizes else 1.0
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{name:>8}  {args.rows / elapsed:>8.0f}  {p50:>7.2f}  {p99:>7.2f}  {mean_batch:>10.1f}")
+    categorization_model.stop_batching()
+
+if __name__ == "__main__":
+    main()
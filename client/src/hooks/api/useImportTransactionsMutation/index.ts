@@ -6,17 +6,33 @@ import {
   useQueryClient,
 } from "@tanstack/react-query";
 
-interface ImportTransactionsResponse {
-  message: string;
+export interface ImportJob {
+  job_id: number;
+  filename: string;
+  status: "queued" | "running" | "completed" | "failed";
+  stage: string;
+  rows_processed: number;
+  rows_inserted: number;
+  rows_skipped: number;
+  // Row counters and seconds per stage, once the import has completed.
+  stats: {
+    rows: Record<string, number>;
+    seconds: Record<string, number>;
+  } | null;
+  error: string | null;
 }
 
-const importTransactionsFn = async (
-  file: File
-): Promise<ImportTransactionsResponse> => {
+// How often to check on a running import job.
+const POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Uploads the file, then polls the import job until it completes or fails.
+const importTransactionsFn = async (file: File): Promise<ImportJob> => {
   const formData = new FormData();
   formData.append("file", file);
 
-  const response = await api.post<ImportTransactionsResponse>(
+  const response = await api.post<ImportJob>(
     "/transactions/import",
     formData,
     {
@@ -25,17 +41,27 @@ const importTransactionsFn = async (
       },
     }
   );
-  return response.data;
+
+  let job = response.data;
+  while (job.status === "queued" || job.status === "running") {
+    await sleep(POLL_INTERVAL_MS);
+    job = (await api.get<ImportJob>(`/transactions/import/${job.job_id}`))
+      .data;
+  }
+  if (job.status === "failed") {
+    throw new Error(job.error ?? "Error importing transactions.");
+  }
+  return job;
 };
 
 export const useImportTransactionsMutation = (): UseMutationResult<
-  ImportTransactionsResponse,
+  ImportJob,
   Error,
   File
 > => {
   const queryClient = useQueryClient();
 
-  return useMutation<ImportTransactionsResponse, Error, File>({
+  return useMutation<ImportJob, Error, File>({
     mutationFn: importTransactionsFn,
     onSuccess: (data) => {
       console.log("Transactions imported successfully:", data);